@@ -9,25 +9,54 @@ from environs import Env
 
 from sqlalchemy_utils.functions import database_exists, create_database
 
-env = Env()
-env.read_env(path=Path.cwd())
-# 'path' argument is needed for when elsametric is called from another module.
-
-with env.prefixed('DB_'):
-    TOKEN_BYTES = env.int('TOKEN_BYTES')
-    DIALECT = env('DIALECT')
-    if DIALECT.lower() not in ('mysql', 'postgresql'):
-        raise ValueError('Invalid configuration for "DIALECT"')
-
-    with env.prefixed(f'{DIALECT.upper()}_'):
-        DB_DRIVER = env('DRIVER')
-        DB_USER = env('USER')
-        DB_PASS = env('PASS')
-        DB_HOST = env('HOST')
-        DB_NAME = env('SCHEMA')
-
-ENGINE_URI = f'{DIALECT}+{DB_DRIVER}://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}'
-
-if not database_exists(ENGINE_URI):
-    encoding = 'utf8mb4' if DIALECT == 'mysql' else 'utf8'
-    create_database(ENGINE_URI, encoding=encoding)
+# The database settings are read from the environment ('.env') on their
+# first use (by 'elsametric.models.base'), so the modules that don't use
+# the database (e.g. 'elsametric.names') can be imported without one.
+SETTINGS = (
+    'TOKEN_BYTES', 'DIALECT', 'PARTITION_BY_YEAR', 'DB_DRIVER', 'DB_USER',
+    'DB_PASS', 'DB_HOST', 'DB_NAME', 'ENGINE_URI')
+
+
+def _configure() -> dict:
+    env = Env()
+    env.read_env(path=Path.cwd())
+    # 'path' argument is needed for when elsametric is called from another
+    # module.
+
+    with env.prefixed('DB_'):
+        TOKEN_BYTES = env.int('TOKEN_BYTES')
+        DIALECT = env('DIALECT')
+        if DIALECT.lower() not in ('mysql', 'postgresql'):
+            raise ValueError('Invalid configuration for "DIALECT"')
+        PARTITION_BY_YEAR = env.bool('PARTITION_BY_YEAR', False)
+        if PARTITION_BY_YEAR and DIALECT.lower() != 'postgresql':
+            raise ValueError(
+                '"PARTITION_BY_YEAR" is only supported by postgresql')
+
+        with env.prefixed(f'{DIALECT.upper()}_'):
+            DB_DRIVER = env('DRIVER')
+            DB_USER = env('USER')
+            DB_PASS = env('PASS')
+            DB_HOST = env('HOST')
+            DB_NAME = env('SCHEMA')
+
+    ENGINE_URI = \
+        f'{DIALECT}+{DB_DRIVER}://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}'
+
+    if not database_exists(ENGINE_URI):
+        encoding = 'utf8mb4' if DIALECT == 'mysql' else 'utf8'
+        create_database(ENGINE_URI, encoding=encoding)
+
+    return {
+        'TOKEN_BYTES': TOKEN_BYTES, 'DIALECT': DIALECT,
+        'PARTITION_BY_YEAR': PARTITION_BY_YEAR, 'DB_DRIVER': DB_DRIVER,
+        'DB_USER': DB_USER, 'DB_PASS': DB_PASS, 'DB_HOST': DB_HOST,
+        'DB_NAME': DB_NAME, 'ENGINE_URI': ENGINE_URI}
+
+
+def __getattr__(name: str):
+    # the settings, read on the first access (e.g. 'from .. import DIALECT')
+    if name not in SETTINGS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals().update(_configure())
+    return globals()[name]
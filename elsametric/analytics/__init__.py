@@ -0,0 +1,4 @@
+'''Columnar analytics on a snapshot of the database
+
+Needs the optional dependencies: pip install "elsametric[analytics]"
+'''
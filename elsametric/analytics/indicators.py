@@ -0,0 +1,184 @@
+from typing import Dict
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        'elsametric.analytics.indicators needs numpy & scipy: '
+        'pip install "elsametric[analytics]"') from e
+
+from sqlalchemy.orm import Session
+
+from ..models.author_indicator import Author_Indicator
+from ..models.paper_indicator import Paper_Indicator
+from .snapshot import Snapshot
+
+
+def paper_indicators(snapshot: Snapshot) -> Dict[str, np.ndarray]:
+    """Computes the field- & year-normalized citation scores of papers
+
+    The expected citations of a paper are the mean citations of the
+    papers of its subjects (ASJC, through its source) in its year. A
+    paper with n subjects counts 1/n in the mean of each, and its
+    expected citations are the mean of its subjects' expectations. A
+    paper without subjects is compared with all papers of its year. The
+    normalized citation score (NCS) is citations / expected citations.
+
+    Parameters:
+        snapshot (Snapshot): the snapshot of the database
+
+    Returns:
+        dict: arrays in the order of the snapshot's papers:
+            'citations', 'expected_citations' & 'ncs' (NaN if nothing
+            is expected)
+    """
+
+    citations = np.asarray(snapshot.paper_citations, dtype=np.float64)
+    n_papers = len(citations)
+    years, year_rows = np.unique(snapshot.paper_year, return_inverse=True)
+    year_rows = year_rows.ravel()
+
+    # paper x subject weights (1/n for each of the n subjects of a paper)
+    index = snapshot.source_subjects
+    sources = np.asarray(snapshot.paper_source)
+    has_source = np.flatnonzero(sources >= 0)
+    source_subjects = sparse.csr_matrix(
+        (np.ones(len(index.indices)), np.asarray(index.indices),
+         np.asarray(index.indptr)),
+        shape=(len(index.indptr) - 1, len(snapshot.subject_id)))
+    paper_sources = sparse.csr_matrix(
+        (np.ones(len(has_source)), (has_source, sources[has_source])),
+        shape=(n_papers, source_subjects.shape[0]))
+    weights = (paper_sources @ source_subjects).tocoo()
+    totals = np.bincount(weights.row, weights=weights.data,
+                         minlength=n_papers)
+    weights.data /= totals[weights.row]
+
+    # (year, subject) baselines: weighted mean citations
+    cells = year_rows[weights.row] * weights.shape[1] + weights.col
+    n_cells = len(years) * weights.shape[1]
+    total = np.bincount(
+        cells, weights=weights.data * citations[weights.row],
+        minlength=n_cells)
+    count = np.bincount(cells, weights=weights.data, minlength=n_cells)
+    mean = np.divide(total, count, out=np.zeros(n_cells), where=count > 0)
+
+    expected = np.bincount(
+        weights.row, weights=weights.data * mean[cells], minlength=n_papers)
+    # papers without subjects: the mean of their year
+    year_mean = np.bincount(year_rows, weights=citations) / \
+        np.maximum(np.bincount(year_rows), 1)
+    no_subjects = totals == 0
+    expected[no_subjects] = year_mean[year_rows[no_subjects]]
+
+    ncs = np.full(n_papers, np.nan)
+    np.divide(citations, expected, out=ncs, where=expected > 0)
+    return {
+        'citations': citations.astype(np.int64),
+        'expected_citations': expected,
+        'ncs': ncs,
+    }
+
+
+def author_indicators(snapshot: Snapshot,
+                      ncs: np.ndarray) -> Dict[str, np.ndarray]:
+    """Computes the h-index, g-index & MNCS of all authors at once
+
+    The (author, paper) pairs are sorted by author & descending
+    citations, so the rank of each paper within its author's papers is
+    known, and each indicator is a reduction over the pairs:
+        h: the number of papers with citations >= their rank
+        g: the largest rank whose papers have >= rank ** 2 citations
+        mncs: the mean NCS of the papers (with an NCS)
+
+    Parameters:
+        snapshot (Snapshot): the snapshot of the database
+        ncs (ndarray): the NCS of the papers (see 'paper_indicators')
+
+    Returns:
+        dict: arrays in the order of the snapshot's authors: 'papers',
+            'citations', 'h_index', 'g_index' & 'mncs' (NaN if none)
+    """
+
+    index = snapshot.author_papers
+    n_authors = len(index.indptr) - 1
+    papers = np.diff(index.indptr)
+    authors = np.repeat(np.arange(n_authors), papers)
+    citations = np.asarray(snapshot.paper_citations, dtype=np.int64)[
+        np.asarray(index.indices)]
+
+    order = np.lexsort((-citations, authors))
+    authors, citations = authors[order], citations[order]
+    rank = np.arange(len(authors)) - index.indptr[authors] + 1
+    h_index = np.bincount(
+        authors, weights=citations >= rank, minlength=n_authors)
+    cumulative = np.cumsum(citations)
+    group_start = np.concatenate(([0], cumulative))[index.indptr[authors]]
+    g_rows = (cumulative - group_start) >= rank ** 2
+    g_index = np.zeros(n_authors, dtype=np.int64)
+    np.maximum.at(g_index, authors[g_rows], rank[g_rows])
+
+    paper_ncs = ncs[np.asarray(index.indices)]
+    scored = ~np.isnan(paper_ncs)
+    pair_authors = np.repeat(np.arange(n_authors), papers)
+    ncs_sum = np.bincount(pair_authors[scored], weights=paper_ncs[scored],
+                          minlength=n_authors)
+    ncs_count = np.bincount(pair_authors[scored], minlength=n_authors)
+    mncs = np.full(n_authors, np.nan)
+    np.divide(ncs_sum, ncs_count, out=mncs, where=ncs_count > 0)
+    return {
+        'papers': papers.astype(np.int64),
+        'citations': np.bincount(
+            authors, weights=citations, minlength=n_authors).astype(np.int64),
+        'h_index': h_index.astype(np.int64),
+        'g_index': g_index,
+        'mncs': mncs,
+    }
+
+
+def _nullable(values: np.ndarray) -> list:
+    return [None if np.isnan(value) else value for value in values.tolist()]
+
+
+def write_indicators(db: Session, snapshot: Snapshot,
+                     chunk_size: int = 10000) -> Dict[str, int]:
+    """Computes the indicators of all papers & authors, and replaces the
+    rows of the 'paper_indicator' & 'author_indicator' tables
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory; the rows
+            are written in its transaction (not committed)
+        snapshot (Snapshot): the snapshot of the database
+        chunk_size (int): number of rows inserted at once
+
+    Returns:
+        dict: the number of rows written to each table
+    """
+
+    papers = paper_indicators(snapshot)
+    authors = author_indicators(snapshot, papers['ncs'])
+    tables = {
+        Paper_Indicator.__table__: {
+            'paper_id': snapshot.paper_id.tolist(),
+            'citations': papers['citations'].tolist(),
+            'expected_citations': papers['expected_citations'].tolist(),
+            'ncs': _nullable(papers['ncs']),
+        },
+        Author_Indicator.__table__: {
+            'author_id': snapshot.author_id.tolist(),
+            **{name: values.tolist() for name, values in authors.items()
+               if name != 'mncs'},
+            'mncs': _nullable(authors['mncs']),
+        },
+    }
+
+    written = {}
+    for table, columns in tables.items():
+        db.execute(table.delete())
+        names = list(columns)
+        rows = [dict(zip(names, values)) for values in zip(*columns.values())]
+        for i in range(0, len(rows), chunk_size):
+            db.execute(table.insert(), rows[i:i + chunk_size])
+        written[table.name] = len(rows)
+    return written
@@ -0,0 +1,232 @@
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        'elsametric.analytics.keywords needs numpy & scipy: '
+        'pip install "elsametric[analytics]"') from e
+
+from sqlalchemy.orm import Session
+
+from ..models.keyword_ import Keyword
+from .snapshot import Snapshot
+
+
+def keyword_names(db: Session, keyword_ids: Iterable[int]) -> Dict[int, str]:
+    """Returns the keywords of some keyword ids: {keyword id: keyword}"""
+
+    keyword_ids = list(keyword_ids)
+    names = {}
+    for i in range(0, len(keyword_ids), 1000):
+        names.update(
+            db.query(Keyword.id, Keyword.keyword)
+            .filter(Keyword.id.in_(keyword_ids[i:i + 1000])))
+    return names
+
+
+class KeywordEngine:
+    """Keyword analytics on the paper x keyword matrix of a snapshot
+
+    The papers of a snapshot are the rows of a sparse (CSR) matrix, with
+    a 1 in the columns of their keywords, and of a one-hot paper x year
+    matrix. Every query is a few sparse products or reductions over the
+    rows of the selected papers (e.g. 'snapshot.institution_papers(id)';
+    all papers if None), and the results are keyed by keyword ids (see
+    'keyword_names').
+
+    Parameters:
+        snapshot (Snapshot): the snapshot of the database
+    """
+
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+        n_papers = len(snapshot.paper_id)
+        index = snapshot.paper_keywords
+        self.matrix = sparse.csr_matrix(
+            (np.ones(len(index.indices), dtype=np.int32),
+             np.asarray(index.indices), np.asarray(index.indptr)),
+            shape=(n_papers, len(snapshot.keyword_id)))
+        self.years, year_positions = np.unique(
+            snapshot.paper_year, return_inverse=True)
+        self.year_matrix = sparse.csr_matrix(
+            (np.ones(n_papers, dtype=np.int32), year_positions.ravel(),
+             np.arange(n_papers + 1)),
+            shape=(n_papers, len(self.years)))
+        # number of papers of each keyword (document frequency)
+        self.frequency = np.asarray(self.matrix.sum(axis=0)).ravel()
+
+    def __repr__(self) -> str:
+        return (f'KeywordEngine: {self.matrix.shape[0]} papers x '
+                f'{self.matrix.shape[1]} keywords, '
+                f'{self.matrix.nnz} pairs')
+
+    def _rows(self, papers: Optional[np.ndarray]) -> sparse.csr_matrix:
+        return self.matrix if papers is None else self.matrix[papers]
+
+    def _top(self, scores: np.ndarray, k: int,
+             candidates: Optional[np.ndarray] = None) -> Dict[int, float]:
+        # {keyword id: score} of the 'k' best (positive) scores
+        if candidates is None:
+            candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            best = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[best]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return dict(zip(
+            self.snapshot.keyword_id[candidates].tolist(),
+            scores[candidates].tolist()))
+
+    def counts(self, papers: Optional[np.ndarray] = None) -> np.ndarray:
+        """Returns the number of papers of each keyword (by position)"""
+
+        return np.asarray(self._rows(papers).sum(axis=0)).ravel()
+
+    def top(self, papers: Optional[np.ndarray] = None,
+            k: int = 20) -> Mapping[int, int]:
+        """Returns the 'k' most frequent keywords: {keyword id: papers}"""
+
+        return self._top(self.counts(papers), k)
+
+    def trends(self, papers: Optional[np.ndarray] = None,
+               keyword_ids: Optional[Iterable[int]] = None,
+               years: Optional[Tuple[int, int]] = None
+               ) -> Mapping[int, Mapping[int, int]]:
+        """Returns the number of papers per year of some keywords
+
+        Parameters:
+            papers (ndarray): the positions of the selected papers
+            keyword_ids (iterable): the keywords (default: the top 20 of
+                the papers)
+            years (tuple): the (first, last) years, inclusive (default:
+                all years)
+
+        Returns:
+            dict: {keyword id: {year: papers}}
+        """
+
+        if keyword_ids is None:
+            keyword_ids = self.top(papers)
+        positions = np.searchsorted(
+            self.snapshot.keyword_id, np.fromiter(keyword_ids, dtype=np.int64))
+        table, year_values = self._year_counts(papers, positions, years)
+        return {
+            keyword_id: dict(zip(year_values.tolist(), column.tolist()))
+            for keyword_id, column in zip(
+                self.snapshot.keyword_id[positions].tolist(),
+                table.toarray().T)}
+
+    def _year_counts(self, papers: Optional[np.ndarray],
+                     positions: Optional[np.ndarray],
+                     years: Optional[Tuple[int, int]]
+                     ) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        # (years x keywords) counts & the years of its rows
+        rows = self._rows(papers)
+        if positions is not None:
+            rows = rows[:, positions]
+        year_rows = self.year_matrix if papers is None \
+            else self.year_matrix[papers]
+        table = (year_rows.T @ rows).tocsr()
+        year_values = self.years
+        if years:
+            keep = (years[0] <= year_values) & (year_values <= years[1])
+            table, year_values = table[keep], year_values[keep]
+        return table, year_values
+
+    def trending(self, papers: Optional[np.ndarray] = None,
+                 years: Optional[Tuple[int, int]] = None, k: int = 20,
+                 min_papers: int = 2) -> Mapping[int, float]:
+        """Returns the keywords with the steepest growth over the years
+
+        The growth of a keyword is the slope of the least-squares line
+        of its papers per year, computed for all keywords at once.
+
+        Parameters:
+            papers (ndarray): the positions of the selected papers
+            years (tuple): the (first, last) years, inclusive (default:
+                all years)
+            k (int): number of keywords
+            min_papers (int): minimum papers of a keyword in the years
+
+        Returns:
+            dict: {keyword id: papers per year slope}
+        """
+
+        # the papers of the keywords in the years (not in all years)
+        table, year_values = self._year_counts(papers, None, years)
+        candidates = np.flatnonzero(
+            np.asarray(table.sum(axis=0)).ravel() >= min_papers)
+        if len(year_values) < 2 or not len(candidates):
+            return {}
+        table = table[:, candidates].toarray()
+        x = year_values - year_values.mean()
+        slopes = x @ (table - table.mean(axis=0)) / (x @ x)
+        scores = np.zeros(self.matrix.shape[1])
+        scores[candidates] = slopes
+        return self._top(scores, k, candidates[slopes > 0])
+
+    def co_occurring(self, keyword_id: int,
+                     papers: Optional[np.ndarray] = None, k: int = 20,
+                     measure: str = 'count') -> Mapping[int, float]:
+        """Returns the keywords co-occurring with a keyword
+
+        Parameters:
+            keyword_id (int): the keyword
+            papers (ndarray): the positions of the selected papers
+            k (int): number of keywords
+            measure (str): 'count' (papers with both keywords), or
+                'jaccard' (the count over the papers with either one)
+
+        Returns:
+            dict: {keyword id: measure}
+        """
+
+        position = Snapshot._position(self.snapshot.keyword_id, keyword_id)
+        rows = self._rows(papers)
+        with_keyword = rows[:, position].nonzero()[0]
+        scores = np.asarray(
+            rows[with_keyword].sum(axis=0), dtype=np.float64).ravel()
+        scores[position] = 0
+        if measure == 'jaccard':
+            frequency = self.counts(papers)
+            union = frequency + frequency[position] - scores
+            scores = np.divide(
+                scores, union, out=np.zeros_like(scores), where=union > 0)
+        elif measure != 'count':
+            raise ValueError(f'Invalid co-occurrence measure: {measure}')
+        return self._top(scores, k)
+
+    def distinctive(self, papers: np.ndarray, k: int = 20,
+                    min_papers: int = 2) -> Mapping[int, float]:
+        """Returns the keywords distinguishing some papers from the rest
+
+        The score is TF-IDF-like: the share of the selected papers with
+        the keyword, times the log inverse share of all papers with it.
+
+        Parameters:
+            papers (ndarray): the positions of the selected papers
+            k (int): number of keywords
+            min_papers (int): minimum papers of a keyword in the selection
+
+        Returns:
+            dict: {keyword id: score}
+        """
+
+        if not len(papers):
+            return {}
+        counts = self.counts(papers)
+        candidates = np.flatnonzero(counts >= min_papers)
+        idf = np.log(self.matrix.shape[0] / np.maximum(self.frequency, 1))
+        return self._top(counts / len(papers) * idf, k, candidates)
+
+    def cooccurrence_matrix(self, keyword_ids: Iterable[int],
+                            papers: Optional[np.ndarray] = None
+                            ) -> np.ndarray:
+        """Returns the keyword x keyword co-occurrence counts of some
+        keywords (in their given order), e.g. for a keyword network"""
+
+        positions = np.searchsorted(
+            self.snapshot.keyword_id, np.fromiter(keyword_ids, dtype=np.int64))
+        rows = self._rows(papers)[:, positions]
+        return (rows.T @ rows).toarray()
@@ -0,0 +1,418 @@
+import io
+import json
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        'elsametric.analytics needs numpy: '
+        'pip install "elsametric[analytics]"') from e
+
+from sqlalchemy import extract
+from sqlalchemy.orm import Session
+
+from ..models.associations import (
+    Author_Department,
+    Paper_Author,
+    Paper_Keyword,
+    Source_Subject,
+)
+from ..models.author import Author
+from ..models.department import Department
+from ..models.keyword_ import Keyword
+from ..models.paper import Paper
+from ..models.source import Source
+from ..models.subject import Subject
+
+
+SNAPSHOT_VERSION = 1
+META_FILE = 'meta.json'
+
+# The arrays of a snapshot; each is saved as '<name>.npy'. Entities are stored
+# in the order of their DB ids, so a DB id is found by binary search and all
+# other arrays refer to entities by their position (not their DB id).
+ARRAYS = (
+    'paper_id', 'paper_year', 'paper_citations', 'paper_source',
+    'paper_type', 'paper_open_access',
+    'author_id', 'department_id', 'department_institution',
+    'keyword_id', 'source_id', 'subject_id',
+)
+# CSR (compressed sparse row) indexes, saved as '<name>_indptr.npy' &
+# '<name>_indices.npy': the columns of row 'i' are
+# indices[indptr[i]:indptr[i + 1]].
+INDEXES = (
+    'paper_authors', 'author_papers',
+    'author_departments', 'department_authors',
+    'paper_keywords', 'source_subjects',
+)
+
+
+class CSR(NamedTuple):
+    indptr: np.ndarray
+    indices: np.ndarray
+
+    def row(self, i: int) -> np.ndarray:
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def rows(self, rows: np.ndarray) -> np.ndarray:
+        """Returns the concatenated columns of the selected rows"""
+
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        # position of each selected column in 'indices', without a loop
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(len(offsets))]
+
+
+def csr_from_pairs(rows: np.ndarray, columns: np.ndarray,
+                   n_rows: int) -> CSR:
+    """Builds a CSR index from (row, column) position pairs
+
+    Parameters:
+        rows (ndarray): the row position of each pair
+        columns (ndarray): the column position of each pair
+        n_rows (int): the total number of rows
+
+    Returns:
+        CSR: the index, with the columns of each row in their original
+            order
+    """
+
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+    return CSR(indptr, columns[order].astype(np.int32))
+
+
+def _positions(ids: np.ndarray, values: np.ndarray) -> np.ndarray:
+    # positions of 'values' in the sorted 'ids'; -1 for the missing ones
+    if not len(ids):
+        return np.full(len(values), -1, dtype=np.int64)
+    positions = np.searchsorted(ids, values)
+    positions[positions == len(ids)] = 0
+    return np.where(ids[positions] == values, positions, -1)
+
+
+def _pairs(query, chunk_size: int) -> Tuple[array, array]:
+    left, right = array('q'), array('q')
+    for a, b in query.yield_per(chunk_size):
+        left.append(a)
+        right.append(b)
+    return left, right
+
+
+def _ids(db: Session, column, chunk_size: int) -> np.ndarray:
+    ids = array('q', (
+        row[0] for row in db.query(column).order_by(column)
+        .yield_per(chunk_size)))
+    return np.frombuffer(ids, dtype=np.int64).astype(np.int32)
+
+
+def _index(query, row_ids: np.ndarray, column_ids: np.ndarray,
+           chunk_size: int) -> CSR:
+    # pairs referring to missing entities (e.g. a newer row) are dropped
+    left, right = _pairs(query, chunk_size)
+    rows = _positions(row_ids, np.frombuffer(left, dtype=np.int64))
+    columns = _positions(column_ids, np.frombuffer(right, dtype=np.int64))
+    keep = (rows >= 0) & (columns >= 0)
+    return csr_from_pairs(rows[keep], columns[keep], len(row_ids))
+
+
+def _transpose(index: CSR, n_columns: int) -> CSR:
+    rows = np.repeat(
+        np.arange(len(index.indptr) - 1, dtype=np.int32),
+        np.diff(index.indptr))
+    return csr_from_pairs(index.indices, rows, n_columns)
+
+
+def build_snapshot(db: Session, path: Path, chunk_size: int = 10000) -> Path:
+    """Builds a columnar snapshot of the database in the 'path' directory
+
+    Only the columns needed for the common aggregations are read,
+    without creating ORM objects, and saved as numpy arrays (see
+    'ARRAYS' & 'INDEXES'). The 'meta.json' file is written last, so an
+    interrupted build is never loaded.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        path (Path): the directory of the snapshot
+        chunk_size (int): number of rows fetched from the DB at once
+
+    Returns:
+        Path: the directory of the snapshot
+    """
+
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    if (path / META_FILE).is_file():
+        (path / META_FILE).unlink()
+
+    # papers: one row per paper, in the order of their ids
+    paper_columns = {
+        name: array(code) for name, code in (
+            ('id', 'q'), ('year', 'h'), ('citations', 'l'), ('source', 'l'),
+            ('open_access', 'b'))}
+    types: Dict[str, int] = {}
+    paper_type = array('B')
+    query = db.query(
+        Paper.id, extract('year', Paper.date), Paper.cited_cnt,
+        Paper.source_id, Paper.type, Paper.open_access) \
+        .order_by(Paper.id)
+    for paper_id, year, citations, source_id, type, open_access in \
+            query.yield_per(chunk_size):
+        paper_columns['id'].append(paper_id)
+        paper_columns['year'].append(int(year))
+        paper_columns['citations'].append(citations or 0)
+        paper_columns['source'].append(-1 if source_id is None else source_id)
+        paper_columns['open_access'].append(bool(open_access))
+        paper_type.append(types.setdefault(type, len(types)))
+
+    arrays = {
+        'paper_id': np.frombuffer(
+            paper_columns['id'], dtype=np.int64).astype(np.int32),
+        'paper_year': np.array(paper_columns['year'], dtype=np.int16),
+        'paper_citations': np.array(
+            paper_columns['citations'], dtype=np.int32),
+        'paper_type': np.array(paper_type, dtype=np.uint8),
+        'paper_open_access': np.array(
+            paper_columns['open_access'], dtype=np.bool_),
+        'author_id': _ids(db, Author.id, chunk_size),
+        'keyword_id': _ids(db, Keyword.id, chunk_size),
+        'source_id': _ids(db, Source.id, chunk_size),
+        'subject_id': _ids(db, Subject.id, chunk_size),
+    }
+    departments = db.query(Department.id, Department.institution_id) \
+        .order_by(Department.id).all()
+    arrays['department_id'] = np.array(
+        [row[0] for row in departments], dtype=np.int32)
+    arrays['department_institution'] = np.array(
+        [row[1] for row in departments], dtype=np.int32)
+    # source of each paper, as a position in 'source_id' (-1: no source)
+    arrays['paper_source'] = _positions(
+        arrays['source_id'],
+        np.array(paper_columns['source'], dtype=np.int64)).astype(np.int32)
+
+    indexes = {
+        'paper_authors': _index(
+            db.query(Paper_Author.paper_id, Paper_Author.author_id)
+            .order_by(Paper_Author.paper_id, Paper_Author.author_no),
+            arrays['paper_id'], arrays['author_id'], chunk_size),
+        'author_departments': _index(
+            db.query(Author_Department.c.author_id,
+                         Author_Department.c.department_id),
+            arrays['author_id'], arrays['department_id'], chunk_size),
+        'paper_keywords': _index(
+            db.query(Paper_Keyword.c.paper_id, Paper_Keyword.c.keyword_id),
+            arrays['paper_id'], arrays['keyword_id'], chunk_size),
+        'source_subjects': _index(
+            db.query(Source_Subject.c.source_id,
+                         Source_Subject.c.subject_id),
+            arrays['source_id'], arrays['subject_id'], chunk_size),
+    }
+    indexes['author_papers'] = _transpose(
+        indexes['paper_authors'], len(arrays['author_id']))
+    indexes['department_authors'] = _transpose(
+        indexes['author_departments'], len(arrays['department_id']))
+
+    for name, values in arrays.items():
+        np.save(path / f'{name}.npy', values)
+    for name, index in indexes.items():
+        np.save(path / f'{name}_indptr.npy', index.indptr)
+        np.save(path / f'{name}_indices.npy', index.indices)
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'create_time': int(time.time()),
+        'paper_types': sorted(types, key=types.get),
+        'counts': {name: len(values) for name, values in arrays.items()},
+    }
+    with io.open(path / META_FILE, 'w', encoding='utf-8') as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    return path
+
+
+class Snapshot:
+    """A read-only columnar snapshot of the database
+
+    The arrays are memory-mapped by default, so loading is instant and
+    several worker processes share the same pages of the OS cache.
+    Papers selections (e.g. the papers of an author) are arrays of paper
+    positions, which are passed to the aggregation methods.
+
+    Parameters:
+        path (Path): the directory of a snapshot built by
+            'build_snapshot'
+        mmap (bool): whether to memory-map the arrays or read them
+    """
+
+    def __init__(self, path: Path, mmap: bool = True) -> None:
+        self.path = Path(path)
+        with io.open(self.path / META_FILE, 'r', encoding='utf-8') as file:
+            self.meta = json.load(file)
+        if self.meta['version'] != SNAPSHOT_VERSION:
+            raise ValueError(
+                f'Unsupported snapshot version: {self.meta["version"]}')
+
+        mmap_mode = 'r' if mmap else None
+        for name in ARRAYS:
+            setattr(self, name, np.load(
+                self.path / f'{name}.npy', mmap_mode=mmap_mode))
+        for name in INDEXES:
+            setattr(self, name, CSR(
+                np.load(self.path / f'{name}_indptr.npy', mmap_mode=mmap_mode),
+                np.load(self.path / f'{name}_indices.npy', mmap_mode=mmap_mode)
+            ))
+        self.paper_types: List[str] = self.meta['paper_types']
+
+    def __repr__(self) -> str:
+        return (f'Snapshot: {len(self.paper_id)} papers, '
+                f'{len(self.author_id)} authors @ {self.path}')
+
+    # --------------------------------------------------------------------------
+    # Selections
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _position(ids: np.ndarray, db_id: int) -> int:
+        position = int(np.searchsorted(ids, db_id))
+        if position == len(ids) or ids[position] != db_id:
+            raise KeyError(db_id)
+        return position
+
+    def author_papers_of(self, author_id: int) -> np.ndarray:
+        """Returns the positions of an author's papers"""
+
+        return np.asarray(self.author_papers.row(
+            self._position(self.author_id, author_id)))
+
+    def authors_papers(self, authors: np.ndarray) -> np.ndarray:
+        """Returns the distinct papers of some authors (positions)"""
+
+        return np.unique(self.author_papers.rows(authors))
+
+    def department_authors_of(self, department_id: int) -> np.ndarray:
+        """Returns the positions of a department's authors"""
+
+        return np.asarray(self.department_authors.row(
+            self._position(self.department_id, department_id)))
+
+    def department_papers(self, department_id: int) -> np.ndarray:
+        """Returns the positions of a department's distinct papers"""
+
+        return self.authors_papers(self.department_authors_of(department_id))
+
+    def institution_papers(self, institution_id: int) -> np.ndarray:
+        """Returns the positions of an institution's distinct papers"""
+
+        departments = np.flatnonzero(
+            self.department_institution == institution_id)
+        authors = np.unique(self.department_authors.rows(departments))
+        return self.authors_papers(authors)
+
+    def select(self, papers: Optional[np.ndarray] = None,
+               years: Optional[Tuple[int, int]] = None,
+               types: Optional[Iterable[str]] = None,
+               open_access: Optional[bool] = None) -> np.ndarray:
+        """Filters papers (positions; all papers if None)
+
+        Parameters:
+            papers (ndarray): the positions of the papers to be filtered
+            years (tuple): the (first, last) years to keep, inclusive
+            types (iterable): the paper types to keep, e.g. ['ar', 'cp']
+            open_access (bool): keep only (non-)open-access papers
+
+        Returns:
+            ndarray: the positions of the selected papers
+        """
+
+        if papers is None:
+            papers = np.arange(len(self.paper_id))
+        mask = np.ones(len(papers), dtype=np.bool_)
+        if years:
+            year = self.paper_year[papers]
+            mask &= (years[0] <= year) & (year <= years[1])
+        if types is not None:
+            codes = [self.paper_types.index(t)
+                     for t in types if t in self.paper_types]
+            mask &= np.isin(self.paper_type[papers], codes)
+        if open_access is not None:
+            mask &= self.paper_open_access[papers] == open_access
+        return papers[mask]
+
+    # --------------------------------------------------------------------------
+    # Aggregations
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _counts(values: np.ndarray, ids: np.ndarray,
+                threshold: int = 0) -> Mapping[int, int]:
+        # {db id: count} of the positions in 'values'
+        if not len(values):
+            return {}
+        counts = np.bincount(values, minlength=len(ids))
+        found = np.flatnonzero(counts > max(threshold - 1, 0))
+        return dict(zip(ids[found].tolist(), counts[found].tolist()))
+
+    def papers_trend(self, papers: np.ndarray) -> Mapping[int, int]:
+        """Returns the number of papers per year"""
+
+        years, counts = np.unique(self.paper_year[papers], return_counts=True)
+        return dict(zip(years.tolist(), counts.tolist()))
+
+    def citations_trend(self, papers: np.ndarray) -> Mapping[int, int]:
+        """Returns the sum of citations of the papers per year"""
+
+        years, inverse = np.unique(
+            self.paper_year[papers], return_inverse=True)
+        citations = np.bincount(
+            inverse, weights=self.paper_citations[papers],
+            minlength=len(years))
+        return dict(zip(years.tolist(), citations.astype(np.int64).tolist()))
+
+    def type_counts(self, papers: np.ndarray) -> Mapping[str, int]:
+        """Returns the number of papers per paper type"""
+
+        codes, counts = np.unique(self.paper_type[papers], return_counts=True)
+        return {self.paper_types[code]: count
+                for code, count in zip(codes.tolist(), counts.tolist())}
+
+    def open_access_share(self, papers: np.ndarray) -> float:
+        """Returns the share of open-access papers (0 if no papers)"""
+
+        if not len(papers):
+            return 0.0
+        return float(self.paper_open_access[papers].mean())
+
+    def source_counts(self, papers: np.ndarray) -> Mapping[int, int]:
+        """Returns the number of papers per source: {source id: count}"""
+
+        sources = self.paper_source[papers]
+        return self._counts(sources[sources >= 0], self.source_id)
+
+    def subject_counts(self, papers: np.ndarray) -> Mapping[int, int]:
+        """Returns the number of papers per subject: {subject id: count}"""
+
+        sources = self.paper_source[papers]
+        subjects = self.source_subjects.rows(sources[sources >= 0])
+        return self._counts(subjects, self.subject_id)
+
+    def keyword_counts(self, papers: np.ndarray,
+                       threshold: int = 0) -> Mapping[int, int]:
+        """Returns the number of papers per keyword: {keyword id: count}"""
+
+        keywords = self.paper_keywords.rows(papers)
+        return self._counts(keywords, self.keyword_id, threshold)
+
+    def co_author_counts(self, author_id: int,
+                         threshold: int = 0) -> Mapping[int, int]:
+        """Returns the co-authors of an author: {author id: papers}"""
+
+        position = self._position(self.author_id, author_id)
+        authors = self.paper_authors.rows(self.author_papers.row(position))
+        authors = authors[authors != position]
+        return self._counts(authors, self.author_id, threshold)
@@ -0,0 +1,244 @@
+from typing import Dict, Iterable, List, Mapping, Optional
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        'elsametric.analytics.subjects needs numpy & scipy: '
+        'pip install "elsametric[analytics]"') from e
+
+from sqlalchemy.orm import Session
+
+from ..models.subject import Subject
+from .snapshot import CSR, Snapshot
+
+
+KINDS = ('source', 'paper', 'author', 'department', 'institution')
+LEVELS = ('subject', 'middle', 'top')
+
+
+def _incidence(index: CSR, n_columns: int) -> sparse.csr_matrix:
+    # a 0/1 sparse matrix of a CSR index of a snapshot
+    return sparse.csr_matrix(
+        (np.ones(len(index.indices), dtype=np.float64),
+         np.asarray(index.indices), np.asarray(index.indptr)),
+        shape=(len(index.indptr) - 1, n_columns))
+
+
+def _one_hot(columns: np.ndarray, n_columns: int) -> sparse.csr_matrix:
+    # a row per item, with a 1 in its column (an empty row if column < 0)
+    rows = np.flatnonzero(columns >= 0)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns[rows])),
+        shape=(len(columns), n_columns))
+
+
+def _binary(matrix: sparse.spmatrix) -> sparse.csr_matrix:
+    # 1 for every non-zero element (e.g. distinct papers of a department)
+    matrix = sparse.csr_matrix(matrix)
+    matrix.data[:] = 1
+    return matrix
+
+
+class SubjectProfiles:
+    """Subject-area (ASJC) profiles of sources, papers, authors,
+    departments & institutions
+
+    The source x subject incidence matrix of a snapshot is projected
+    onto the papers (through their sources), and then onto the authors,
+    departments & institutions (through their distinct papers) with
+    sparse matrix products. The profile of an entity is its number of
+    papers in each subject, like 'get_subjects'; with 'fractional', a
+    paper with n subjects counts 1/n in each, so every paper weighs the
+    same. The profiles can be rolled up to the 'middle' & 'top' levels
+    of the ASJC classification, and compared with cosine similarity.
+
+    Parameters:
+        snapshot (Snapshot): the snapshot of the database
+        db: a Session instance of SQLAlchemy session factory, used to
+            read the ASJC levels of the subjects
+    """
+
+    def __init__(self, snapshot: Snapshot, db: Session) -> None:
+        self.snapshot = snapshot
+        levels = {
+            id_: (middle, top) for id_, middle, top in
+            db.query(Subject.id, Subject.middle, Subject.top)}
+        self.labels: Dict[str, np.ndarray] = {
+            'subject': np.asarray(snapshot.subject_id)}
+        self.rollups: Dict[str, sparse.csr_matrix] = {}
+        for i, level in enumerate(('middle', 'top')):
+            names = [levels.get(id_, ('', ''))[i]
+                     for id_ in snapshot.subject_id.tolist()]
+            self.labels[level], columns = np.unique(
+                np.array(names, dtype=object), return_inverse=True)
+            self.rollups[level] = _one_hot(
+                columns.ravel(), len(self.labels[level]))
+
+        n_subjects = len(snapshot.subject_id)
+        self.source_subjects = _incidence(snapshot.source_subjects, n_subjects)
+        self._profiles: Dict[tuple, sparse.csr_matrix] = {}
+        self._papers: Dict[str, sparse.csr_matrix] = {}
+
+    def __repr__(self) -> str:
+        return (f'SubjectProfiles: {self.source_subjects.shape[1]} subjects,'
+                f' {len(self.labels["middle"])} middle &'
+                f' {len(self.labels["top"])} top levels')
+
+    def ids(self, kind: str) -> np.ndarray:
+        """Returns the DB ids of the rows of the profiles of a kind"""
+
+        snapshot = self.snapshot
+        if kind == 'institution':
+            return np.unique(snapshot.department_institution)
+        return np.asarray(getattr(snapshot, f'{kind}_id'))
+
+    def _entity_papers(self, kind: str) -> sparse.csr_matrix:
+        # entity x paper matrix, 1 for each distinct paper of the entity
+        if kind in self._papers:
+            return self._papers[kind]
+        snapshot = self.snapshot
+        n_papers = len(snapshot.paper_id)
+        if kind == 'author':
+            papers = _incidence(snapshot.author_papers, n_papers)
+        elif kind == 'department':
+            departments = _incidence(
+                snapshot.department_authors, len(snapshot.author_id))
+            papers = _binary(departments @ self._entity_papers('author'))
+        elif kind == 'institution':
+            institutions = _one_hot(
+                np.searchsorted(self.ids('institution'),
+                                snapshot.department_institution),
+                len(self.ids('institution'))).T.tocsr()
+            papers = _binary(institutions @ self._entity_papers('department'))
+        else:
+            raise ValueError(f'Invalid entity kind: {kind}')
+        self._papers[kind] = papers
+        return papers
+
+    def profiles(self, kind: str, level: str = 'subject',
+                 fractional: bool = False) -> sparse.csr_matrix:
+        """Returns the profiles of all entities of a kind
+
+        Parameters:
+            kind (str): one of 'KINDS'
+            level (str): one of 'LEVELS'
+            fractional (bool): whether each paper counts 1 in total,
+                split between its subjects (instead of 1 in each)
+
+        Returns:
+            csr_matrix: entity x category matrix; the rows are in the
+            order of 'ids(kind)' & the columns of 'labels[level]'
+        """
+
+        if level not in LEVELS:
+            raise ValueError(f'Invalid subject level: {level}')
+        key = (kind, level, fractional)
+        if key in self._profiles:
+            return self._profiles[key]
+
+        if level != 'subject' and kind in ('source', 'paper'):
+            profiles = self.profiles(kind, 'subject', fractional) \
+                @ self.rollups[level]
+            if not fractional:
+                # a paper with 2 subjects of a category is 1 paper in it
+                profiles = _binary(profiles)
+        elif level != 'subject':
+            # rolled up per paper, so the papers are counted once
+            profiles = self._entity_papers(kind) \
+                @ self.profiles('paper', level, fractional)
+        elif kind == 'source':
+            profiles = self.source_subjects
+            if fractional:
+                profiles = self._fractional(profiles)
+        elif kind == 'paper':
+            sources = _one_hot(
+                np.asarray(self.snapshot.paper_source),
+                self.source_subjects.shape[0])
+            profiles = sources @ self.source_subjects
+            if fractional:
+                profiles = self._fractional(profiles)
+        else:
+            profiles = self._entity_papers(kind) \
+                @ self.profiles('paper', 'subject', fractional)
+        self._profiles[key] = sparse.csr_matrix(profiles)
+        return self._profiles[key]
+
+    @staticmethod
+    def _fractional(profiles: sparse.spmatrix) -> sparse.csr_matrix:
+        totals = np.asarray(profiles.sum(axis=1)).ravel()
+        scale = np.divide(
+            1, totals, out=np.zeros_like(totals), where=totals > 0)
+        return sparse.diags(scale) @ profiles
+
+    def _rows(self, kind: str, ids: Iterable[int]) -> np.ndarray:
+        return np.array([
+            Snapshot._position(self.ids(kind), id_) for id_ in ids],
+            dtype=np.int64)
+
+    def profile(self, kind: str, id_: int, level: str = 'subject',
+                fractional: bool = False) -> Mapping:
+        """Returns the profile of an entity: {category: papers}
+
+        The categories are subject ids at the 'subject' level, and the
+        names of the 'middle' or 'top' levels otherwise.
+        """
+
+        row = self.profiles(kind, level, fractional)[
+            self._rows(kind, [id_])[0]]
+        labels = self.labels[level][row.indices]
+        return dict(sorted(
+            zip(labels.tolist(), row.data.tolist()),
+            key=lambda item: -item[1]))
+
+    @staticmethod
+    def _normalized(profiles: sparse.spmatrix) -> sparse.csr_matrix:
+        # rows scaled to unit (L2) length, so dot products are cosines
+        norms = np.sqrt(np.asarray(
+            profiles.multiply(profiles).sum(axis=1)).ravel())
+        scale = np.divide(1, norms, out=np.zeros_like(norms), where=norms > 0)
+        return sparse.diags(scale) @ profiles
+
+    def similarity(self, kind: str, ids: List[int],
+                   other_ids: Optional[List[int]] = None,
+                   level: str = 'subject',
+                   fractional: bool = False) -> np.ndarray:
+        """Returns the cosine similarities of the profiles of entities
+
+        Parameters:
+            kind (str): one of 'KINDS'
+            ids (list): the DB ids of the entities
+            other_ids (list): the DB ids of the entities to compare
+                with (default: 'ids')
+            level (str): one of 'LEVELS'
+            fractional (bool): see 'profiles'
+
+        Returns:
+            ndarray: len(ids) x len(other_ids) matrix of similarities
+        """
+
+        profiles = self._normalized(self.profiles(kind, level, fractional))
+        left = profiles[self._rows(kind, ids)]
+        right = left if other_ids is None \
+            else profiles[self._rows(kind, other_ids)]
+        return (left @ right.T).toarray()
+
+    def most_similar(self, kind: str, id_: int, k: int = 10,
+                     level: str = 'subject',
+                     fractional: bool = False) -> Mapping[int, float]:
+        """Returns the 'k' entities with the most similar profiles to an
+        entity's: {DB id: cosine similarity}"""
+
+        profiles = self._normalized(self.profiles(kind, level, fractional))
+        row = self._rows(kind, [id_])[0]
+        scores = (profiles @ profiles[row].T).toarray().ravel()
+        scores[row] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[
+                np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return dict(zip(
+            self.ids(kind)[candidates].tolist(),
+            scores[candidates].tolist()))
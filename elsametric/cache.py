@@ -0,0 +1,557 @@
+"""Result cache of the analytics methods ('get_*') of the models
+
+The results are keyed by (entity type, id, method, params), e.g.
+('author', 12, 'get_keywords', (('threshold', 2),)), and are kept in an
+in-process LRU (evicting by size) and, optionally, in a local disk
+directory shared by processes.
+
+Entries are invalidated when ingestion changes the papers of their
+entities: the ChangeTracker records the IDs changed by the commits of
+'SessionLocal' sessions, and resolves them to the affected authors,
+departments & institutions. With a ChangeLog, the tracker also records
+the changed rows of each commit in it (see 'elsametric.changelog').
+Other processes sync with that log, so their entries are invalidated as
+well; e.g. a web server sharing the disk directory of populate (its
+'result_cache' config):
+
+    CACHE.configure(path=data_path / config['result_cache'],
+                    log=ChangeLog(changelog_path(config, data_path)))
+
+Only the methods returning plain data (e.g. {year: count}) are cached;
+the ones returning mapped objects (e.g. get_co_authors) are not, since
+the objects would outlive their session.
+"""
+
+import functools
+import hashlib
+import inspect
+import io
+import json
+import os
+import pickle
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .changelog import (
+    changed_columns, Changes, ChangeLog, collect, outbox, Position)
+from .models.base import Base, engine, SessionLocal
+
+
+Key = Tuple[str, int, str, tuple]
+
+# Entity types of the cached results
+ENTITIES = ('author', 'department', 'institution')
+# The change log position of a disk cache, in its directory
+POSITION_FILE = 'changelog_position.json'
+
+
+def key_name(key: Key) -> str:
+    # a file name of a key, starting with its entity (to invalidate by glob)
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return f'{key[0]}-{key[1]}-{digest}'
+
+
+class LRUCache:
+    """In-process cache of pickled results, evicting by size
+
+    Parameters:
+        max_bytes (int): the maximum total size of the pickled results
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: 'OrderedDict[Key, bytes]' = OrderedDict()
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return f'LRUCache: {len(self._items)} items, {self.size} bytes'
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Key) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: Key, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, changed: Dict[str, Set[int]]) -> None:
+        with self._lock:
+            for key in [k for k in self._items
+                        if k[1] in changed.get(k[0], ())]:
+                self.size -= len(self._items.pop(key))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class DiskCache:
+    """Cache of pickled results, one file per key in a local directory
+
+    Parameters:
+        path (Path): the directory of the cache (created if missing)
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def __repr__(self) -> str:
+        return f'DiskCache: {self.path}'
+
+    def get(self, key: Key) -> Optional[bytes]:
+        try:
+            return (self.path / f'{key_name(key)}.pkl').read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: Key, value: bytes) -> None:
+        # write & rename, so readers never see a partial file
+        path = self.path / f'{key_name(key)}.pkl'
+        temp = path.with_suffix(f'.{os.getpid()}.tmp')
+        temp.write_bytes(value)
+        os.replace(temp, path)
+
+    def invalidate(self, changed: Dict[str, Set[int]]) -> None:
+        # a single pass over the directory, matching the entity & id of
+        # each file name ('<entity>-<id>-<digest>.pkl')
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.pkl'):
+                    continue
+                entity, id_, _ = entry.name.split('-', 2)
+                if int(id_) not in changed.get(entity, ()):
+                    continue
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:  # removed by another process
+                    pass
+
+    def clear(self) -> None:
+        for path in self.path.glob('*.pkl'):
+            path.unlink()
+
+    def load_position(self) -> Optional[Position]:
+        """Returns the change log position the entries are synced to"""
+
+        try:
+            with io.open(self.path / POSITION_FILE, 'r') as file:
+                return tuple(json.load(file))
+        except FileNotFoundError:
+            return None
+
+    def save_position(self, position: Position) -> None:
+        path = self.path / POSITION_FILE
+        temp = path.with_suffix(f'.{os.getpid()}.tmp')
+        temp.write_text(json.dumps(list(position)))
+        os.replace(temp, path)
+
+
+class ResultCache:
+    """Read-through cache of results, with an LRU and an optional disk
+    backend behind it
+
+    In the ingesting process, the ChangeTracker invalidates the changed
+    entities after each commit. Other processes (e.g. a web server)
+    configure the change log of ingestion ('configure(log=...)'): every
+    'sync_interval' seconds, a lookup first reads the records added to
+    the log since the last sync & invalidates their entities, in the
+    LRU and in the disk directory. The position of the disk directory
+    in the log is kept in it, so a process starting later doesn't serve
+    the entries changed while no process was syncing.
+
+    Parameters:
+        memory (LRUCache): the in-process cache
+        disk (DiskCache): the local disk cache (optional)
+    """
+
+    def __init__(self, memory: Optional[LRUCache] = None,
+                 disk: Optional[DiskCache] = None) -> None:
+        self.memory = memory or LRUCache()
+        self.disk = disk
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.log: Optional[ChangeLog] = None
+        self.position = (0, 0)
+        self.sync_interval = 1.0
+        self._synced = 0.0
+        self._sync_lock = Lock()
+
+    def __repr__(self) -> str:
+        return (f'ResultCache: {self.hits} hits, {self.misses} misses; '
+                f'{self.memory}; {self.disk or "no disk"}')
+
+    def configure(self, max_bytes: Optional[int] = None,
+                  path: Optional[Path] = None,
+                  log: Optional[ChangeLog] = None,
+                  sync_interval: float = 1.0,
+                  enabled: bool = True) -> None:
+        """Sets the size of the LRU, the disk directory, the change log of
+        ingestion (in the processes that don't ingest), or disables it
+
+        Parameters:
+            max_bytes (int): the maximum size of the LRU
+            path (Path): the disk directory, shared by processes
+            log (ChangeLog): the change log to sync with
+            sync_interval (float): minimum seconds between the syncs
+            enabled (bool): whether results are cached
+        """
+
+        if max_bytes is not None:
+            self.memory = LRUCache(max_bytes)
+        if path is not None:
+            self.disk = DiskCache(path)
+        if log is not None:
+            self.log = log
+            self.sync_interval = sync_interval
+            self.position = self._disk_position() or log.end()
+            if self.disk and self._disk_position() is None:
+                # entries of an unknown age: they may be stale
+                self.disk.clear()
+                self.disk.save_position(self.position)
+            self.memory.clear()
+            self.sync()
+        self.enabled = enabled
+
+    def active(self) -> bool:
+        """Whether the cache may hold entries to be invalidated (entries
+        computed later are computed from the committed data)"""
+
+        return self.enabled and (
+            self.disk is not None or len(self.memory) > 0)
+
+    def _disk_position(self) -> Optional[Position]:
+        return self.disk.load_position() if self.disk else None
+
+    def sync(self) -> Dict[str, Set[int]]:
+        """Invalidates the entities changed by the records of the change
+        log after the last sync
+
+        Returns:
+            dict: {entity type: set of IDs} invalidated
+        """
+
+        with self._sync_lock:
+            self._synced = time.monotonic()
+            changes, position = self.log.changes(*self.position)
+            changed = ChangeTracker.resolve(changed_rows(changes)) \
+                if changes else {}
+            self.invalidate(changed)
+            if position != self.position:
+                self.position = position
+                if self.disk:
+                    self.disk.save_position(position)
+            return changed
+
+    def get_or_compute(self, key: Key, compute: Callable[[], object]):
+        """Returns the cached value of 'key', or computes & caches it
+
+        Parameters:
+            key (tuple): (entity type, id, method, params)
+            compute (callable): computes the value (if not cached)
+
+        Returns:
+            object: a copy of the cached value (changing it doesn't
+            change the cache)
+        """
+
+        if not self.enabled:
+            return compute()
+        if self.log is not None and \
+                time.monotonic() - self._synced >= self.sync_interval:
+            self.sync()
+
+        value = self.memory.get(key)
+        if value is None and self.disk:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is not None:
+            self.hits += 1
+            return pickle.loads(value)
+
+        self.misses += 1
+        result = compute()
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self.memory.set(key, value)
+        if self.disk:
+            self.disk.set(key, value)
+        return result
+
+    def invalidate(self, changed: Dict[str, Set[int]]) -> None:
+        """Removes the entries of the changed entities
+
+        Parameters:
+            changed (dict): {entity type: set of IDs}
+        """
+
+        changed = {entity: ids for entity, ids in changed.items() if ids}
+        if not changed:
+            return
+        self.memory.invalidate(changed)
+        if self.disk:
+            self.disk.invalidate(changed)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk:
+            self.disk.clear()
+
+
+# The cache shared by the models
+CACHE = ResultCache()
+
+
+def cached(method: Callable) -> Callable:
+    """Caches the results of an analytics method of a model
+
+    The key is (the model's table, the object's id, the method's name,
+    the method's arguments). The attributes set by the method on the
+    object (e.g. 'total_papers' by 'get_papers_trend') are cached with
+    its result, and are set again on cache hits.
+    """
+
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.id is None:  # not in the database yet
+            return method(self, *args, **kwargs)
+        arguments = signature.bind(self, *args, **kwargs)
+        arguments.apply_defaults()
+        params = tuple(
+            (name, value) for name, value in arguments.arguments.items()
+            if name != 'self')
+        key = (self.__tablename__, self.id, method.__name__, params)
+
+        def compute():
+            before = dict(vars(self))
+            result = method(self, *args, **kwargs)
+            state = {
+                name: value for name, value in vars(self).items()
+                if not name.startswith('_sa_') and
+                (name not in before or before[name] is not value) and
+                name not in self.__mapper__.attrs}
+            return result, state
+
+        result, state = CACHE.get_or_compute(key, compute)
+        for name, value in state.items():
+            setattr(self, name, value)
+        return result
+
+    return wrapper
+
+
+def changed_rows(changes: Changes) -> Dict[str, Set[int]]:
+    """Returns the changed rows of the change log records, in the form
+    of 'ChangeTracker.resolve' (as collected by 'after_flush')"""
+
+    tables = Base.metadata.tables
+    rows = defaultdict(set)
+    for table, entity_changes in changes.items():
+        if table not in ('paper', 'author', 'department', 'source',
+                         'paper_author', 'source_metric', 'author_alias'):
+            continue
+        columns = [column.name for column in tables[table].primary_key]
+        for id_ in (entity_changes['inserted'] | entity_changes['deleted'] |
+                    set(entity_changes['updated'])):
+            key = dict(zip(columns, id_ if isinstance(id_, tuple)
+                           else (id_,)))
+            if table == 'paper_author':
+                rows['paper'].add(key['paper_id'])
+                rows['author'].add(key['author_id'])
+            elif table == 'source_metric':
+                rows[table].add(key['source_id'])
+            elif table == 'author_alias':
+                rows[table].add(key['author_id'])
+            else:
+                rows[table].add(key['id'])
+    return rows
+
+
+def _chunks(ids: Iterable[int], size: int = 1000):
+    ids = list(ids)
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+class ChangeTracker:
+    """Tracks the authors, departments & institutions whose papers (or
+    their sources' metrics) are changed by committed transactions
+
+    The IDs of the changed rows are collected after each flush of a
+    'SessionLocal' session, and are resolved to the affected entities
+    after the commit; only the rows actually changed count (e.g. not a
+    source whose 'papers' collection got a new paper). The subscribers
+    (e.g. CACHE.invalidate) are called with the entities of each commit,
+    and if 'accumulate' is set, 'changed' accumulates them for the whole
+    run (until 'reset'). The rows are only resolved if some subscriber
+    is active or 'accumulate' is set. If 'log' is set, the inserted,
+    updated & deleted rows of every table are written to its outbox in
+    each commit, and relayed to it after the commit.
+    """
+
+    def __init__(self, log: Optional[ChangeLog] = None,
+                 accumulate: bool = False) -> None:
+        self.changed: Dict[str, Set[int]] = defaultdict(set)
+        self.subscribers: List[Tuple[Callable, Callable[[], bool]]] = []
+        self.log = log
+        self.accumulate = accumulate
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        changed = ', '.join(
+            f'{len(self.changed[entity])} {entity}s' for entity in ENTITIES)
+        return f'ChangeTracker: {changed}'
+
+    def subscribe(self, subscriber: Callable[[Dict[str, Set[int]]], None],
+                  active: Optional[Callable[[], bool]] = None) -> None:
+        """Calls 'subscriber' with the changed entities of each commit
+
+        Parameters:
+            subscriber (callable): called with {entity type: set of IDs}
+            active (callable): whether the subscriber needs the changes
+                of a commit (default: always)
+        """
+
+        self.subscribers.append((subscriber, active or (lambda: True)))
+
+    def reset(self) -> Dict[str, Set[int]]:
+        """Returns & clears the changed IDs of the run so far"""
+
+        with self._lock:
+            changed, self.changed = self.changed, defaultdict(set)
+        return changed
+
+    def after_flush(self, db: Session, flush_context) -> None:
+        if self.log is not None:
+            collect(db, db.info.setdefault('change_log', {}))
+        rows = db.info.setdefault('changed_rows', defaultdict(set))
+        dirty = (obj for obj in db.dirty if changed_columns(obj))
+        for obj in (*db.new, *dirty, *db.deleted):
+            table = getattr(obj, '__tablename__', None)
+            if table in ('paper', 'author', 'department', 'source'):
+                rows[table].add(obj.id)
+            elif table == 'paper_author':
+                rows['paper'].add(obj.paper_id)
+                rows['author'].add(obj.author_id)
+            elif table in ('source_metric', 'author_alias'):
+                rows[table].add(
+                    obj.source_id if table == 'source_metric'
+                    else obj.author_id)
+
+    def before_commit(self, db: Session) -> None:
+        if self.log is None:
+            return
+        db.flush()  # the changes are collected by 'after_flush'
+        changes = db.info.pop('change_log', None)
+        if changes:
+            outbox(db, changes)
+
+    def after_commit(self, db: Session) -> None:
+        if self.log is not None:
+            self.log.relay(engine)
+        rows = db.info.pop('changed_rows', None)
+        subscribers = [
+            subscriber for subscriber, active in self.subscribers
+            if active()]
+        if not rows or not (subscribers or self.accumulate):
+            return
+        changed = self.resolve(rows)
+        if self.accumulate:
+            with self._lock:
+                for entity, ids in changed.items():
+                    self.changed[entity] |= ids
+        for subscriber in subscribers:
+            subscriber(changed)
+
+    def after_rollback(self, db: Session) -> None:
+        db.info.pop('changed_rows', None)
+        db.info.pop('change_log', None)
+
+    @staticmethod
+    def resolve(rows: Dict[str, Set[int]]) -> Dict[str, Set[int]]:
+        """Returns the entities affected by the changed rows
+
+        Parameters:
+            rows (dict): {table name: set of IDs}; the IDs of the
+                'source_metric' & 'author_alias' rows are their sources'
+                & authors' IDs
+
+        Returns:
+            dict: {entity type: set of IDs}
+        """
+
+        tables = Base.metadata.tables
+        paper = tables['paper']
+        paper_author = tables['paper_author']
+        author = tables['author']
+        author_alias = tables['author_alias']
+        author_department = tables['author_department']
+
+        authors = rows.get('author', set()) | rows.get('author_alias', set())
+        departments = {
+            (id_, None) for id_ in rows.get('department', set())}
+        with engine.connect() as connection:
+            papers = set(rows.get('paper', set()))
+            sources = rows.get('source', set()) | \
+                rows.get('source_metric', set())
+            for chunk in _chunks(sources):
+                papers.update(row[0] for row in connection.execute(
+                    select([paper.c.id]).where(paper.c.source_id.in_(chunk))))
+            for chunk in _chunks(papers):
+                authors.update(row[0] for row in connection.execute(
+                    select([paper_author.c.author_id])
+                    .where(paper_author.c.paper_id.in_(chunk))))
+            # papers of an alias author are also its canonical author's
+            for chunk in _chunks(authors.copy()):
+                authors.update(row[0] for row in connection.execute(
+                    select([author_alias.c.author_id])
+                    .where(author_alias.c.id_scp.in_(
+                        select([author.c.id_scp])
+                        .where(author.c.id.in_(chunk))))))
+            for chunk in _chunks(authors):
+                departments.update(
+                    (row[0], row[1]) for row in connection.execute(
+                        select([author_department.c.department_id,
+                                author_department.c.institution_id])
+                        .where(author_department.c.author_id.in_(chunk))))
+
+        return {
+            'author': authors,
+            'department': {id_ for id_, _ in departments},
+            'institution': {
+                id_ for _, id_ in departments if id_ is not None},
+        }
+
+
+# The tracker of the 'SessionLocal' sessions (e.g. ingestion)
+TRACKER = ChangeTracker()
+TRACKER.subscribe(CACHE.invalidate, CACHE.active)
+event.listen(SessionLocal, 'after_flush', TRACKER.after_flush)
+event.listen(SessionLocal, 'before_commit', TRACKER.before_commit)
+event.listen(SessionLocal, 'after_commit', TRACKER.after_commit)
+event.listen(SessionLocal, 'after_rollback', TRACKER.after_rollback)
@@ -0,0 +1,329 @@
+"""Change log (change data capture) of the commits of ingestion
+
+The rows inserted, updated & deleted by each commit of a 'SessionLocal'
+session are appended to a local JSON lines file, one record per
+(entity, operation, changed columns) with a sequence number:
+
+    {"seq": 12, "time": "2019-10-28T10:00:00Z", "entity": "paper",
+     "op": "update", "ids": [41, 42], "columns": ["cited_cnt"]}
+
+The records of a commit are first inserted into the 'change_outbox'
+table, in the transaction of the commit ('outbox'), so they are durable
+exactly when the commit is. After the commit they are relayed to the
+file and removed from the outbox ('ChangeLog.relay'); the records left
+in the outbox by a crash are relayed by the next relay (e.g. the next
+populate run). A crash between appending & removing them relays them
+twice, so consumers apply the records idempotently.
+
+Consumers (e.g. a search index, or a cache of the web server) keep the
+position (seq, offset) of the last record they applied and catch up by
+reading the records after it, so their work is proportional to the
+changes, not to the database.
+"""
+
+import io
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import Session
+
+from .models.change_outbox import Change_Outbox
+
+
+# A position in the log: (sequence number, byte offset) of the last record
+Position = Tuple[int, int]
+# {entity: {'inserted': set of ids, 'updated': {id: set of columns},
+# 'deleted': set of ids}}; the ids of composite keys are tuples
+Changes = Dict[str, dict]
+
+
+def _new_changes(changes: Changes, entity: str) -> dict:
+    return changes.setdefault(
+        entity, {'inserted': set(), 'updated': {}, 'deleted': set()})
+
+
+def _identity(obj) -> object:
+    key = inspect(obj).mapper.primary_key_from_instance(obj)
+    return key[0] if len(key) == 1 else tuple(key)
+
+
+def changed_columns(obj) -> Set[str]:
+    """Returns the changed columns of a flushed object, and its changed
+    many-to-many collections (e.g. 'keywords')
+
+    Read from the state's committed values, which (unlike the history
+    API) never loads anything while the session is flushing. Changes of
+    the other collections (e.g. a paper appended to 'source.papers')
+    are not changes of the object's row, and are left out.
+    """
+
+    state = inspect(obj)
+    mapper = state.mapper
+    committed = state.committed_state
+    columns = {
+        attr.key for attr in mapper.column_attrs
+        if attr.key in committed and
+        committed[attr.key] != state.dict.get(attr.key)}
+    columns.update(
+        relationship.key for relationship in mapper.relationships
+        if relationship.key in committed and
+        relationship.secondary is not None and not relationship.viewonly)
+    return columns
+
+
+def merge(changes: Changes, entity: str, op: str, ids,
+          columns: Optional[Set[str]] = None) -> None:
+    """Adds the changes of some rows to 'changes', in place
+
+    A row inserted & updated is only inserted, and a row inserted &
+    deleted is dropped.
+    """
+
+    entity_changes = _new_changes(changes, entity)
+    inserted = entity_changes['inserted']
+    updated = entity_changes['updated']
+    deleted = entity_changes['deleted']
+    for id_ in ids:
+        if op == 'inserted':
+            inserted.add(id_)
+            deleted.discard(id_)
+        elif op == 'updated':
+            if id_ not in inserted:
+                updated.setdefault(id_, set()).update(columns or ())
+        elif op == 'deleted':
+            updated.pop(id_, None)
+            if id_ in inserted:
+                inserted.discard(id_)
+            else:
+                deleted.add(id_)
+        else:
+            raise ValueError(f'Invalid operation: {op}')
+
+
+def collect(db: Session, changes: Changes) -> None:
+    """Adds the changes of a flush to 'changes' (in 'after_flush')"""
+
+    for op, objects in (('inserted', db.new), ('updated', db.dirty),
+                        ('deleted', db.deleted)):
+        for obj in objects:
+            table = getattr(obj, '__tablename__', None)
+            if table is None:
+                continue
+            if op == 'updated':
+                columns = changed_columns(obj)
+                if not columns:
+                    continue
+                merge(changes, table, op, [_identity(obj)], columns)
+            else:
+                merge(changes, table, op, [_identity(obj)])
+
+
+def _json_id(id_):
+    return list(id_) if isinstance(id_, tuple) else id_
+
+
+def _key(id_):
+    return tuple(id_) if isinstance(id_, list) else id_
+
+
+def records(changes: Changes) -> List[dict]:
+    """Returns the records (without sequence numbers) of some changes
+
+    Rows with the same changed columns share an 'update' record.
+    """
+
+    time = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    result = []
+    for entity, entity_changes in sorted(changes.items()):
+        entity_records = [
+            ('insert', sorted(entity_changes['inserted']), None),
+            ('delete', sorted(entity_changes['deleted']), None)]
+        by_columns: Dict[tuple, list] = {}
+        for id_, columns in entity_changes['updated'].items():
+            by_columns.setdefault(tuple(sorted(columns)), []).append(id_)
+        entity_records.extend(
+            ('update', sorted(ids), list(columns))
+            for columns, ids in sorted(by_columns.items()))
+        for op, ids, columns in entity_records:
+            if not ids:
+                continue
+            record = {
+                'time': time, 'entity': entity, 'op': op,
+                'ids': [_json_id(id_) for id_ in ids]}
+            if columns is not None:
+                record['columns'] = columns
+            result.append(record)
+    return result
+
+
+def outbox(db: Session, changes: Changes) -> None:
+    """Inserts the records of some changes into the outbox, in the
+    transaction of 'db' (in 'before_commit')"""
+
+    commit_records = records(changes)
+    if commit_records:
+        db.execute(Change_Outbox.__table__.insert(), {
+            'records': json.dumps(commit_records, separators=(',', ':'))})
+
+
+class ChangeLog:
+    """Append-only JSON lines file of the changes of the commits
+
+    A ChangeLog can be shared by the threads of a process; a single
+    process should write to a log at a time.
+
+    Parameters:
+        path (Path): the path to the log file (created if missing)
+        fsync (bool): whether to sync the file to disk after each commit
+    """
+
+    def __init__(self, path: Path, fsync: bool = False) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self._lock = Lock()
+        self._relay_lock = Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.seq = self._recover()
+
+    def __repr__(self) -> str:
+        return f'ChangeLog: {self.path} (seq: {self.seq})'
+
+    def _recover(self) -> int:
+        # the last sequence number; drops an incomplete last line (a
+        # crash while appending), so new records start on a new line
+        if not self.path.is_file():
+            return 0
+        with io.open(self.path, 'rb+') as file:
+            size = file.seek(0, os.SEEK_END)
+            start = max(size - 65536, 0)
+            file.seek(start)
+            tail = file.read()
+            end = tail.rfind(b'\n') + 1
+            if start + end < size:
+                file.truncate(start + end)
+            lines = tail[:end].splitlines()
+        if start > 0:  # the first line may be cut
+            lines = lines[1:]
+        if not lines:
+            return 0 if start == 0 else self._scan_seq()
+        return json.loads(lines[-1])['seq']
+
+    def _scan_seq(self) -> int:
+        seq = 0
+        for record, _ in self.read():
+            seq = record['seq']
+        return seq
+
+    def append(self, changes: Changes) -> int:
+        """Appends the changes of a commit
+
+        Returns:
+            int: the sequence number of the last record
+        """
+
+        return self.append_records(records(changes))
+
+    def append_records(self, new_records: List[dict]) -> int:
+        """Appends some records (from 'records'), numbering them
+
+        Returns:
+            int: the sequence number of the last record
+        """
+
+        with self._lock:
+            lines = []
+            for record in new_records:
+                self.seq += 1
+                lines.append(json.dumps(
+                    {'seq': self.seq, **record}, separators=(',', ':')))
+            if lines:
+                with io.open(self.path, 'a', encoding='utf-8') as file:
+                    file.write(''.join(f'{line}\n' for line in lines))
+                    if self.fsync:
+                        file.flush()
+                        os.fsync(file.fileno())
+            return self.seq
+
+    def relay(self, bind) -> int:
+        """Moves the committed records of the outbox to the log
+
+        Parameters:
+            bind: an engine (or connection) of the database
+
+        Returns:
+            int: number of commits relayed
+        """
+
+        table = Change_Outbox.__table__
+        with self._relay_lock:
+            rows = bind.execute(
+                select([table.c.id, table.c.records])
+                .order_by(table.c.id)).fetchall()
+            for _, commit_records in rows:
+                self.append_records(json.loads(commit_records))
+            ids = [row[0] for row in rows]
+            for i in range(0, len(ids), 1000):
+                bind.execute(table.delete().where(
+                    table.c.id.in_(ids[i:i + 1000])))
+            return len(rows)
+
+    def end(self) -> Position:
+        """Returns the position of the last record of the log"""
+
+        with self._lock:
+            size = self.path.stat().st_size if self.path.is_file() else 0
+            return self.seq, size
+
+    def read(self, after: int = 0,
+             offset: int = 0) -> Iterator[Tuple[dict, int]]:
+        """Yields the records after a sequence number
+
+        Parameters:
+            after (int): the sequence number of the last applied record
+            offset (int): the byte offset of the records after 'after'
+                (e.g. from 'changes'), so the log is not read from the
+                start; 0 reads the whole log
+
+        Yields:
+            tuple: (record, byte offset of the next record)
+        """
+
+        if not self.path.is_file():
+            return
+        with io.open(self.path, 'rb') as file:
+            file.seek(offset)
+            for line in file:
+                offset += len(line)
+                if not line.endswith(b'\n'):  # being appended
+                    break
+                record = json.loads(line)
+                if record['seq'] > after:
+                    yield record, offset
+
+    def changes(self, after: int = 0,
+                offset: int = 0) -> Tuple[Changes, Position]:
+        """Returns the net changes after a position of the log
+
+        Parameters:
+            after (int): the sequence number of the last applied record
+            offset (int): the byte offset of the records after 'after'
+
+        Returns:
+            tuple: (changes, the position of the last record)
+        """
+
+        changes: Changes = {}
+        position = (after, offset)
+        operations = {'insert': 'inserted', 'update': 'updated',
+                      'delete': 'deleted'}
+        for record, next_offset in self.read(after, offset):
+            merge(changes, record['entity'], operations[record['op']],
+                  [_key(id_) for id_ in record['ids']],
+                  set(record.get('columns', ())))
+            position = (record['seq'], next_offset)
+        return changes, position
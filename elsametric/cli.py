@@ -0,0 +1,389 @@
+import argparse
+import io
+import json
+from pathlib import Path
+from typing import List, Optional
+
+
+def populate(args: argparse.Namespace) -> None:
+    from .cache import CACHE, TRACKER
+    from .helpers.checkpoint import Checkpoint
+    from .populate import Populator
+
+    with io.open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    config = config['database']['populate']
+
+    data_path = Path(args.config).resolve().parent / config['data_directory']
+    checkpoint = Checkpoint(
+        data_path / config['logs'] /
+        config.get('checkpoint', 'populate_checkpoint.json'),
+        resume=args.resume or args.dry_run
+    )
+    batch_size = args.batch_size or config.get('batch_size', 100)
+    populator = Populator(config, data_path, checkpoint, batch_size)
+    stages = args.stages or populator.enabled_stages()
+    if args.dry_run:
+        # nothing is committed, so there are no changes to log or cache
+        populator.estimate(stages, sample=args.sample, workers=args.workers)
+        return
+
+    if config.get('changelog', True):
+        TRACKER.log = open_changelog(config, data_path)
+    if config.get('result_cache'):
+        # the disk cache of the readers, invalidated by each commit
+        CACHE.configure(path=data_path / config['result_cache'])
+    populator.run(stages, workers=args.workers)
+
+
+def changelog_path(config: dict, data_path: Path) -> Path:
+    name = config.get('changelog')
+    if not isinstance(name, str):
+        name = 'changelog.jsonl'
+    return data_path / config['logs'] / name
+
+
+def open_changelog(config: dict, data_path: Path):
+    # the change log, with the records a crash left in the outbox relayed
+    from .changelog import ChangeLog
+    from .models.base import engine
+    from .models.change_outbox import Change_Outbox
+
+    log = ChangeLog(changelog_path(config, data_path))
+    Change_Outbox.__table__.create(engine, checkfirst=True)
+    log.relay(engine)
+    return log
+
+
+def changes(args: argparse.Namespace) -> None:
+
+    with io.open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    config = config['database']['populate']
+    data_path = Path(args.config).resolve().parent / config['data_directory']
+
+    log = open_changelog(config, data_path)
+    changed, (seq, offset) = log.changes(args.after, args.offset)
+    for entity, entity_changes in sorted(changed.items()):
+        print(f'{entity}: ' + ', '.join(
+            f'{len(entity_changes[op])} {op}'
+            for op in ('inserted', 'updated', 'deleted')))
+    print(f'position: --after {seq} --offset {offset}')
+
+
+def _search_index(args: argparse.Namespace, db):
+    from .search import DatabaseIndex, SqliteIndex
+
+    if args.sqlite:
+        return SqliteIndex(Path(args.sqlite))
+    return DatabaseIndex(db)
+
+
+def _pending_changes(log, position_path: Path, rebuild: bool):
+    # the changes after the position of the last change log record a
+    # consumer applied (None if it has to be rebuilt), and the new position
+    if rebuild or not position_path.is_file():
+        return None, log.end()  # later changes are applied by updates
+    with io.open(position_path, 'r') as position_file:
+        after, offset = json.load(position_file)
+    return log.changes(after, offset)
+
+
+def search_index(args: argparse.Namespace) -> None:
+    from .models.base import Base, engine, SessionLocal
+    from .search import build, update
+
+    with io.open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    config = config['database']['populate']
+    data_path = Path(args.config).resolve().parent / config['data_directory']
+    log = open_changelog(config, data_path)
+    position_path = Path(f'{args.sqlite}.position.json') if args.sqlite \
+        else data_path / config['logs'] / 'search_position.json'
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        index = _search_index(args, db)
+        changes, position = _pending_changes(log, position_path, args.rebuild)
+        if changes is None:
+            written = build(index, db)
+        else:
+            written = update(index, db, changes)
+        index.commit()
+    finally:
+        db.close()
+    with io.open(position_path, 'w') as position_file:
+        json.dump(list(position), position_file)
+    for entity, documents in written.items():
+        print(f'{entity}: {documents} documents indexed')
+    print(f'change log position: {position[0]}')
+
+
+def search(args: argparse.Namespace) -> None:
+    from time import perf_counter
+
+    from .models.base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        index = _search_index(args, db)
+        t0 = perf_counter()
+        results = index.search(
+            args.entity, ' '.join(args.query), limit=args.limit)
+        elapsed = (perf_counter() - t0) * 1000
+    finally:
+        db.close()
+    for result in results:
+        print(f'{result.id:>10} {result.score:8.4f}  {result.title[:60]}')
+    print(f'{len(results)} results in {elapsed:.1f} ms')
+
+
+def name_keys(args: argparse.Namespace) -> None:
+    from .models.base import Base, engine, SessionLocal
+    from .helpers.author_name_key_process import NAME_COLUMNS
+    from .helpers.process import author_name_key_process
+
+    with io.open(args.config, 'r') as config_file:
+        config = json.load(config_file)
+    config = config['database']['populate']
+    data_path = Path(args.config).resolve().parent / config['data_directory']
+    log = open_changelog(config, data_path)
+    position_path = data_path / config['logs'] / 'name_key_position.json'
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        changes, position = _pending_changes(log, position_path, args.rebuild)
+        if changes is None:
+            author_ids = None
+        else:
+            author_changes = changes.get('author', {})
+            author_ids = author_changes.get('inserted', set()) | \
+                author_changes.get('deleted', set()) | {
+                    id_ for id_, columns in
+                    author_changes.get('updated', {}).items()
+                    if columns & NAME_COLUMNS}
+        keyed = author_name_key_process(db, author_ids)
+        db.commit()
+    finally:
+        db.close()
+    with io.open(position_path, 'w') as position_file:
+        json.dump(list(position), position_file)
+    print(f'author name keys: {keyed} authors')
+    print(f'change log position: {position[0]}')
+
+
+def dedup(args: argparse.Namespace) -> None:
+    from .models.base import Base, engine, SessionLocal
+    from .helpers.process import author_dedup_process
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        candidates = author_dedup_process(
+            db, min_score=args.min_score,
+            max_block_size=args.max_block_size)
+        db.commit()
+    finally:
+        db.close()
+    print(f'author dedup: {candidates} merge candidates added or updated')
+
+
+def snapshot(args: argparse.Namespace) -> None:
+    from .analytics.snapshot import build_snapshot, Snapshot
+    from .models.base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        path = build_snapshot(db, Path(args.path), chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    print(Snapshot(path))
+
+
+def indicators(args: argparse.Namespace) -> None:
+    from .analytics.indicators import write_indicators
+    from .analytics.snapshot import Snapshot
+    from .models.base import Base, engine, SessionLocal
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        written = write_indicators(db, Snapshot(args.snapshot))
+        db.commit()
+    finally:
+        db.close()
+    for table, rows in written.items():
+        print(f'{table}: {rows} rows written')
+
+
+def export(args: argparse.Namespace) -> None:
+    from .export import export_tables
+
+    exported = export_tables(
+        Path(args.path), tables=args.tables, chunk_size=args.chunk_size)
+    for table, rows in exported.items():
+        print(f'{table}: {rows} rows exported')
+
+
+def index_advisor(args: argparse.Namespace) -> None:
+    from .index_advisor import advise, print_report
+    from .models.base import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print_report(advise(db, create=args.create))
+    finally:
+        db.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Entry point of the 'elsametric' command"""
+
+    from .stages import STAGES
+
+    parser = argparse.ArgumentParser(prog='elsametric')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    populate_parser = subparsers.add_parser(
+        'populate', help='populate the database using the data files')
+    populate_parser.add_argument(
+        '--config', default='config.json',
+        help='path to the config file (default: %(default)s)')
+    populate_parser.add_argument(
+        '--stages', nargs='+', choices=STAGES, metavar='STAGE',
+        help=f'stages to run, ignoring their "process" flag in config; '
+        f'choose from: {", ".join(STAGES)} (default: enabled in config)')
+    populate_parser.add_argument(
+        '--workers', type=int, default=1,
+        help='number of independent stages to run concurrently')
+    populate_parser.add_argument(
+        '--batch-size', type=int,
+        help='number of .csv rows committed at once '
+        '(default: "batch_size" in config, or 100)')
+    populate_parser.add_argument(
+        '--resume', action='store_true',
+        help='continue from where the last commit of a previous run ended')
+    populate_parser.add_argument(
+        '--dry-run', action='store_true',
+        help='process a sample of each section without committing and '
+        'print throughput estimates')
+    populate_parser.add_argument(
+        '--sample', type=int, default=5,
+        help='work units (rows or files) per section for --dry-run')
+    populate_parser.set_defaults(func=populate)
+
+    changes_parser = subparsers.add_parser(
+        'changes', help='summarize the change log of populate runs after '
+        'a position')
+    changes_parser.add_argument(
+        '--config', default='config.json',
+        help='path to the config file (default: %(default)s)')
+    changes_parser.add_argument(
+        '--after', type=int, default=0,
+        help='sequence number of the last applied record')
+    changes_parser.add_argument(
+        '--offset', type=int, default=0,
+        help='byte offset of the records after --after (as printed by a '
+        'previous run)')
+    changes_parser.set_defaults(func=changes)
+
+    search_index_parser = subparsers.add_parser(
+        'search-index', help='build the full-text search index, or update '
+        'it with the change log')
+    search_index_parser.add_argument(
+        '--config', default='config.json',
+        help='path to the config file (default: %(default)s)')
+    search_index_parser.add_argument(
+        '--rebuild', action='store_true',
+        help='index all rows again, instead of the changed ones')
+    search_index_parser.add_argument(
+        '--sqlite', metavar='PATH',
+        help='use an embedded SQLite FTS5 index at PATH, instead of the '
+        'database\'s native full-text index')
+    search_index_parser.set_defaults(func=search_index)
+
+    search_parser = subparsers.add_parser(
+        'search', help='search papers, authors or sources')
+    search_parser.add_argument('entity', choices=('paper', 'author', 'source'))
+    search_parser.add_argument('query', nargs='+')
+    search_parser.add_argument(
+        '--limit', type=int, default=20,
+        help='number of results (default: %(default)s)')
+    search_parser.add_argument(
+        '--sqlite', metavar='PATH',
+        help='search the embedded SQLite FTS5 index at PATH')
+    search_parser.set_defaults(func=search)
+
+    name_keys_parser = subparsers.add_parser(
+        'name-keys', help='build the normalized name keys of the authors, '
+        'or update them with the change log')
+    name_keys_parser.add_argument(
+        '--config', default='config.json',
+        help='path to the config file (default: %(default)s)')
+    name_keys_parser.add_argument(
+        '--rebuild', action='store_true',
+        help='write the keys of all authors again, instead of the changed '
+        'ones')
+    name_keys_parser.set_defaults(func=name_keys)
+
+    dedup_parser = subparsers.add_parser(
+        'dedup', help='find possible duplicate authors for review')
+    dedup_parser.add_argument(
+        '--min-score', type=float, default=0.6,
+        help='minimum score (0 to 1) of the candidate pairs')
+    dedup_parser.add_argument(
+        '--max-block-size', type=int, default=1000,
+        help='skip blocks (same last name & initial) larger than this')
+    dedup_parser.set_defaults(func=dedup)
+
+    snapshot_parser = subparsers.add_parser(
+        'snapshot', help='build a columnar snapshot of the database for '
+        'elsametric.analytics (needs numpy)')
+    snapshot_parser.add_argument(
+        '--path', default='snapshot',
+        help='directory of the snapshot (default: %(default)s)')
+    snapshot_parser.add_argument(
+        '--chunk-size', type=int, default=10000,
+        help='number of rows fetched from the database at once')
+    snapshot_parser.set_defaults(func=snapshot)
+
+    indicators_parser = subparsers.add_parser(
+        'indicators', help='compute the field-normalized citation '
+        'indicators of papers & authors from a snapshot (needs scipy)')
+    indicators_parser.add_argument(
+        '--snapshot', default='snapshot',
+        help='directory of the snapshot (default: %(default)s)')
+    indicators_parser.set_defaults(func=indicators)
+
+    export_parser = subparsers.add_parser(
+        'export', help='export the database tables to parquet files '
+        '(needs pyarrow)')
+    export_parser.add_argument(
+        '--path', default='export',
+        help='directory of the exported files (default: %(default)s)')
+    export_parser.add_argument(
+        '--tables', nargs='+', metavar='TABLE',
+        help='tables to export (default: all tables)')
+    export_parser.add_argument(
+        '--chunk-size', type=int, default=50000,
+        help='number of rows fetched & written at once')
+    export_parser.set_defaults(func=export)
+
+    advisor_parser = subparsers.add_parser(
+        'index-advisor', help='explain the canonical analytics & ingestion '
+        'queries and report missing or unused indexes')
+    advisor_parser.add_argument(
+        '--create', action='store_true',
+        help='create the indexes declared in the models but missing in the '
+        'database')
+    advisor_parser.set_defaults(func=index_advisor)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import shutil
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError as e:  # optional dependency
+    raise ImportError(
+        'elsametric.export needs pyarrow: '
+        'pip install "elsametric[export]"') from e
+
+from sqlalchemy import select, Table, types
+from sqlalchemy.engine import Engine
+
+from .models.base import Base, engine as default_engine
+from . import helpers  # noqa: F401 (registers all the tables of the DB)
+
+
+# Tables partitioned by a year, derived from one of their date columns:
+# {table name: date column}. The files of these tables are written to
+# '<table>/year=<year>/' directories (hive-style), readable as one dataset.
+PARTITIONS = {
+    'paper': 'date',
+}
+
+
+def arrow_type(column_type: types.TypeEngine) -> pa.DataType:
+    """Returns the arrow type of an SQLAlchemy column type"""
+
+    if isinstance(column_type, types.BigInteger):
+        return pa.int64()
+    if isinstance(column_type, types.SmallInteger):
+        return pa.int16()
+    if isinstance(column_type, types.Integer):
+        return pa.int32()
+    if isinstance(column_type, types.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, types.DateTime):
+        return pa.timestamp('s')
+    if isinstance(column_type, types.Date):
+        return pa.date32()
+    if isinstance(column_type, types.Float):
+        return pa.float64()
+    if isinstance(column_type, types.Numeric):
+        return pa.decimal128(column_type.precision, column_type.scale)
+    return pa.string()
+
+
+def arrow_schema(table: Table) -> pa.Schema:
+    return pa.schema([
+        pa.field(column.name, arrow_type(column.type), column.nullable)
+        for column in table.columns])
+
+
+class PartitionedWriter:
+    """Writes record batches to one parquet file per partition
+
+    Parameters:
+        path (Path): the directory of the table
+        schema (Schema): the arrow schema of the table
+        column (str): the date column used to partition by year; if
+            None, a single 'part-0.parquet' file is written
+    """
+
+    def __init__(self, path: Path, schema: pa.Schema,
+                 column: Optional[str] = None) -> None:
+        self.path = path
+        self.schema = schema
+        self.column = column
+        self.writers: Dict[str, pq.ParquetWriter] = {}
+
+    def writer(self, partition: str) -> pq.ParquetWriter:
+        if partition not in self.writers:
+            directory = self.path / partition if partition else self.path
+            directory.mkdir(parents=True, exist_ok=True)
+            self.writers[partition] = pq.ParquetWriter(
+                str(directory / 'part-0.parquet'), self.schema)
+        return self.writers[partition]
+
+    def write(self, rows: List[tuple]) -> None:
+        columns = list(zip(*rows))
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type)
+             for values, field in zip(columns, self.schema)],
+            schema=self.schema)
+        if not self.column:
+            self.writer('').write_table(pa.Table.from_batches([batch]))
+            return
+
+        partitions = defaultdict(list)
+        dates = columns[self.schema.get_field_index(self.column)]
+        for i, date in enumerate(dates):
+            year = date.year if date else '__null__'
+            partitions[f'year={year}'].append(i)
+        for partition, indices in partitions.items():
+            self.writer(partition).write_table(
+                pa.Table.from_batches([batch.take(pa.array(indices))]))
+
+    def close(self) -> None:
+        if not self.writers:  # an empty table still gets its schema
+            self.writer('')
+        for writer in self.writers.values():
+            writer.close()
+
+
+def export_table(table: Table, path: Path, engine: Engine,
+                 chunk_size: int = 50000) -> int:
+    """Streams a table to parquet file(s) in the 'path' directory
+
+    The rows are read with a server-side cursor ('stream_results'), in
+    chunks of 'chunk_size', so memory use doesn't depend on the size of
+    the table. Tables in 'PARTITIONS' are partitioned by year.
+
+    Parameters:
+        table (Table): the table to be exported
+        path (Path): the directory of the export; the table's files are
+            written to 'path/<table name>/'
+        engine (Engine): the SQLAlchemy engine of the database
+        chunk_size (int): number of rows fetched & written at once
+
+    Returns:
+        int: the number of exported rows
+    """
+
+    table_path = Path(path) / table.name
+    if table_path.exists():
+        shutil.rmtree(table_path)
+    writer = PartitionedWriter(
+        table_path, arrow_schema(table), PARTITIONS.get(table.name))
+
+    exported = 0
+    query = select([table]).order_by(*table.primary_key.columns)
+    with engine.connect() as connection:
+        result = connection \
+            .execution_options(stream_results=True) \
+            .execute(query)
+        try:
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.write([tuple(row) for row in rows])
+                exported += len(rows)
+        finally:
+            result.close()
+            writer.close()
+    return exported
+
+
+def export_tables(path: Path, tables: Optional[List[str]] = None,
+                  chunk_size: int = 50000,
+                  engine: Optional[Engine] = None) -> Dict[str, int]:
+    """Exports the tables of the database to parquet files
+
+    Parameters:
+        path (Path): the directory of the export
+        tables (list): the names of the tables to be exported (default:
+            all tables)
+        chunk_size (int): number of rows fetched & written at once
+        engine (Engine): the SQLAlchemy engine of the database (default:
+            the engine of 'elsametric.models.base')
+
+    Returns:
+        dict: the number of exported rows of each table
+    """
+
+    engine = engine or default_engine
+    selected = [
+        table for table in Base.metadata.sorted_tables
+        if not tables or table.name in tables]
+    unknown = set(tables or []) - {table.name for table in selected}
+    if unknown:
+        raise ValueError(f'Unknown tables: {", ".join(sorted(unknown))}')
+
+    return {
+        table.name: export_table(table, path, engine, chunk_size)
+        for table in selected}
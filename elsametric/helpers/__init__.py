@@ -1,12 +1,21 @@
 from ..models.associations import Paper_Author
 from ..models.author import Author
+from ..models.author_alias import Author_Alias
+from ..models.author_indicator import Author_Indicator
+from ..models.author_merge_candidate import Author_Merge_Candidate
+from ..models.author_name_key import Author_Name_Key
 from ..models.author_profile import Author_Profile
+from ..models.change_outbox import Change_Outbox
 from ..models.country import Country
 from ..models.department import Department
+from ..models.department_alias import Department_Alias
 from ..models.fund import Fund
 from ..models.institution import Institution
+from ..models.institution_alias import Institution_Alias
 from ..models.keyword_ import Keyword
 from ..models.paper import Paper
+from ..models.paper_indicator import Paper_Indicator
+from ..models.search_document import Search_Document
 from ..models.source import Source
 from ..models.source_metric import Source_Metric
 from ..models.subject import Subject
@@ -0,0 +1,231 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import aliased, Session
+
+from . import (
+    Author,
+    Author_Merge_Candidate,
+    Author_Name_Key,
+    Paper_Author,
+)
+from ..models.associations import Author_Department
+from .author_name_key_process import author_name_key_process
+from ..names import fold, name_keys
+
+
+# Weights of the pair score; the name similarity alone can't pass the default
+# 'min_score', some shared institutions or co-authors are needed as well.
+NAME_WEIGHT = 0.5
+INSTITUTION_WEIGHT = 0.2
+CO_AUTHOR_WEIGHT = 0.3
+
+
+def author_block_key(first: Optional[str], last: Optional[str]) -> str:
+    """Returns the blocking key of an author: 'last|initial'
+
+    This is the 'initial' key of 'elsametric.names', also kept in the
+    'author_name_key' table for all name variants of the authors.
+
+    Parameters:
+        first (str): the first name of the author
+        last (str): the last name of the author
+
+    Returns:
+        str: the normalized last name & first initial, or '' if the
+            author has no last name
+    """
+
+    return name_keys(first, last).get('initial', '')
+
+
+def _chunks(items: List[int], size: int) -> Iterator[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _overlap(a: Set[int], b: Set[int]) -> Tuple[int, float]:
+    # number of shared items & their share of the smaller set
+    shared = len(a & b)
+    if not shared:
+        return 0, 0.0
+    return shared, shared / min(len(a), len(b))
+
+
+def author_pair_score(
+        given_1: str, given_2: str, institutions_1: Set[int],
+        institutions_2: Set[int], co_authors_1: Set[int],
+        co_authors_2: Set[int]) -> Tuple[float, float, int, int]:
+    """Scores a pair of authors with the same blocking key
+
+    Parameters:
+        given_1 (str): the normalized given names of the 1st author
+        given_2 (str): the normalized given names of the 2nd author
+        institutions_1 (set): the institution ids of the 1st author
+        institutions_2 (set): the institution ids of the 2nd author
+        co_authors_1 (set): the co-author ids of the 1st author
+        co_authors_2 (set): the co-author ids of the 2nd author
+
+    Returns:
+        (float, float, int, int): the score, the name score, and the
+            number of shared institutions & co-authors
+    """
+
+    if given_1 and given_2:
+        name_score = SequenceMatcher(None, given_1, given_2).ratio()
+    else:  # only the initials (the blocking key) are known to be the same
+        name_score = 0.5
+    shared_institutions, institution_score = _overlap(
+        institutions_1, institutions_2)
+    shared_co_authors, co_author_score = _overlap(co_authors_1, co_authors_2)
+
+    score = NAME_WEIGHT * name_score + \
+        INSTITUTION_WEIGHT * institution_score + \
+        CO_AUTHOR_WEIGHT * co_author_score
+    return score, name_score, shared_institutions, shared_co_authors
+
+
+def author_dedup_process(
+        db: Session, min_score: float = 0.6, max_block_size: int = 1000,
+        chunk_size: int = 1000) -> int:
+    """Finds possible duplicate authors & adds them to a review table
+
+    Scopus sometimes creates multiple profiles for the same person. This
+    function finds pairs of authors that are likely to be the same and
+    writes them to the 'author_merge_candidate' table, to be reviewed.
+
+    To stay near-linear on large databases, authors are never compared
+    with all other authors:
+        1. authors are grouped into blocks by their normalized last name
+        & first initial (in Latin or Persian script, for any of their
+        name variants), read from the indexed 'author_name_key' table
+        (the keys of authors without keys are written first); blocks
+        with a single author are dropped
+        2. for the blocked authors only, their institutions & co-authors
+        are queried in chunks
+        3. within each block, only the authors that share an institution
+        or a co-author are paired & scored
+        4. pairs scoring at least 'min_score' are added to the table;
+        pending pairs already in the table get the new scores, while
+        reviewed pairs (merged or rejected) are left untouched
+
+    The changes are not committed.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        min_score (float): minimum score of the pairs to be kept, in the
+            range of 0 to 1
+        max_block_size (int): blocks larger than this (very common
+            names) are skipped
+        chunk_size (int): number of authors queried at once
+
+    Returns:
+        int: the number of merge candidates added or updated
+    """
+
+    # 1. blocking by (normalized last name, first initial), from the
+    # 'initial' keys of the name key table; only the blocks with 2 to
+    # 'max_block_size' authors are read
+    author_name_key_process(db, missing_only=True, chunk_size=chunk_size)
+    block_keys = db.query(Author_Name_Key.key) \
+        .filter(Author_Name_Key.kind == 'initial') \
+        .group_by(Author_Name_Key.key) \
+        .having(func.count(func.distinct(Author_Name_Key.author_id))
+                .between(2, max_block_size)) \
+        .subquery()
+    blocks: Dict[str, List[int]] = defaultdict(list)
+    authors = db.query(Author_Name_Key.key, Author_Name_Key.author_id) \
+        .filter(Author_Name_Key.kind == 'initial') \
+        .join(block_keys, block_keys.c.key == Author_Name_Key.key) \
+        .order_by(Author_Name_Key.key, Author_Name_Key.author_id) \
+        .yield_per(chunk_size)
+    for key, author_id in authors:
+        blocks[key].append(author_id)
+
+    # 2. names, institutions & co-authors of the blocked authors
+    author_ids = sorted({
+        author_id for ids in blocks.values() for author_id in ids})
+    given_names: Dict[int, str] = {}
+    institutions: Dict[int, Set[int]] = defaultdict(set)
+    co_authors: Dict[int, Set[int]] = defaultdict(set)
+    paper_author_1 = aliased(Paper_Author)
+    paper_author_2 = aliased(Paper_Author)
+    for chunk in _chunks(author_ids, chunk_size):
+        for author_id, first, middle in db \
+                .query(Author.id, Author.first, Author.middle) \
+                .filter(Author.id.in_(chunk)):
+            given_names[author_id] = fold(f'{first or ""}{middle or ""}')
+
+        for author_id, institution_id in db \
+                .query(Author_Department.c.author_id,
+                       Author_Department.c.institution_id) \
+                .filter(Author_Department.c.author_id.in_(chunk)):
+            institutions[author_id].add(institution_id)
+
+        for author_id, co_author_id in db \
+                .query(paper_author_1.author_id, paper_author_2.author_id) \
+                .join(paper_author_2,
+                      paper_author_1.paper_id == paper_author_2.paper_id) \
+                .filter(paper_author_1.author_id.in_(chunk)) \
+                .filter(paper_author_2.author_id != paper_author_1.author_id):
+            co_authors[author_id].add(co_author_id)
+
+    # 3. pairing (through shared institutions & co-authors) & scoring
+    candidates: Dict[Tuple[int, int], dict] = {}
+    for key, ids in blocks.items():
+        postings: Dict[Tuple[str, int], Set[int]] = defaultdict(set)
+        for author_id in ids:
+            for institution_id in institutions[author_id]:
+                postings[('institution', institution_id)].add(author_id)
+            for co_author_id in co_authors[author_id]:
+                postings[('co-author', co_author_id)].add(author_id)
+
+        pairs = set()
+        for members in postings.values():
+            if len(members) > 1:
+                pairs.update(combinations(sorted(members), 2))
+
+        for author_id_1, author_id_2 in pairs:
+            score, name_score, shared_institutions, shared_co_authors = \
+                author_pair_score(
+                    given_names[author_id_1], given_names[author_id_2],
+                    institutions[author_id_1], institutions[author_id_2],
+                    co_authors[author_id_1], co_authors[author_id_2])
+            if score < min_score:
+                continue
+            candidates[(author_id_1, author_id_2)] = {
+                'author_id_1': author_id_1,
+                'author_id_2': author_id_2,
+                'block': key,
+                'score': round(score, 4),
+                'name_score': round(name_score, 4),
+                'shared_institutions': shared_institutions,
+                'shared_co_authors': shared_co_authors,
+            }
+
+    # 4. writing the candidates to the review table; only the rows of
+    # the new pairs are queried (in chunks), not the whole table
+    updates = []
+    pair_columns = tuple_(
+        Author_Merge_Candidate.author_id_1, Author_Merge_Candidate.author_id_2)
+    for chunk in _chunks(sorted(candidates), chunk_size):
+        existing = db.query(
+            Author_Merge_Candidate.id, Author_Merge_Candidate.author_id_1,
+            Author_Merge_Candidate.author_id_2,
+            Author_Merge_Candidate.status) \
+            .filter(pair_columns.in_(chunk))
+        for candidate_id, author_id_1, author_id_2, status in existing:
+            candidate = candidates.pop((author_id_1, author_id_2))
+            if status == 'pending':
+                updates.append({'id': candidate_id, **candidate})
+    inserts = list(candidates.values())
+
+    for chunk in _chunks(inserts, chunk_size):
+        db.bulk_insert_mappings(Author_Merge_Candidate, chunk)
+    for chunk in _chunks(updates, chunk_size):
+        db.bulk_update_mappings(Author_Merge_Candidate, chunk)
+
+    return len(inserts) + len(updates)
@@ -0,0 +1,142 @@
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from . import Author, Author_Name_Key
+from ..names import KINDS, name_keys
+
+
+# The columns of 'author' the keys are made of; changes to any of them
+# (e.g. in the change log) need new keys
+NAME_COLUMNS = {
+    'first', 'middle', 'last', 'first_pref', 'middle_pref', 'last_pref',
+    'first_fa', 'last_fa'}
+KEY_LENGTH = Author_Name_Key.__table__.c.key.type.length
+
+
+def author_name_keys(
+        first: Optional[str], middle: Optional[str], last: Optional[str],
+        first_pref: Optional[str] = None, middle_pref: Optional[str] = None,
+        last_pref: Optional[str] = None, first_fa: Optional[str] = None,
+        last_fa: Optional[str] = None) -> Set[Tuple[str, str]]:
+    """Returns the keys of all name variants of an author
+
+    The keys of the Scopus name, the preferred name & the Persian name
+    are merged, so an author is found by any of them.
+
+    Returns:
+        set: (kind, key) tuples
+    """
+
+    keys = set()
+    for names in ((first, last, middle), (first_pref, last_pref, middle_pref),
+                  (first_fa, last_fa, None)):
+        keys.update(
+            (kind, key[:KEY_LENGTH])
+            for kind, key in name_keys(*names).items())
+    return keys
+
+
+def _id_chunks(db: Session, author_ids: Optional[Iterable[int]],
+               missing_only: bool, chunk_size: int) -> Iterator[List[int]]:
+    if author_ids is not None:
+        author_ids = sorted(set(author_ids))
+        for i in range(0, len(author_ids), chunk_size):
+            yield author_ids[i:i + chunk_size]
+        return
+
+    # all authors (or the ones without keys), in keyset-paginated chunks
+    query = db.query(Author.id).order_by(Author.id)
+    if missing_only:
+        query = query \
+            .outerjoin(Author_Name_Key,
+                       Author_Name_Key.author_id == Author.id) \
+            .filter(Author_Name_Key.author_id.is_(None))
+    last_id = None
+    while True:
+        chunk_query = query if last_id is None \
+            else query.filter(Author.id > last_id)
+        chunk = [row[0] for row in chunk_query.limit(chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+
+def author_name_key_process(
+        db: Session, author_ids: Optional[Iterable[int]] = None,
+        missing_only: bool = False, chunk_size: int = 1000) -> int:
+    """Writes the normalized name keys of authors to 'author_name_key'
+
+    The keys (see 'elsametric.names') turn the lookup of an author by
+    name, in Latin or Persian script, into an indexed equality lookup
+    ('author_name_lookup'). The keys of each author are replaced, so the
+    function can be run again for authors whose names changed (e.g. the
+    authors updated in the change log); the keys of ids that are no
+    longer in the 'author' table are removed.
+
+    The changes are not committed.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        author_ids (iterable): the ids of the authors (default: all)
+        missing_only (bool): only write the keys of the authors without
+            any keys (ignored if 'author_ids' is given)
+        chunk_size (int): number of authors processed at once
+
+    Returns:
+        int: the number of authors whose keys were written
+    """
+
+    table = Author_Name_Key.__table__
+    columns = [
+        Author.first, Author.middle, Author.last, Author.first_pref,
+        Author.middle_pref, Author.last_pref, Author.first_fa,
+        Author.last_fa]
+    keyed = 0
+    for chunk in _id_chunks(db, author_ids, missing_only, chunk_size):
+        rows = [
+            {'author_id': author_id, 'kind': kind, 'key': key}
+            for author_id, *names in db.query(Author.id, *columns)
+            .filter(Author.id.in_(chunk))
+            for kind, key in sorted(author_name_keys(*names))]
+        db.execute(table.delete().where(table.c.author_id.in_(chunk)))
+        if rows:
+            db.execute(table.insert(), rows)
+        keyed += len({row['author_id'] for row in rows})
+    return keyed
+
+
+def author_name_lookup(
+        db: Session, first: Optional[str], last: Optional[str],
+        middle: Optional[str] = None) -> List[Tuple[int, str]]:
+    """Finds the authors with the same name keys as a name
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        first (str): the first name (Latin or Persian script)
+        last (str): the last name
+        middle (str): the middle name
+
+    Returns:
+        list: (author id, kind of the strongest key matched) tuples,
+            strongest matches ('full', then 'initial', then 'translit')
+            first
+    """
+
+    keys = name_keys(first, last, middle)
+    if not keys:
+        return []
+    matches = {}
+    for author_id, kind in db \
+            .query(Author_Name_Key.author_id, Author_Name_Key.kind) \
+            .filter(or_(*(
+                and_(Author_Name_Key.kind == kind,
+                     Author_Name_Key.key == key[:KEY_LENGTH])
+                for kind, key in keys.items()))):
+        if author_id not in matches or \
+                KINDS.index(kind) < KINDS.index(matches[author_id]):
+            matches[author_id] = kind
+    return sorted(matches.items(),
+                  key=lambda match: (KINDS.index(match[1]), match[0]))
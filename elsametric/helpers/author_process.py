@@ -17,7 +17,9 @@ from . import (
     Subject
 )
 
+from ..models.alias_map import ALIASES
 from .helpers import get_key
+from .session import lookup
 from .institution_process import institution_process
 
 
@@ -64,6 +66,8 @@ def author_process(db: Session, data: dict) -> List[Tuple[int, Author]]:
             author_id_scp = int(get_key(auth, 'authid'))
         except TypeError:  # Scopus Author ID not found: go to next author.
             continue
+        # Duplicate Scopus profiles are resolved to their canonical author.
+        author_id_scp = ALIASES.resolve_author(author_id_scp)
 
         # In some cases, the name of an author is repeated more than once
         # in the paper data dictionary. The 'author_ids' variable is used
@@ -78,9 +82,7 @@ def author_process(db: Session, data: dict) -> List[Tuple[int, Author]]:
         except TypeError:  # The 'author_no' column cannot have null values.
             author_no = 0
 
-        author: Optional[Author] = db.query(Author) \
-            .filter(Author.id_scp == author_id_scp) \
-            .first()
+        author: Optional[Author] = lookup(db, Author, id_scp=author_id_scp)
         if not author:  # 'author' not in database, let's create one.
             author = Author(
                 id_scp=author_id_scp,
@@ -105,7 +107,8 @@ def author_process(db: Session, data: dict) -> List[Tuple[int, Author]]:
             institution, department = institution_process(
                 db, data, int(inst_id), new_institutions)
 
-            if department:
+            # Aliases can resolve two affiliations to the same department.
+            if department and department not in author.departments:
                 author.departments.append(department)
             if institution:
                 new_institutions.add(institution)
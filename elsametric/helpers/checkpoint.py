@@ -0,0 +1,81 @@
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class Checkpoint:
+    """Durable progress record of a (possibly long) populate run
+
+    The populate process is made of several sections (countries,
+    subjects, journals, ...) and each section is either a .csv file that
+    is read row-by-row, or a directory of JSON files. A Checkpoint keeps
+    the following info for every section, after each successful commit
+    to the database:
+        done (bool): whether the section was processed completely
+        offset (int): the number of rows of the .csv file that are
+            already committed to the database
+        last_file (str): the name of the last file of the directory that
+            was committed to the database
+
+    The state is written to 'path' as a JSON file. Writes are atomic
+    (write to a temp file, fsync, rename) so that a crash in the middle
+    of a save never leaves a corrupt checkpoint behind. A Checkpoint can
+    be shared by stages running in separate threads.
+
+    Parameters:
+        path (Path): the path to the JSON file holding the checkpoint
+        resume (bool): whether to load the previous state from 'path'
+            or start from scratch
+    """
+
+    def __init__(self, path: Path, resume: bool = False) -> None:
+        self.path = Path(path)
+        self.state = {}
+        self._lock = threading.RLock()
+        if resume and self.path.is_file():
+            with io.open(self.path, 'r', encoding='utf8') as checkpoint_file:
+                self.state = json.load(checkpoint_file)
+
+    def __repr__(self) -> str:
+        return f'Checkpoint: {self.path}'
+
+    def _section(self, section: str) -> dict:
+        with self._lock:
+            return self.state.setdefault(section, {})
+
+    def is_done(self, section: str) -> bool:
+        return self._section(section).get('done', False)
+
+    def mark_done(self, section: str) -> None:
+        with self._lock:
+            self._section(section)['done'] = True
+            self.save()
+
+    def get_offset(self, section: str) -> int:
+        return self._section(section).get('offset', 0)
+
+    def set_offset(self, section: str, offset: int) -> None:
+        with self._lock:
+            self._section(section)['offset'] = offset
+            self.save()
+
+    def get_last_file(self, section: str) -> Optional[str]:
+        return self._section(section).get('last_file')
+
+    def set_last_file(self, section: str, file_name: str) -> None:
+        with self._lock:
+            self._section(section)['last_file'] = file_name
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f'{self.path.name}.tmp')
+            with io.open(temp_path, 'w', encoding='utf8') as checkpoint_file:
+                json.dump(self.state, checkpoint_file, indent=4)
+                checkpoint_file.flush()
+                os.fsync(checkpoint_file.fileno())
+            os.replace(temp_path, self.path)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Iterator, List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -23,7 +23,8 @@ from . import (
 
 def ext_source_metric_process(
         db: Session, file_path: Path, file_year: int,
-        encoding: str = 'utf-8-sig') -> Iterator[Source]:
+        encoding: str = 'utf-8-sig',
+        offset: int = 0) -> Iterator[Tuple[int, Source]]:
 
     subjects: List[Subject] = db.query(Subject).all()
     # Turn 'subjects' which is a list of 'Subject' objects, into a dict:
@@ -40,8 +41,9 @@ def ext_source_metric_process(
         'percent_cited': 'Percent Cited',
     }
 
-    rows = get_row(file_path, encoding)
-    for row in rows:
+    # 'offset' rows are already committed to the database by a previous run.
+    rows = get_row(file_path, encoding, offset=offset)
+    for row_no, row in enumerate(rows, start=offset + 1):
         nullify(row)
         try:
             source_id_scp = int(row['id_scp'])  # possible TypeError
@@ -103,4 +105,4 @@ def ext_source_metric_process(
                     Source_Metric(
                         type=metric, value=metric_value, year=file_year))
 
-        yield source
+        yield row_no, source
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Iterator, List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -23,7 +23,8 @@ from . import (
 
 def ext_source_process(
         db: Session, file_path: Path, src_type: Optional[str] = None,
-        encoding: str = 'utf-8-sig') -> Iterator[Source]:
+        encoding: str = 'utf-8-sig',
+        offset: int = 0) -> Iterator[Tuple[int, Source]]:
     """Imports a list of sources to database
 
     Reads a .csv file and creates 'Source' objects which represent
@@ -57,9 +58,12 @@ def ext_source_process(
             chunks, since they are very large,
         batch_no (int): the number of the chunk to be processed
         encoding (str): encoding to be used when reading the .csv file
+        offset (int): the number of rows of the .csv file to skip, which
+            are already committed to the database by a previous run
 
-    Returns:
-        list: a list of 'Source' objects to be added to the database
+    Yields:
+        tuple: in the format (row number, Source), where 'row number' is
+            the count of .csv rows read so far (including 'offset')
     """
 
     subjects: List[Subject] = db.query(Subject).all()
@@ -67,8 +71,8 @@ def ext_source_process(
     # {asjc1: Subject1, asjc2: Subject2, ...}
     subjects = {subject.asjc: subject for subject in subjects}
 
-    rows = get_row(file_path, encoding)
-    for row in rows:
+    rows = get_row(file_path, encoding, offset=offset)
+    for row_no, row in enumerate(rows, start=offset + 1):
         nullify(row)
         try:
             source_id_scp = int(row['id_scp'])  # possible TypeError
@@ -110,4 +114,4 @@ def ext_source_process(
             except (ValueError, KeyError):
                 continue
 
-        yield source
+        yield row_no, source
@@ -18,6 +18,7 @@ from . import (
 )
 
 from .helpers import get_key
+from .session import lookup
 
 
 def fund_process(db: Session, data: dict) -> Optional[Fund]:
@@ -59,9 +60,7 @@ def fund_process(db: Session, data: dict) -> Optional[Fund]:
         # Both 'fund_id_scp' & 'agency' are 'NOT AVAILABLE'. Can't go on.
         return fund
 
-    fund = db.query(Fund) \
-        .filter(Fund.id_scp == fund_id_scp, Fund.agency == agency) \
-        .first()
+    fund = lookup(db, Fund, id_scp=fund_id_scp, agency=agency)
 
     if not fund:
         fund = Fund(
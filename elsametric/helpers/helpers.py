@@ -1,5 +1,6 @@
 import io
 import csv
+from itertools import islice
 from pathlib import Path
 from typing import Iterator
 
@@ -105,7 +106,7 @@ def data_inspector(data: dict) -> list:
 
 
 def get_row(file_path: Path, encoding: str = 'utf-8-sig',
-            delimiter: str = ',') -> Iterator[dict]:
+            delimiter: str = ',', offset: int = 0) -> Iterator[dict]:
     """Yields a row from a .csv file
 
     This simple function is used to yield a .csv file in 'file_path',
@@ -115,6 +116,8 @@ def get_row(file_path: Path, encoding: str = 'utf-8-sig',
         file_path (Path): the path to the .csv file
         encoding (str): encoding to be used when reading the .csv file
         delimiter (str): the delimiter used in the .csv file
+        offset (int): the number of rows (excluding the header row) to
+            skip before yielding; used to resume an interrupted import
 
     Yields:
         row: a row of the .csv file as a dictionary
@@ -122,7 +125,7 @@ def get_row(file_path: Path, encoding: str = 'utf-8-sig',
 
     with io.open(file_path, 'r', encoding=encoding) as csv_file:
         reader = csv.DictReader(csv_file, delimiter=delimiter)
-        for row in reader:
+        for row in islice(reader, offset, None):
             yield row
 
 
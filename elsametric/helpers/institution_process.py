@@ -17,7 +17,9 @@ from . import (
     Subject
 )
 
+from ..models.alias_map import ALIASES
 from .helpers import country_names, get_key
+from .session import lookup
 
 
 def institution_process(
@@ -72,10 +74,11 @@ def institution_process(
                 raise ValueError
         except (TypeError, ValueError):
             continue
+        # Aliases of an institution are resolved to the canonical institution.
+        institution_id_scp = ALIASES.resolve_institution(institution_id_scp)
 
-        institution: Optional[Institution] = db.query(Institution) \
-            .filter(Institution.id_scp == institution_id_scp) \
-            .first()
+        institution: Optional[Institution] = lookup(
+            db, Institution, id_scp=institution_id_scp)
         if institution:  # 'institution' found in database.
             # It should already have an 'Undefined' department.
             department: Optional[Department] = db.query(Department) \
@@ -87,7 +90,8 @@ def institution_process(
             # 'new_institutions', which contains institutions that are going
             # to be added to the database (but not added yet).
             institution = next(
-                filter(lambda inst: inst.id_scp == inst_id, new_institutions),
+                filter(lambda inst: inst.id_scp == institution_id_scp,
+                       new_institutions),
                 None
             )
             if institution:  # 'institution' found in 'new_institutions' set
@@ -105,9 +109,7 @@ def institution_process(
                 country_name = country_names(
                     get_key(affil, 'affiliation-country'))
                 if country_name:
-                    country = db.query(Country) \
-                        .filter(Country.name == country_name) \
-                        .first()
+                    country = lookup(db, Country, name=country_name)
                     institution.country = country  # either found or None
         if not department:
             # Either an institution already in 'new_institutions' set or
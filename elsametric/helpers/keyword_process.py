@@ -18,6 +18,7 @@ from . import (
 )
 
 from .helpers import get_key, strip
+from .session import lookup
 
 
 def keyword_process(db: Session,
@@ -58,9 +59,8 @@ def keyword_process(db: Session,
 
         # At this point, all keywords are stripped and unique within the paper.
         for raw_keyword in keywords:
-            keyword: Optional[Keyword] = db.query(Keyword) \
-                .filter(Keyword.keyword == raw_keyword) \
-                .first()
+            keyword: Optional[Keyword] = lookup(
+                db, Keyword, keyword=raw_keyword)
             if not keyword:  # Keyword not in database, let's add it.
                 keyword = Keyword(keyword=raw_keyword)
             keywords_list.append(keyword)
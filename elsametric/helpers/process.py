@@ -4,3 +4,5 @@ from .ext_source_process import ext_source_process
 from .ext_source_metric_process import ext_source_metric_process
 from .ext_faculty_process import ext_faculty_process
 from .file_process import file_process
+from .author_name_key_process import author_name_key_process
+from .author_dedup_process import author_dedup_process
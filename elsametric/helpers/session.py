@@ -0,0 +1,204 @@
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+# The natural keys of the entities that are looked up by ingestion (e.g. an
+# author by its Scopus ID) and cached as {(table, values): id}
+NATURAL_KEYS = {
+    'author': ('id_scp',),
+    'country': ('name',),
+    'fund': ('id_scp', 'agency'),
+    'institution': ('id_scp',),
+    'keyword': ('keyword',),
+    'source': ('id_scp',),
+}
+# The key of the EntityCache of a session in 'db.info'
+CACHE_KEY = 'entity_cache'
+
+CacheKey = Tuple[str, tuple]
+
+
+def peak_memory() -> Optional[int]:
+    """Returns the high-water mark of the memory of the process (its peak
+    resident set size) in bytes, or None if it is not available"""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class EntityCache:
+    """Bounded map of the natural keys of entities to their primary keys
+
+    Only the ids are kept (not the objects), so the cache survives
+    'expunge_all' and never keeps the objects of a session alive; a hit
+    is loaded by its primary key (or found in the identity map). The
+    least recently used keys are evicted after 'max_size' keys.
+
+    Parameters:
+        max_size (int): the maximum number of keys
+    """
+
+    def __init__(self, max_size: int = 100_000) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: 'OrderedDict[CacheKey, int]' = OrderedDict()
+
+    def __repr__(self) -> str:
+        return (f'EntityCache: {len(self._items)}/{self.max_size} keys, '
+                f'{self.hits} hits, {self.misses} misses')
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: CacheKey) -> Optional[int]:
+        id_ = self._items.get(key)
+        if id_ is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return id_
+
+    def set(self, key: CacheKey, id_: int) -> None:
+        self._items[key] = id_
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def discard(self, key: CacheKey) -> None:
+        self._items.pop(key, None)
+
+    def clear(self) -> None:
+        self._items.clear()
+
+
+def lookup(db: Session, model, **values):
+    """Returns the object of 'model' with some natural key values, or None
+
+    The same as 'db.query(model).filter_by(**values).first()', but if
+    the session is managed by an IngestSession, the id of the object is
+    read from its EntityCache first.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        model: a mapped class in 'NATURAL_KEYS'
+        values: the natural key columns & their values
+
+    Returns:
+        object: the object, or None if not found
+    """
+
+    cache: Optional[EntityCache] = db.info.get(CACHE_KEY)
+    if cache is None:
+        return db.query(model).filter_by(**values).first()
+
+    table = model.__tablename__
+    key = (table, tuple(values[column] for column in NATURAL_KEYS[table]))
+    id_ = cache.get(key)
+    if id_ is not None:
+        obj = db.query(model).get(id_)
+        if obj is not None:
+            return obj
+        cache.discard(key)  # e.g. removed by another process
+    return db.query(model).filter_by(**values).first()
+
+
+class IngestSession:
+    """A session for long ingestion runs, with a flat memory use
+
+    A single session used for a whole run keeps every object it ever
+    loaded or added in its identity map, so the memory only grows. After
+    every 'expunge_every' commits, the session is emptied (expunge_all);
+    the natural keys (see 'NATURAL_KEYS') of the objects it held are
+    kept in a bounded EntityCache, so the next lookups of the same
+    authors, keywords, ... (see 'lookup') are primary key loads instead
+    of queries by their natural keys.
+
+    The keys of a transaction are only cached after it is committed, so
+    the cache never has the ids of rolled back rows.
+
+    Parameters:
+        session_factory (callable): creates the session (e.g.
+            'SessionLocal')
+        expunge_every (int): number of commits between the expunges
+        cache (EntityCache): the cache of the natural keys (default: a
+            new EntityCache)
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 expunge_every: int = 1,
+                 cache: Optional[EntityCache] = None) -> None:
+        self.db = session_factory()
+        self.expunge_every = max(expunge_every, 1)
+        self.cache = cache if cache is not None else EntityCache()
+        self.commits = 0
+        self.db.info[CACHE_KEY] = self.cache
+
+    def __repr__(self) -> str:
+        return f'IngestSession: {len(self.db.identity_map)} objects, ' \
+            f'{self.cache}'
+
+    def __enter__(self) -> 'IngestSession':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _natural_keys(self) -> Dict[CacheKey, int]:
+        # the natural keys of the flushed objects of the identity map; read
+        # from the states' loaded values, so nothing is loaded
+        keys = {}
+        for obj in self.db.identity_map.values():
+            columns = NATURAL_KEYS.get(getattr(obj, '__tablename__', None))
+            if not columns:
+                continue
+            loaded = inspect(obj).dict
+            values = tuple(loaded.get(column) for column in columns)
+            if loaded.get('id') is not None and None not in values:
+                keys[(obj.__tablename__, values)] = loaded['id']
+        return keys
+
+    def commit(self) -> None:
+        """Commits the transaction, caches the natural keys of its objects
+        and expunges them (every 'expunge_every' commits)"""
+
+        self.db.flush()
+        keys = self._natural_keys()
+        self.db.commit()
+        for key, id_ in keys.items():
+            self.cache.set(key, id_)
+        self.commits += 1
+        if self.commits % self.expunge_every == 0:
+            self.db.expunge_all()
+
+    def rollback(self) -> None:
+        self.db.rollback()
+
+    def close(self) -> None:
+        self.db.info.pop(CACHE_KEY, None)
+        self.db.close()
+
+    def stats(self) -> dict:
+        """Returns the size of the session & the cache, and the peak
+        memory of the process"""
+
+        return {
+            'objects': len(self.db.identity_map),
+            'cached_keys': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses,
+            'peak_memory': peak_memory(),
+        }
@@ -18,6 +18,7 @@ from . import (
 )
 
 from .helpers import get_key, strip
+from .session import lookup
 
 
 def source_process(db: Session, data: dict) -> Optional[Source]:
@@ -42,9 +43,7 @@ def source_process(db: Session, data: dict) -> Optional[Source]:
     except TypeError:  # Data doesn't have Scopus Source ID: can't go on.
         return source
 
-    source = db.query(Source) \
-        .filter(Source.id_scp == source_id_scp) \
-        .first()
+    source = lookup(db, Source, id_scp=source_id_scp)
     if not source:  # 'source' not in database, let's create it.
         # The 'default' argument for the 'get_key' function is because of the
         # database's 'not null' constraint on certain columns.
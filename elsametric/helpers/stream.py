@@ -0,0 +1,103 @@
+from typing import Any, Callable, Iterator, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Query, Session
+
+
+def _release(db: Session, rows: List[Any]) -> None:
+    # expunges the mapped objects of the rows, so the identity map doesn't
+    # keep them (and their loaded relationships) alive
+    for row in rows:
+        items = row if isinstance(row, tuple) else (row,)
+        for item in items:
+            state = inspect(item, raiseerr=False)
+            if getattr(state, 'session_id', None) == db.hash_key:
+                db.expunge(item)
+
+
+def _cursor_rows(db: Session, query: Query, chunk_size: int,
+                 expunge: bool) -> Iterator[Any]:
+    chunk = []
+    query = query \
+        .execution_options(stream_results=True) \
+        .yield_per(chunk_size)
+    for row in query:
+        yield row
+        if expunge:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                _release(db, chunk)
+                chunk = []
+
+
+def _keyset_rows(db: Session, query: Query, chunk_size: int, expunge: bool,
+                 key) -> Iterator[Any]:
+    last = None
+    while True:
+        page = query if last is None else query.filter(key > last)
+        rows = page.order_by(None).order_by(key).limit(chunk_size).all()
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = getattr(rows[-1], key.key)
+        if expunge:
+            _release(db, rows)
+
+
+def stream_query(db: Session, query: Query, chunk_size: int = 1000,
+                 method: str = 'auto', key=None,
+                 record: Optional[Callable] = None,
+                 expunge: bool = True) -> Iterator[Any]:
+    """Yields the results of a query in constant memory
+
+    Unlike 'query.all()', the results are never materialized at once:
+        - 'cursor': a server-side cursor ('stream_results') is read in
+        chunks of 'chunk_size' rows ('yield_per')
+        - 'keyset': pages of 'chunk_size' rows are queried, each starting
+        after the last 'key' of the previous page; for drivers without
+        server-side cursors (e.g. mysql-connector), or queries that
+        can't use 'yield_per' (e.g. joined eager loading)
+        - 'auto': 'cursor' if the DB driver supports it, else 'keyset'
+
+    Querying columns (e.g. db.query(Author.id, Author.last)) instead of
+    mapped classes yields lightweight named tuples. If 'record' is
+    given (e.g. a NamedTuple class), the columns of each row are passed
+    to it as positional arguments. Mapped objects are expunged from the
+    session once their chunk is done, so use (or re-query) them before
+    moving past the next 'chunk_size' rows.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        query (Query): the query to be streamed
+        chunk_size (int): number of rows fetched at once
+        method (str): one of 'auto', 'cursor', or 'keyset'
+        key: the unique, sortable column used by 'keyset' (default: the
+            'id' of the query's first entity); it must be one of the
+            selected columns, and the query's order is replaced by it
+        record (callable): builds the yielded objects from the rows of
+            a column query
+        expunge (bool): whether to expunge mapped objects as it goes
+
+    Yields:
+        row: a row (or record) of the query's results
+    """
+
+    if method == 'auto':
+        dialect = db.get_bind().dialect
+        method = 'cursor' if dialect.supports_server_side_cursors \
+            else 'keyset'
+
+    if method == 'cursor':
+        rows = _cursor_rows(db, query, chunk_size, expunge)
+    elif method == 'keyset':
+        key = key if key is not None \
+            else query.column_descriptions[0]['entity'].id
+        rows = _keyset_rows(db, query, chunk_size, expunge, key)
+    else:
+        raise ValueError(f'Invalid streaming method: {method}')
+
+    if not record:
+        yield from rows
+        return
+    for row in rows:
+        yield record(*row)
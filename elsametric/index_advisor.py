@@ -0,0 +1,243 @@
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import func, inspect
+from sqlalchemy.orm import Query, Session
+
+from .models.base import Base
+from .models.associations import Author_Department, Paper_Author
+from .models.author import Author
+from .models.institution import Institution
+from .models.paper import Paper
+from .models.source import Source
+from .models.source_metric import Source_Metric
+from . import helpers  # noqa: F401 (registers all the tables of the DB)
+
+
+class Access(NamedTuple):
+    """A table access in a query plan; 'index' is None for full scans"""
+
+    table: str
+    index: Optional[str]
+
+
+def canonical_queries(db: Session) -> Dict[str, Query]:
+    """Returns the canonical analytics & ingestion queries
+
+    The queries are built with the values of existing rows (e.g. the
+    first author), so that their plans are the ones of real lookups.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+
+    Returns:
+        dict: the queries, by name
+    """
+
+    author = db.query(Author.id, Author.id_scp).first()
+    members = db.query(Author_Department).first()
+    institution = db.query(Institution).first()
+    paper = db.query(Paper.id_scp, Paper.source_id, Paper.date) \
+        .filter(Paper.source_id != None).first()
+    publisher = db.query(Source.publisher) \
+        .filter(Source.publisher != None).first()
+    if not (author and members and institution and paper and publisher):
+        raise ValueError('The database has no data to build the queries')
+
+    year = paper.date.year
+    queries = {
+        # analytics
+        'author papers': db.query(Paper_Author.paper_id)
+        .filter(Paper_Author.author_id == author.id),
+        'department authors': db.query(Author_Department.c.author_id)
+        .filter(Author_Department.c.department_id == members.department_id)
+        .filter(Author_Department.c.institution_id == members.institution_id),
+        'institution papers trend': institution._query(
+            Paper.date, func.count(Paper.id)).group_by(Paper.date),
+        'source papers in a year': db.query(Paper.id)
+        .filter(Paper.source_id == paper.source_id)
+        .filter(Paper.in_year(year)),
+        'source percentile': db.query(Source_Metric.value)
+        .filter(Source_Metric.source_id == paper.source_id)
+        .filter(Source_Metric.year == year)
+        .filter(Source_Metric.type == 'Percentile'),
+        # ingestion
+        'author by scopus id': db.query(Author.id)
+        .filter(Author.id_scp == author.id_scp),
+        'paper by scopus id': db.query(Paper.id)
+        .filter(Paper.id_scp == paper.id_scp),
+        'publisher country': db.query(Source.country_id)
+        .filter(Source.publisher == publisher.publisher)
+        .filter(Source.country_id != None)
+        .limit(1),
+    }
+    return queries
+
+
+def _postgresql_plan(db: Session, sql: str, params) -> List[Access]:
+    plan = db.connection() \
+        .execute(f'EXPLAIN (FORMAT JSON) {sql}', params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    tables = {
+        index['name']: table
+        for table in Base.metadata.tables
+        for index in inspect(db.get_bind()).get_indexes(table)}
+
+    accesses = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', []))
+        if node['Node Type'] == 'Seq Scan':
+            accesses.append(Access(node['Relation Name'], None))
+        elif 'Index Name' in node:
+            index = node['Index Name']
+            table = node.get('Relation Name') or tables.get(index, '?')
+            accesses.append(Access(table, index))
+    return accesses
+
+
+def _mysql_plan(db: Session, sql: str, params) -> List[Access]:
+    rows = db.connection().execute(f'EXPLAIN {sql}', params)
+    return [
+        Access(row['table'], None if row['type'] == 'ALL' else row['key'])
+        for row in rows if row['table'] and row['type']]
+
+
+def _sqlite_plan(db: Session, sql: str, params) -> List[Access]:
+    accesses = []
+    rows = db.connection().execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    for row in rows:
+        match = re.match(
+            r'(SCAN|SEARCH) (?:TABLE )?(\w+)(?:.*? INDEX (\w+))?',
+            row[-1])
+        if match:  # a SCAN reads the whole table (or index)
+            index = match.group(3) if match.group(1) == 'SEARCH' else None
+            accesses.append(Access(match.group(2), index))
+    return accesses
+
+
+PLANS = {
+    'postgresql': _postgresql_plan,
+    'mysql': _mysql_plan,
+    'sqlite': _sqlite_plan,
+}
+
+
+def explain(db: Session, query: Query) -> List[Access]:
+    """Returns the table accesses in the plan of a query
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        query (Query): the query to be explained (not executed)
+
+    Returns:
+        list: the Access tuples of the plan
+    """
+
+    dialect = db.get_bind().dialect
+    if dialect.name not in PLANS:
+        raise ValueError(f'Unsupported database: {dialect.name}')
+    compiled = query.statement.compile(dialect=dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    # the SQL is executed as is (not as a 'text' construct, which would
+    # parse it for bind parameters)
+    return PLANS[dialect.name](db, str(compiled), params)
+
+
+def declared_indexes() -> Dict[str, str]:
+    """Returns {index name: table name} of the indexes of the models"""
+
+    return {
+        index.name: table.name
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes}
+
+
+def advise(db: Session, create: bool = False) -> dict:
+    """Explains the canonical queries & compares the indexes of the models
+    with the ones of the database
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        create (bool): whether to create the missing indexes (e.g. in a
+            database created before they were declared)
+
+    Returns:
+        dict: the report, with the following keys:
+            'plans': {query name: list of Access tuples}
+            'full_scans': {query name: list of fully scanned tables}
+            'missing': {index name: table} declared, but not in database
+            'created': list of the created indexes (if 'create')
+            'unused': {index name: table} declared, but not used by any
+            canonical query
+    """
+
+    declared = declared_indexes()
+    inspector = inspect(db.get_bind())
+    existing = {
+        index['name']
+        for table in set(declared.values())
+        for index in inspector.get_indexes(table)}
+    missing = {
+        name: table for name, table in declared.items()
+        if name not in existing}
+
+    created = []
+    if create:
+        for name, table in missing.items():
+            index = next(
+                index for index in Base.metadata.tables[table].indexes
+                if index.name == name)
+            index.create(db.get_bind())
+            created.append(name)
+        missing = {}
+
+    plans = {
+        name: explain(db, query)
+        for name, query in canonical_queries(db).items()}
+    used = {access.index for accesses in plans.values() for access in accesses}
+    return {
+        'plans': plans,
+        'full_scans': {
+            name: sorted({access.table for access in accesses
+                          if access.index is None})
+            for name, accesses in plans.items()
+            if any(access.index is None for access in accesses)},
+        'missing': missing,
+        'created': created,
+        'unused': {
+            name: table for name, table in declared.items()
+            if name not in used and name not in missing},
+    }
+
+
+def print_report(report: dict) -> None:
+    """Prints the report of 'advise'"""
+
+    print('Query plans:')
+    for name, accesses in report['plans'].items():
+        plan = ', '.join(
+            f'{access.table} ({access.index or "FULL SCAN"})'
+            for access in accesses)
+        print(f'    {name}: {plan}')
+
+    if report['full_scans']:
+        print('Full scans (expected only for small tables, where the '
+              'planner prefers them):')
+        for name, tables in report['full_scans'].items():
+            print(f'    {name}: {", ".join(tables)}')
+    for name in report['created']:
+        print(f'Created index: {name}')
+    if report['missing']:
+        print('Missing indexes (run with --create to create them):')
+        for name, table in report['missing'].items():
+            print(f'    {table}.{name}')
+    if report['unused']:
+        print('Indexes unused by the canonical queries:')
+        for name, table in report['unused'].items():
+            print(f'    {table}.{name}')
@@ -0,0 +1,148 @@
+from threading import Lock
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from .base import SessionLocal
+from .author import Author
+from .author_alias import Author_Alias
+from .institution import Institution
+from .institution_alias import Institution_Alias
+
+
+class AliasMap:
+    """In-memory map of alias Scopus IDs to their canonical Scopus IDs
+
+    Several Scopus IDs can belong to the same author or institution
+    (e.g. duplicate profiles). The alias tables record them, and this
+    map resolves any of them to the canonical entity's Scopus ID with a
+    dict lookup, so ingestion doesn't query the alias tables per row.
+
+    The map is loaded once (explicitly, or lazily on the first lookup)
+    and is updated by 'add_author' & 'add_institution'; call 'load'
+    again if the alias tables are changed elsewhere.
+    """
+
+    def __init__(self) -> None:
+        self.authors: Dict[int, int] = {}
+        self.institutions: Dict[int, int] = {}
+        self.loaded = False
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return (f'AliasMap: {len(self.authors)} authors, '
+                f'{len(self.institutions)} institutions')
+
+    def load(self, db: Optional[Session] = None) -> None:
+        """(Re)loads the map from the alias tables
+
+        Parameters:
+            db: a Session instance of SQLAlchemy session factory; a new
+                session is used if not provided
+        """
+
+        session = db or SessionLocal()
+        try:
+            authors = dict(
+                session.query(Author_Alias.id_scp, Author.id_scp)
+                .join(Author, Author_Alias.author))
+            institutions = dict(
+                session.query(Institution_Alias.id_scp, Institution.id_scp)
+                .join(Institution, Institution_Alias.institution))
+        finally:
+            if not db:
+                session.close()
+
+        with self._lock:
+            self.authors = authors
+            self.institutions = institutions
+            self.loaded = True
+
+    def _ensure_loaded(self) -> None:
+        if not self.loaded:
+            with self._lock:
+                loaded = self.loaded
+            if not loaded:
+                self.load()
+
+    def resolve_author(self, id_scp: int) -> int:
+        """Returns the canonical Scopus ID of an author's Scopus ID"""
+
+        self._ensure_loaded()
+        return self.authors.get(id_scp, id_scp)
+
+    def resolve_institution(self, id_scp: int) -> int:
+        """Returns the canonical Scopus ID of an institution's Scopus ID"""
+
+        self._ensure_loaded()
+        return self.institutions.get(id_scp, id_scp)
+
+    def add_author(self, db: Session, author: Author,
+                   alias_id_scp: int) -> Author_Alias:
+        """Records 'alias_id_scp' as an alias of 'author'
+
+        The alias row is added to the session (not committed). Aliases
+        of the alias are re-pointed to 'author' as well.
+
+        Parameters:
+            db: a Session instance of SQLAlchemy session factory
+            author (Author): the canonical author
+            alias_id_scp (int): the Scopus ID to be resolved to 'author'
+
+        Returns:
+            Author_Alias: the new alias row
+        """
+
+        for alias in db.query(Author_Alias) \
+                .join(Author, Author_Alias.author) \
+                .filter(Author.id_scp == alias_id_scp):
+            alias.author = author
+        alias = Author_Alias(id_scp=alias_id_scp)
+        author.aliases.append(alias)
+        db.add(alias)
+
+        self._ensure_loaded()
+        with self._lock:
+            for id_scp, canonical in self.authors.items():
+                if canonical == alias_id_scp:
+                    self.authors[id_scp] = author.id_scp
+            self.authors[alias_id_scp] = author.id_scp
+        return alias
+
+    def add_institution(self, db: Session, institution: Institution,
+                        alias_id_scp: int, name: str) -> Institution_Alias:
+        """Records 'alias_id_scp' as an alias of 'institution'
+
+        The alias row is added to the session (not committed). Aliases
+        of the alias are re-pointed to 'institution' as well.
+
+        Parameters:
+            db: a Session instance of SQLAlchemy session factory
+            institution (Institution): the canonical institution
+            alias_id_scp (int): the Scopus ID to be resolved to
+                'institution'
+            name (str): the name of the alias
+
+        Returns:
+            Institution_Alias: the new alias row
+        """
+
+        for alias in db.query(Institution_Alias) \
+                .join(Institution, Institution_Alias.institution) \
+                .filter(Institution.id_scp == alias_id_scp):
+            alias.institution = institution
+        alias = Institution_Alias(id_scp=alias_id_scp, alias=name)
+        institution.aliases.append(alias)
+        db.add(alias)
+
+        self._ensure_loaded()
+        with self._lock:
+            for id_scp, canonical in self.institutions.items():
+                if canonical == alias_id_scp:
+                    self.institutions[id_scp] = institution.id_scp
+            self.institutions[alias_id_scp] = institution.id_scp
+        return alias
+
+
+# The map shared by the ingestion helpers
+ALIASES = AliasMap()
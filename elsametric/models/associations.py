@@ -3,6 +3,7 @@ from sqlalchemy import (
     CheckConstraint,
     ForeignKey,
     ForeignKeyConstraint,
+    Index,
     Table,
 )
 from sqlalchemy.orm import relationship
@@ -30,7 +31,12 @@ Author_Department = Table(
     ForeignKeyConstraint(
         ('department_id', 'institution_id'),
         ('department.id', 'department.institution_id'),
-    )
+    ),
+    # authors of a department
+    Index('author_department_department', 'department_id', 'institution_id',
+          'author_id'),
+    # authors of an institution (e.g. 'Institution._papers')
+    Index('author_department_institution', 'institution_id', 'author_id'),
 )
 
 
@@ -38,6 +44,8 @@ class Paper_Author(Base):
     __tablename__ = 'paper_author'
     __table_args__ = (
         CheckConstraint('author_no >= 0', name='author_no_unsigned'),
+        # papers of an author (the primary key starts with 'paper_id')
+        Index('paper_author_author', 'author_id', 'paper_id'),
     )
 
     paper_id = Column(INTEGER, ForeignKey('paper.id'), primary_key=True)
@@ -1,10 +1,11 @@
 from datetime import datetime
-from typing import Mapping, Set
+from typing import List, Mapping, Set
 
-from sqlalchemy import CheckConstraint, Column, DDL, event, text
-from sqlalchemy.orm import relationship
+from sqlalchemy import CheckConstraint, Column, DDL, event, Index, text
+from sqlalchemy.orm import object_session, relationship
 from sqlalchemy.types import BIGINT, CHAR, DateTime, Enum, INTEGER, VARCHAR
 
+from ..cache import cached
 from .base import (
     Base,
     DIALECT,
@@ -15,6 +16,7 @@ from .base import (
 from .associations import Author_Department, Paper_Author
 from .country import Country
 from .institution import Institution
+from .paper import Paper
 from .source import Source
 from .subject import Subject
 
@@ -37,6 +39,7 @@ class Author(Base):
             name='ck_author_google_scholar'
         ),
         CheckConstraint('''sex IN ('m', 'f')''', name='gender_types'),
+        Index('author_last_first', 'last', 'first'),
     )
 
     id = Column(INTEGER, primary_key=True, autoincrement=True)
@@ -71,6 +74,19 @@ class Author(Base):
     profiles = relationship('Author_Profile', back_populates='author')
     departments = relationship(
         'Department', secondary=Author_Department, back_populates='authors')
+    aliases = relationship('Author_Alias', back_populates='author')
+    # The author rows of the aliases (duplicate Scopus profiles of the same
+    # person), if they exist; their papers are read as this author's papers.
+    alias_authors = relationship(
+        'Author', secondary='author_alias',
+        primaryjoin='Author.id == Author_Alias.author_id',
+        secondaryjoin='Author.id_scp == Author_Alias.id_scp',
+        viewonly=True)
+    canonical_authors = relationship(
+        'Author', secondary='author_alias',
+        primaryjoin='Author.id_scp == Author_Alias.id_scp',
+        secondaryjoin='Author.id == Author_Alias.author_id',
+        viewonly=True)
 
     def __init__(
             self, id_scp: int, id_gsc: str = None, id_institution: str = None,
@@ -113,9 +129,45 @@ class Author(Base):
     def __repr__(self) -> str:
         return f'{self.id_scp}: {self.first} {self.last}'
 
+    def get_paper_authors(self) -> List[Paper_Author]:
+        authors = [self, *self.alias_authors]
+        db = object_session(self)
+        if db is not None and self.id is not None:
+            # 2 queries for all papers (with the analytics columns only),
+            # instead of lazy-loading each paper separately
+            loaded = db.query(Paper_Author) \
+                .filter(Paper_Author.author_id.in_(
+                    [author.id for author in authors])) \
+                .options(Paper.analytics(Paper_Author.paper)) \
+                .all()
+            by_author = {author.id: [] for author in authors}
+            for paper_author in loaded:
+                by_author[paper_author.author_id].append(paper_author)
+            papers = [by_author[author.id] for author in authors]
+        else:  # a new or detached author: use the relationships
+            papers = [author.papers for author in authors]
+
+        paper_authors = []
+        paper_ids = set()
+        for author_papers in papers:
+            for paper_author in author_papers:
+                if paper_author.paper_id in paper_ids:
+                    continue
+                paper_ids.add(paper_author.paper_id)
+                paper_authors.append(paper_author)
+        return paper_authors
+
+    def get_departments(self) -> list:
+        departments = list(self.departments)
+        for alias_author in self.alias_authors:
+            departments.extend(
+                department for department in alias_author.departments
+                if department not in departments)
+        return departments
+
     def get_institutions(self) -> Set[Institution]:
         self._institutions = set()
-        for department in self.departments:
+        for department in self.get_departments():
             try:
                 self._institutions.add(department.institution)
             except AttributeError:
@@ -135,9 +187,10 @@ class Author(Base):
         self.total_countries = len(self._countries)
         return self._countries
 
+    @cached
     def get_papers_trend(self) -> Mapping[int, int]:
         self._papers = {}
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 year = paper_author.paper.get_year()
                 self._papers[year] += 1
@@ -146,9 +199,10 @@ class Author(Base):
 
         return self._papers
 
+    @cached
     def get_citations_trend(self) -> Mapping[int, int]:
         self._citations = {}
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 paper = paper_author.paper
                 year = paper.get_year()
@@ -163,7 +217,7 @@ class Author(Base):
 
     def get_sources(self) -> Set[Source]:
         self._sources = set()
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 self._sources.add(paper_author.paper.source)
             except AttributeError:
@@ -172,10 +226,11 @@ class Author(Base):
         self.total_sources = len(self._sources)
         return self._sources
 
+    @cached
     def get_metrics(self, histogram: bool = False) -> list:
         self._metrics = [[i, 0] for i in range(100)]
         self._metrics.append(['Undefined', 0])
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             paper = paper_author.paper
             year = paper.get_year()
             percentile = None
@@ -201,11 +256,11 @@ class Author(Base):
 
     def get_co_authors(self, threshold: int = 0) -> Mapping['Author', int]:
         self._co_authors = {}
-        for paper_author_1 in self.papers:
+        for paper_author_1 in self.get_paper_authors():
             paper = paper_author_1.paper
             for paper_author_2 in paper.authors:
                 author = paper_author_2.author
-                if author == self:
+                if author == self or author in self.alias_authors:
                     continue
                 try:
                     self._co_authors[author] += 1
@@ -220,7 +275,7 @@ class Author(Base):
 
     def get_subjects(self) -> Mapping[Subject, int]:
         self._subjects = {}
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 subjects = paper_author.paper.source.subjects
                 for subject in subjects:
@@ -234,9 +289,10 @@ class Author(Base):
 
         return self._subjects
 
+    @cached
     def get_keywords(self, threshold: int = 0) -> Mapping[str, int]:
         self._keywords = {}
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 keywords = paper_author.paper.keywords
                 for keyword in keywords:
@@ -255,9 +311,10 @@ class Author(Base):
 
         return self._keywords
 
+    @cached
     def get_funds(self) -> Mapping[str, int]:
         self._funds = {'unknown': 0}
-        for paper_author in self.papers:
+        for paper_author in self.get_paper_authors():
             try:
                 agency = paper_author.paper.fund.agency
                 if agency == 'NOT AVAILABLE':
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Column, ForeignKey, text
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import BIGINT, DateTime, INTEGER
+
+from .base import Base, DIALECT
+
+
+class Author_Alias(Base):
+    __tablename__ = 'author_alias'
+    __table_args__ = (
+        CheckConstraint(
+            'id >= 0',
+            name='author_alias_id_unsigned'
+        ) if DIALECT == "postgresql" else None,
+        CheckConstraint('id_scp >= 0', name='author_alias_id_scp_unsigned'),
+    )
+
+    id = Column(INTEGER, primary_key=True, autoincrement=True)
+    author_id = Column(INTEGER, ForeignKey('author.id'), primary_key=True)
+    id_scp = Column(BIGINT, nullable=False, unique=True)
+    create_time = Column(
+        DateTime(), nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+    # Relationships
+    author = relationship('Author', back_populates='aliases')
+
+    def __init__(self, id_scp: int, author_id: int = None,
+                 create_time: datetime = None) -> None:
+        self.author_id = author_id
+        self.id_scp = id_scp
+        self.create_time = create_time
+
+    def __repr__(self) -> str:
+        return f'{self.id_scp} -> {self.author}'
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Column, ForeignKey, text
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import DateTime, FLOAT, INTEGER
+
+from .base import Base
+
+
+class Author_Indicator(Base):
+    __tablename__ = 'author_indicator'
+    __table_args__ = (
+        CheckConstraint(
+            'papers >= 0 AND citations >= 0 AND h_index >= 0 AND '
+            'g_index >= 0',
+            name='author_indicator_unsigned'),
+    )
+
+    author_id = Column(INTEGER, ForeignKey('author.id'), primary_key=True)
+    papers = Column(INTEGER, nullable=False)
+    citations = Column(INTEGER, nullable=False)
+    h_index = Column(INTEGER, nullable=False)
+    g_index = Column(INTEGER, nullable=False)
+    # mean normalized citation score of the papers; NULL if none has one
+    mncs = Column(FLOAT)
+    update_time = Column(
+        DateTime(), nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+    # Relationships
+    author = relationship('Author')
+
+    def __init__(self, author_id: int, papers: int, citations: int,
+                 h_index: int, g_index: int, mncs: float = None,
+                 update_time: datetime = None) -> None:
+        self.author_id = author_id
+        self.papers = papers
+        self.citations = citations
+        self.h_index = h_index
+        self.g_index = g_index
+        self.mncs = mncs
+        self.update_time = update_time
+
+    def __repr__(self) -> str:
+        return f'{self.author_id}: h {self.h_index}, g {self.g_index}'
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    ForeignKey,
+    Index,
+    text,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import DateTime, FLOAT, INTEGER, VARCHAR
+
+from .base import Base, DIALECT
+
+
+class Author_Merge_Candidate(Base):
+    __tablename__ = 'author_merge_candidate'
+    __table_args__ = (
+        CheckConstraint(
+            'id >= 0',
+            name='author_merge_candidate_id_unsigned'
+        ) if DIALECT == "postgresql" else None,
+        CheckConstraint(
+            'author_id_1 < author_id_2', name='author_merge_candidate_order'),
+        CheckConstraint(
+            '''status IN ('pending', 'merged', 'rejected')''',
+            name='author_merge_candidate_status_types'),
+        UniqueConstraint(
+            'author_id_1', 'author_id_2', name='uq_authorid1_authorid2'),
+        Index('author_merge_candidate_status_score', 'status', 'score'),
+    )
+
+    id = Column(INTEGER, primary_key=True, autoincrement=True)
+    author_id_1 = Column(INTEGER, ForeignKey('author.id'), nullable=False)
+    author_id_2 = Column(INTEGER, ForeignKey('author.id'), nullable=False)
+    # the 'initial' key of 'author_name_key' the pair was found in
+    block = Column(VARCHAR(128), nullable=False)
+    score = Column(FLOAT, nullable=False)
+    name_score = Column(FLOAT, nullable=False)
+    shared_institutions = Column(INTEGER, nullable=False)
+    shared_co_authors = Column(INTEGER, nullable=False)
+    status = Column(VARCHAR(8), nullable=False, server_default='pending')
+    create_time = Column(
+        DateTime(), nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+    # Relationships
+    author_1 = relationship('Author', foreign_keys=[author_id_1])
+    author_2 = relationship('Author', foreign_keys=[author_id_2])
+
+    def __init__(
+            self, author_id_1: int, author_id_2: int, block: str,
+            score: float, name_score: float, shared_institutions: int,
+            shared_co_authors: int, status: str = 'pending',
+            create_time: datetime = None) -> None:
+        self.author_id_1 = author_id_1
+        self.author_id_2 = author_id_2
+        self.block = block
+        self.score = score
+        self.name_score = name_score
+        self.shared_institutions = shared_institutions
+        self.shared_co_authors = shared_co_authors
+        self.status = status
+        self.create_time = create_time
+
+    def __repr__(self) -> str:
+        return f'{self.author_1} <-> {self.author_2}: {self.score:.2f}'
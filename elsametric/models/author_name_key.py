@@ -0,0 +1,32 @@
+from sqlalchemy import CheckConstraint, Column, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import INTEGER, VARCHAR
+
+from .base import Base
+
+
+class Author_Name_Key(Base):
+    __tablename__ = 'author_name_key'
+    __table_args__ = (
+        CheckConstraint(
+            '''kind IN ('full', 'initial', 'translit')''',
+            name='author_name_key_kind_types'),
+        # lookups are 'kind = ... AND key = ...' (or 'key IN (...)')
+        Index('author_name_key_kind_key', 'kind', 'key', 'author_id'),
+    )
+
+    author_id = Column(INTEGER, ForeignKey('author.id'), primary_key=True)
+    # see 'elsametric.names': 'full', 'initial' or 'translit'
+    kind = Column(VARCHAR(16), primary_key=True)
+    key = Column(VARCHAR(128), primary_key=True)
+
+    # Relationships
+    author = relationship('Author')
+
+    def __init__(self, author_id: int, kind: str, key: str) -> None:
+        self.author_id = author_id
+        self.kind = kind
+        self.key = key
+
+    def __repr__(self) -> str:
+        return f'{self.kind} {self.key} -> {self.author_id}'
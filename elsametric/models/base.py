@@ -1,10 +1,16 @@
+import binascii
+import os
 import secrets
+from threading import Lock
+from typing import List, Set
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from .. import DIALECT, ENGINE_URI, TOKEN_BYTES
+from .. import DIALECT, ENGINE_URI, PARTITION_BY_YEAR, TOKEN_BYTES
+# 'PARTITION_BY_YEAR': whether the yearly tables (e.g. 'source_metric') are
+# partitioned by year (PostgreSQL only); imported by the models from here.
 
 
 engine = create_engine(ENGINE_URI)
@@ -13,8 +19,82 @@ SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
 
+# base64 -> URL-safe base64 (as in 'base64.urlsafe_b64encode')
+URLSAFE = bytes.maketrans(b'+/', b'-_')
+
+
+class TokenAllocator:
+    """Allocates unique 'id_frontend' tokens in bulk
+
+    Tokens are cut from one 'os.urandom' buffer per 'batch_size' tokens
+    (instead of a 'secrets' call per token), and are the same as the
+    ones of 'secrets.token_urlsafe'. Each token is checked against the
+    tokens issued so far and the ones already in the database (once
+    'load' is called), so a flush never fails on a duplicate token.
+
+    Parameters:
+        nbytes (int): number of random bytes of each token
+        batch_size (int): number of tokens generated at once
+    """
+
+    # The tables with an 'id_frontend' column
+    TABLES = ('author', 'department', 'institution')
+
+    def __init__(self, nbytes: int = TOKEN_BYTES,
+                 batch_size: int = 4096) -> None:
+        self.nbytes = nbytes
+        self.batch_size = batch_size
+        self.used: Set[str] = set()
+        self._batch: List[str] = []
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return f'TokenAllocator: {len(self.used)} tokens in use'
+
+    def load(self, bind=None) -> None:
+        """Adds the tokens of the database to the used tokens
+
+        Parameters:
+            bind: an engine or connection (default: 'engine')
+        """
+
+        bind = bind or engine
+        existing = inspect(bind).get_table_names()
+        tokens = set()
+        for table in self.TABLES:
+            if table in existing:
+                tokens.update(
+                    row[0] for row in
+                    bind.execute(f'SELECT id_frontend FROM {table}'))
+        with self._lock:
+            self.used |= tokens
+
+    def _generate(self) -> List[str]:
+        buffer = memoryview(os.urandom(self.nbytes * self.batch_size))
+        return [
+            binascii.b2a_base64(buffer[i:i + self.nbytes], newline=False)
+            .translate(URLSAFE).rstrip(b'=').decode('ascii')
+            for i in range(0, len(buffer), self.nbytes)]
+
+    def __call__(self) -> str:
+        with self._lock:
+            while True:
+                if not self._batch:
+                    self._batch = self._generate()
+                token = self._batch.pop()
+                if token not in self.used:
+                    self.used.add(token)
+                    return token
+
+
+# The allocator shared by the models
+TOKENS = TokenAllocator()
+
+
 # Helper function to generate tokens with 'TOKEN_BYTES' for 'id_front' columns
 def token_generator(nbytes: int = TOKEN_BYTES) -> str:
+    if nbytes == TOKENS.nbytes:
+        return TOKENS()
     return secrets.token_urlsafe(nbytes)
 
 
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Column, text
+from sqlalchemy.types import BIGINT, DateTime, TEXT
+
+from .base import Base
+
+
+class Change_Outbox(Base):
+    __tablename__ = 'change_outbox'
+
+    # the order of the commits (as inserted; relayed in this order)
+    id = Column(BIGINT, primary_key=True, autoincrement=True)
+    # the change log records of a commit, as a JSON list (without 'seq')
+    records = Column(TEXT, nullable=False)
+    create_time = Column(
+        DateTime(), nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+    def __init__(self, records: str, create_time: datetime = None) -> None:
+        self.records = records
+        self.create_time = create_time
+
+    def __repr__(self) -> str:
+        return f'{self.id}: {self.create_time}'
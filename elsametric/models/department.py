@@ -1,10 +1,11 @@
 from datetime import datetime
-from typing import Mapping, Set
+from typing import List, Mapping, Set
 
 from sqlalchemy import CheckConstraint, Column, DDL, event, ForeignKey, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DateTime, DECIMAL, INTEGER, VARCHAR
 
+from ..cache import cached
 from .base import (
     Base,
     DIALECT,
@@ -46,7 +47,7 @@ class Department(Base):
 
     # Relationships
     institution = relationship('Institution', back_populates='departments')
-    # aliases = relationship('Department_Alias', back_populates='department')
+    aliases = relationship('Department_Alias', back_populates='department')
     authors = relationship(
         'Author', secondary=Author_Department, back_populates='departments')
 
@@ -72,10 +73,22 @@ class Department(Base):
             return f'{self.name} @ {self.institution}'
         return f'{self.name[:max_len-3]}... @ {self.institution}'
 
+    def get_authors(self) -> List[Author]:
+        # Alias rows (duplicate profiles) are read through their canonical
+        # author, so they are skipped here to avoid counting papers twice;
+        # unless their canonical author is in another department, where
+        # their papers would be lost to this one.
+        members = {author.id for author in self.authors}
+        return [
+            author for author in self.authors
+            if not any(canonical.id in members
+                       for canonical in author.canonical_authors)]
+
+    @cached
     def get_papers_trend(self) -> Mapping[int, int]:
         self._papers = {}
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     year = paper_author.paper.get_year()
                     self._papers[year] += 1
@@ -84,10 +97,11 @@ class Department(Base):
         self.total_papers = sum(self._papers.values())
         return self._papers
 
+    @cached
     def get_citations_trend(self) -> Mapping[int, int]:
         self._citations = {}
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     year = paper_author.paper.get_year()
                     citations = paper_author.paper.cited_cnt
@@ -101,8 +115,8 @@ class Department(Base):
 
     def get_sources(self) -> Set[Source]:
         self._sources = set()
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     self._sources.add(paper_author.paper.source)
                 except AttributeError:
@@ -111,10 +125,11 @@ class Department(Base):
         self.total_sources = len(self._sources)
         return self._sources
 
+    @cached
     def get_metrics(self, histogram: bool = False) -> list:
         self._metrics = [[i, 0] for i in range(100)]
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 paper = paper_author.paper
                 year = paper.get_year()
                 percentile = None
@@ -138,8 +153,8 @@ class Department(Base):
 
     def get_co_authors(self, threshold: int = 0) -> Mapping[Author, int]:
         self._co_authors = {}
-        for author in self.authors:
-            for paper_author_1 in author.papers:
+        for author in self.get_authors():
+            for paper_author_1 in author.get_paper_authors():
                 paper = paper_author_1.paper
                 for paper_author_2 in paper.authors:
                     auth = paper_author_2.author
@@ -158,8 +173,8 @@ class Department(Base):
 
     def get_subjects(self) -> Mapping[Subject, int]:
         self._subjects = {}
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     subjects = paper_author.paper.source.subjects
                     for subject in subjects:
@@ -173,10 +188,11 @@ class Department(Base):
 
         return self._subjects
 
+    @cached
     def get_keywords(self, threshold: int = 0) -> Mapping[str, int]:
         self._keywords = {}
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     keywords = paper_author.paper.keywords
                     for keyword in keywords:
@@ -194,10 +210,11 @@ class Department(Base):
 
         return self._keywords
 
+    @cached
     def get_funds(self) -> Mapping[str, int]:
         self._funds = {'unknown': 0}
-        for author in self.authors:
-            for paper_author in author.papers:
+        for author in self.get_authors():
+            for paper_author in author.get_paper_authors():
                 try:
                     agency = paper_author.paper.fund.agency
                     if agency == 'NOT AVAILABLE':
@@ -1,31 +1,36 @@
-# from sqlalchemy import Column, ForeignKey
-# from sqlalchemy.orm import relationship
-# from sqlalchemy.dialects.mysql import INTEGER, VARCHAR
+from sqlalchemy import CheckConstraint, Column, ForeignKeyConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import INTEGER, VARCHAR
 
-# from .base import Base
+from .base import Base, DIALECT
 
 
-# class Department_Alias(Base):
-#     __tablename__ = 'department_alias'
+class Department_Alias(Base):
+    __tablename__ = 'department_alias'
+    __table_args__ = (
+        CheckConstraint(
+            'id >= 0',
+            name='department_alias_id_unsigned'
+        ) if DIALECT == "postgresql" else None,
+        ForeignKeyConstraint(
+            ('department_id', 'institution_id'),
+            ('department.id', 'department.institution_id'),
+        ),
+    )
 
-#     id = Column(
-#         INTEGER(unsigned=True),
-#         primary_key=True, autoincrement=True, nullable=False
-#     )
-#     department_id = Column(
-#         INTEGER(unsigned=True),
-#         ForeignKey('department.id'), primary_key=True, nullable=False
-#     )
-#     institution_id = Column(
-#         INTEGER(unsigned=True),
-#         ForeignKey('institution.id'), primary_key=True, nullable=False
-#     )
-#     alias = Column(VARCHAR(128), nullable=False)
+    id = Column(INTEGER, primary_key=True, autoincrement=True)
+    department_id = Column(INTEGER, primary_key=True)
+    institution_id = Column(INTEGER, primary_key=True)
+    alias = Column(VARCHAR(128), nullable=False)
 
-#     # Relationships
-#     department = relationship('Department', back_populates='aliases')
+    # Relationships
+    department = relationship('Department', back_populates='aliases')
 
-#     def __init__(self, alias, department_id=None, institution_id=None):
-#         self.department_id = department_id
-#         self.institution_id = institution_id
-#         self.alias = alias
+    def __init__(self, alias: str, department_id: int = None,
+                 institution_id: int = None) -> None:
+        self.department_id = department_id
+        self.institution_id = institution_id
+        self.alias = alias
+
+    def __repr__(self) -> str:
+        return f'{self.alias} -> {self.department}'
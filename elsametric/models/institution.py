@@ -1,9 +1,20 @@
 from datetime import datetime
+from typing import Mapping, Optional
 
-from sqlalchemy import CheckConstraint, Column, DDL, event, ForeignKey, text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    DDL,
+    event,
+    extract,
+    ForeignKey,
+    func,
+    text,
+)
+from sqlalchemy.orm import object_session, Query, relationship
 from sqlalchemy.types import BIGINT, DateTime, DECIMAL, INTEGER, VARCHAR
 
+from ..cache import cached
 from .base import (
     Base,
     DIALECT,
@@ -11,6 +22,13 @@ from .base import (
     UPDATE_TIME_DEFAULT,
     VARCHAR_COLUMN_LENGTH
 )
+from .associations import Author_Department, Paper_Author
+from .author_alias import Author_Alias
+from .country import Country
+from .fund import Fund
+from .paper import Paper
+from .source import Source
+from .source_metric import Source_Metric
 
 
 class Institution(Base):
@@ -44,7 +62,7 @@ class Institution(Base):
     # Relationships
     country = relationship('Country', back_populates='institutions')
     departments = relationship('Department', back_populates='institution')
-    # aliases = relationship('Institution_Alias', back_populates='institution')
+    aliases = relationship('Institution_Alias', back_populates='institution')
 
     def __init__(
             self, id_scp: int, name: str, name_fa: str = None,
@@ -73,6 +91,123 @@ class Institution(Base):
             return f'{self.id_scp}: {self.name}'
         return f'{self.id_scp}: {self.name[:max_len-3]}...'
 
+    # Analytics: each 'get_*' method below is a single GROUP BY query over
+    # the DISTINCT papers of the institution's authors, so a paper with
+    # several authors in the institution is counted once, and no paper
+    # is loaded into the session.
+
+    def _papers(self, year: Optional[int] = None):
+        # the distinct IDs of the institution's papers (as a subquery)
+        from .author import Author  # author.py imports this module
+
+        db = object_session(self)
+        members = db.query(Author_Department.c.author_id) \
+            .filter(Author_Department.c.institution_id == self.id)
+        aliases = db.query(Author.id) \
+            .join(Author_Alias, Author_Alias.id_scp == Author.id_scp) \
+            .filter(Author_Alias.author_id.in_(members))
+        papers = db.query(Paper_Author.paper_id.label('id')) \
+            .filter(Paper_Author.author_id.in_(members.union(aliases)))
+        if year is not None:
+            papers = papers \
+                .join(Paper, Paper.id == Paper_Author.paper_id) \
+                .filter(Paper.in_year(year))
+        return papers.distinct().subquery()
+
+    def _query(self, *columns, year: Optional[int] = None) -> Query:
+        # a query of the institution's papers, selecting 'columns'
+        papers = self._papers(year)
+        return object_session(self).query(*columns) \
+            .select_from(Paper) \
+            .join(papers, papers.c.id == Paper.id)
+
+    @cached
+    def get_papers_trend(self) -> Mapping[int, int]:
+        year = extract('year', Paper.date)
+        self._papers_trend = {
+            int(y): cnt for y, cnt in self._query(year, func.count(Paper.id))
+            .group_by(year)
+            .order_by(year)}
+        self.total_papers = sum(self._papers_trend.values())
+        return self._papers_trend
+
+    @cached
+    def get_citations_trend(self) -> Mapping[int, int]:
+        year = extract('year', Paper.date)
+        citations = func.sum(func.coalesce(Paper.cited_cnt, 0))
+        self._citations = {
+            int(y): int(cnt) for y, cnt in self._query(year, citations)
+            .group_by(year)
+            .order_by(year)}
+        self.total_citations = sum(self._citations.values())
+        return self._citations
+
+    @cached
+    def get_metrics(self, year: Optional[int] = None,
+                    histogram: bool = False) -> list:
+        self._metrics = [[i, 0] for i in range(100)]
+        query = self._query(
+            Source_Metric.value, func.count(Paper.id), year=year) \
+            .join(Source_Metric, Source_Metric.source_id == Paper.source_id) \
+            .filter(Source_Metric.type == 'Percentile') \
+            .filter(Source_Metric.year == extract('year', Paper.date)) \
+            .group_by(Source_Metric.value)
+        if year is not None:  # scans a single partition, if partitioned
+            query = query.filter(Source_Metric.year == year)
+        for value, cnt in query:
+            # the values are truncated here, as in 'int(value)', since
+            # CAST rounds in some databases
+            percentile = int(value)
+            if 0 < percentile < len(self._metrics):
+                self._metrics[percentile][1] += cnt
+
+        if histogram:
+            result = []
+            for met in self._metrics:
+                result.extend([met[0] for percentile in range(met[1])])
+            return result
+        return self._metrics
+
+    @cached
+    def get_source_countries(
+            self, year: Optional[int] = None) -> Mapping[str, int]:
+        query = self._query(Country.name, func.count(Paper.id), year=year) \
+            .outerjoin(Source, Source.id == Paper.source_id) \
+            .outerjoin(Country, Country.id == Source.country_id) \
+            .group_by(Country.name)
+        self._source_countries = {
+            name or 'unknown': cnt for name, cnt in query}
+        return self._source_countries
+
+    @cached
+    def get_source_types(
+            self, year: Optional[int] = None) -> Mapping[str, int]:
+        query = self._query(Source.type, func.count(Paper.id), year=year) \
+            .outerjoin(Source, Source.id == Paper.source_id) \
+            .group_by(Source.type)
+        self._source_types = {
+            source_type or 'unknown': cnt for source_type, cnt in query}
+        return self._source_types
+
+    @cached
+    def get_funds(self, top: Optional[int] = None) -> Mapping[str, int]:
+        self._funds = {'unknown': 0}
+        cnt = func.count(Paper.id)
+        query = self._query(Fund.agency, cnt) \
+            .join(Fund, Fund.id == Paper.fund_id) \
+            .group_by(Fund.agency) \
+            .order_by(cnt.desc(), Fund.agency)
+        for agency, papers in query:
+            if not agency or agency == 'NOT AVAILABLE':
+                self._funds['unknown'] += papers
+            else:
+                self._funds[agency] = papers
+
+        if top:
+            known = [k for k in self._funds if k != 'unknown'][:top]
+            self._funds = {k: self._funds[k] for k in ['unknown', *known]}
+        return self._funds
+
 
 if DIALECT == "postgresql":
     update_time_trigger = DDL(
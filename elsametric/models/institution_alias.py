@@ -1,28 +1,37 @@
-# from sqlalchemy import Column, ForeignKey
-# from sqlalchemy.orm import relationship
-# from sqlalchemy.dialects.mysql import BIGINT, INTEGER, VARCHAR
+from sqlalchemy import CheckConstraint, Column, ForeignKey
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import BIGINT, INTEGER, VARCHAR
 
-# from .base import Base
+from .base import Base, DIALECT
 
 
-# class Institution_Alias(Base):
-#     __tablename__ = 'institution_alias'
+class Institution_Alias(Base):
+    __tablename__ = 'institution_alias'
+    __table_args__ = (
+        CheckConstraint(
+            'id >= 0',
+            name='institution_alias_id_unsigned'
+        ) if DIALECT == "postgresql" else None,
+        CheckConstraint(
+            'id_scp >= 0', name='institution_alias_id_scp_unsigned'),
+    )
 
-#     id = Column(
-#         INTEGER(unsigned=True),
-#         primary_key=True, autoincrement=True, nullable=False
-#     )
-#     institution_id = Column(
-#         INTEGER(unsigned=True), ForeignKey('institution.id'), primary_key=True)
-#     id_scp = Column(BIGINT(unsigned=True), nullable=False, unique=True)
-#     alias = Column(VARCHAR(128), nullable=False)
-#     url = Column(VARCHAR(256), nullable=True, unique=True)
+    id = Column(INTEGER, primary_key=True, autoincrement=True)
+    institution_id = Column(
+        INTEGER, ForeignKey('institution.id'), primary_key=True)
+    id_scp = Column(BIGINT, nullable=False, unique=True)
+    alias = Column(VARCHAR(128), nullable=False)
+    url = Column(VARCHAR(256), unique=True)
 
-#     # Relationships
-#     institution = relationship('Institution', back_populates='aliases')
+    # Relationships
+    institution = relationship('Institution', back_populates='aliases')
 
-#     def __init__(self, id_scp, alias, institution_id=None, url=None):
-#         self.institution_id = institution_id
-#         self.id_scp = id_scp
-#         self.alias = alias
-#         self.url = url
+    def __init__(self, id_scp: int, alias: str, institution_id: int = None,
+                 url: str = None) -> None:
+        self.institution_id = institution_id
+        self.id_scp = id_scp
+        self.alias = alias
+        self.url = url
+
+    def __repr__(self) -> str:
+        return f'{self.id_scp}: {self.alias} -> {self.institution}'
@@ -1,7 +1,16 @@
 from datetime import datetime, date
 
-from sqlalchemy import CheckConstraint, Column, DDL, event, ForeignKey, text
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    and_,
+    CheckConstraint,
+    Column,
+    DDL,
+    event,
+    ForeignKey,
+    Index,
+    text,
+)
+from sqlalchemy.orm import deferred, Load, relationship, selectinload
 from sqlalchemy.types import (
     BIGINT,
     BOOLEAN,
@@ -27,22 +36,27 @@ class Paper(Base):
         CheckConstraint('id_scp >= 0', name='paper_id_scp_unsigned'),
         CheckConstraint('total_author >= 0', name='total_author_unsigned'),
         CheckConstraint('cited_cnt >= 0', name='cited_cnt_unsigned'),
+        # papers of a source, per year (date range)
+        Index('paper_source_date', 'source_id', 'date'),
     )
 
+    # The 'heavy' columns (abstract, url, type_description) are deferred: they
+    # are loaded on first access, or with 'undefer_group('heavy')'.
     id = Column(INTEGER, primary_key=True, autoincrement=True)
     id_scp = Column(BIGINT, nullable=False, unique=True)
     eid = Column(VARCHAR(45), nullable=False, unique=True)
     title = Column(VARCHAR(512), nullable=False)
     type = Column(VARCHAR(2), nullable=False)
-    type_description = Column(VARCHAR(45))
-    abstract = Column(TEXT)
+    type_description = deferred(Column(VARCHAR(45)), group='heavy')
+    abstract = deferred(Column(TEXT), group='heavy')
     total_author = Column(SMALLINT, nullable=False)
     open_access = Column(
         BOOLEAN(create_constraint=True, name='open_access_bool'),
         nullable=False
     )
     cited_cnt = Column(SMALLINT)
-    url = Column(VARCHAR(256), nullable=False, unique=True)
+    url = deferred(
+        Column(VARCHAR(256), nullable=False, unique=True), group='heavy')
     article_no = Column(VARCHAR(45))
     date = Column(DATE, nullable=False)
     fund_id = Column(BIGINT, ForeignKey('fund.id'))
@@ -105,6 +119,38 @@ class Paper(Base):
     def get_year(self) -> int:
         return self.date.year
 
+    @classmethod
+    def in_year(cls, year: int):
+        # 'date' in a range, instead of 'YEAR(date) = year', can use indexes
+        return and_(
+            cls.date >= date(year, 1, 1), cls.date < date(year + 1, 1, 1))
+
+    # Columns needed by the analytics paths (e.g. the 'get_*' methods)
+    ANALYTICS_COLUMNS = (
+        'date', 'cited_cnt', 'source_id', 'fund_id', 'type', 'open_access',
+        'total_author')
+
+    @classmethod
+    def analytics(cls, via=None) -> Load:
+        """Returns a loader option loading only the analytics columns
+
+        Usage:
+            db.query(Paper).options(Paper.analytics())
+            db.query(Paper_Author).options(
+                Paper.analytics(Paper_Author.paper))
+
+        Parameters:
+            via: a relationship leading to papers (loaded with a 2nd
+                'SELECT ... IN' query); if None, the option is for a
+                query of Paper itself
+
+        Returns:
+            Load: the loader option, to be passed to 'query.options'
+        """
+
+        loader = Load(cls) if via is None else selectinload(via)
+        return loader.load_only(*cls.ANALYTICS_COLUMNS)
+
 
 if DIALECT == "postgresql":
     update_time_trigger = DDL(
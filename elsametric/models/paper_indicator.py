@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Column, ForeignKey, text
+from sqlalchemy.orm import relationship
+from sqlalchemy.types import DateTime, FLOAT, INTEGER
+
+from .base import Base
+
+
+class Paper_Indicator(Base):
+    __tablename__ = 'paper_indicator'
+    __table_args__ = (
+        CheckConstraint('citations >= 0', name='paper_indicator_citations'),
+    )
+
+    paper_id = Column(INTEGER, ForeignKey('paper.id'), primary_key=True)
+    citations = Column(INTEGER, nullable=False)
+    # mean citations of the papers of the same subjects & year
+    expected_citations = Column(FLOAT, nullable=False)
+    # citations / expected_citations; NULL if nothing is expected
+    ncs = Column(FLOAT)
+    update_time = Column(
+        DateTime(), nullable=False, server_default=text('CURRENT_TIMESTAMP'))
+
+    # Relationships
+    paper = relationship('Paper')
+
+    def __init__(self, paper_id: int, citations: int,
+                 expected_citations: float, ncs: float = None,
+                 update_time: datetime = None) -> None:
+        self.paper_id = paper_id
+        self.citations = citations
+        self.expected_citations = expected_citations
+        self.ncs = ncs
+        self.update_time = update_time
+
+    def __repr__(self) -> str:
+        return f'{self.paper_id}: NCS {self.ncs}'
@@ -0,0 +1,52 @@
+from sqlalchemy import Column, Computed, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.types import BIGINT, TEXT, VARCHAR
+
+from .base import Base, DIALECT
+
+
+# The text search configuration of each entity: names aren't stemmed
+TS_CONFIGS = {'paper': 'english', 'author': 'simple', 'source': 'english'}
+
+if DIALECT == 'postgresql':
+    _ts_config = 'CASE entity ' + ' '.join(
+        f"WHEN '{entity}' THEN '{config}'::regconfig"
+        for entity, config in TS_CONFIGS.items()) + \
+        " ELSE 'simple'::regconfig END"
+    _document = (
+        f"setweight(to_tsvector({_ts_config}, coalesce(title, '')), 'A') || "
+        f"setweight(to_tsvector({_ts_config}, coalesce(body, '')), 'B')")
+    _search_indexes = (
+        Index('search_document_document', 'document', postgresql_using='gin'),
+    )
+else:  # mysql
+    _search_indexes = (
+        Index('search_document_title', 'title', mysql_prefix='FULLTEXT'),
+        Index('search_document_text', 'title', 'body',
+              mysql_prefix='FULLTEXT'),
+    )
+
+
+class Search_Document(Base):
+    __tablename__ = 'search_document'
+    __table_args__ = _search_indexes
+
+    # 'paper', 'author' or 'source'
+    entity = Column(VARCHAR(16), primary_key=True)
+    entity_id = Column(BIGINT, primary_key=True, autoincrement=False)
+    # the strongest matches: titles, keywords & names
+    title = Column(TEXT)
+    body = Column(TEXT)
+    if DIALECT == 'postgresql':
+        # title (weight A) & body (weight B), kept up to date by postgresql
+        document = Column(TSVECTOR, Computed(_document, persisted=True))
+
+    def __init__(self, entity: str, entity_id: int, title: str = None,
+                 body: str = None) -> None:
+        self.entity = entity
+        self.entity_id = entity_id
+        self.title = title
+        self.body = body
+
+    def __repr__(self) -> str:
+        return f'{self.entity} {self.entity_id}: {self.title}'
@@ -1,6 +1,14 @@
 from datetime import datetime
 
-from sqlalchemy import CheckConstraint, Column, DDL, event, ForeignKey, text
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    DDL,
+    event,
+    ForeignKey,
+    Index,
+    text,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import BIGINT, DateTime, INTEGER, VARCHAR
 
@@ -16,6 +24,8 @@ class Source(Base):
             name='source_id_unsigned'
         ) if DIALECT == "postgresql" else None,
         CheckConstraint('id_scp >= 0', name='source_id_scp_unsigned'),
+        # sources of a publisher (used in 'ext_source_metric_process')
+        Index('source_publisher', 'publisher'),
     )
 
     id = Column(INTEGER, primary_key=True, autoincrement=True)
@@ -1,8 +1,16 @@
-from sqlalchemy import CheckConstraint, Column, ForeignKey, UniqueConstraint
-from sqlalchemy.orm import relationship
+from typing import Iterable, List, Set
+
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    event,
+    ForeignKey,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import relationship, Session
 from sqlalchemy.types import DECIMAL, INTEGER, VARCHAR
 
-from .base import Base, DIALECT
+from .base import Base, DIALECT, PARTITION_BY_YEAR, SessionLocal
 
 
 class Source_Metric(Base):
@@ -15,13 +23,17 @@ class Source_Metric(Base):
         CheckConstraint('year >= 1970 AND year <= 2069', name='year_range'),
         UniqueConstraint(
             'source_id', 'type', 'year', name='uq_sourceid_type_year'),
+        # one partition per year (see 'ensure_year_partitions')
+        {'postgresql_partition_by': 'RANGE (year)'}
+        if PARTITION_BY_YEAR else {},
     )
 
     id = Column(INTEGER, primary_key=True, autoincrement=True)
     source_id = Column(INTEGER, ForeignKey('source.id'), primary_key=True)
     type = Column(VARCHAR(45), nullable=False)
     value = Column(DECIMAL(13, 3), nullable=False)
-    year = Column(INTEGER, nullable=False)
+    # the partition key must be a part of the primary key
+    year = Column(INTEGER, nullable=False, primary_key=PARTITION_BY_YEAR)
 
     # Relationships
     source = relationship('Source', back_populates='metrics')
@@ -38,3 +50,59 @@ class Source_Metric(Base):
 
     def is_integer(self) -> bool:
         return float(self.value).is_integer()
+
+
+# Years with a committed partition (filled by 'ensure_year_partitions')
+PARTITION_YEARS: Set[int] = set()
+
+
+def ensure_year_partitions(db: Session, years: Iterable[int]) -> List[str]:
+    """Creates the missing yearly partitions of 'source_metric'
+
+    Rows of a year without a partition can't be inserted, so the
+    partitions are created before the flush of new metrics (see the
+    'before_flush' listener below). Bulk inserts bypassing the session
+    (e.g. Core 'insert' statements) should call this first. Does nothing
+    if 'PARTITION_BY_YEAR' is not enabled.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory; the
+            partitions are created in its transaction
+        years (iterable): the years of the rows to be inserted
+
+    Returns:
+        list: the names of the partitions created (or found) for the
+        years not seen before
+    """
+
+    if not PARTITION_BY_YEAR:
+        return []
+
+    partitions = []
+    pending = db.info.setdefault('partition_years', set())
+    for year in sorted(set(years) - PARTITION_YEARS - pending):
+        partition = f'source_metric_y{year}'
+        db.execute(
+            f'CREATE TABLE IF NOT EXISTS {partition} '
+            f'PARTITION OF source_metric '
+            f'FOR VALUES FROM ({year}) TO ({year + 1})')
+        pending.add(year)
+        partitions.append(partition)
+    return partitions
+
+
+if PARTITION_BY_YEAR:
+    def _create_partitions(db: Session, flush_context, instances) -> None:
+        ensure_year_partitions(
+            db, {obj.year for obj in db.new if isinstance(obj, Source_Metric)})
+
+    def _commit_partitions(db: Session) -> None:
+        # the partitions are known to exist once their transaction commits
+        PARTITION_YEARS.update(db.info.pop('partition_years', ()))
+
+    def _discard_partitions(db: Session) -> None:
+        db.info.pop('partition_years', None)
+
+    event.listen(SessionLocal, 'before_flush', _create_partitions)
+    event.listen(SessionLocal, 'after_commit', _commit_partitions)
+    event.listen(SessionLocal, 'after_rollback', _discard_partitions)
@@ -0,0 +1,131 @@
+"""Normalization of the names of authors, in Latin & Persian scripts
+
+The same person can be written as 'Mohammad', 'Muhammad', 'Mohamad' or
+'محمد' (with Arabic or Persian letters). Each name is reduced to keys
+that are equal for such variants, so matching names is an equality
+lookup (e.g. in the 'author_name_key' table) instead of a fuzzy scan:
+    full: the folded last & given names ('sanchez|maria')
+    initial: the folded last name & first initial ('sanchez|m')
+    translit: the script-independent consonant skeletons of the last &
+        first names ('snCz|mr'); a coarse key, for candidates
+"""
+
+import re
+import unicodedata
+from typing import Dict, Optional
+
+
+# Arabic letters (and presentation forms) unified with the Persian ones
+ARABIC_TO_PERSIAN = str.maketrans({
+    'ي': 'ی', 'ى': 'ی', 'ئ': 'ی', 'ك': 'ک', 'ة': 'ه', 'ۀ': 'ه',
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ؤ': 'و', 'ـ': None,
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic digits
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # Persian digits
+})
+
+# Persian letters to Latin consonant classes; long vowels, 'و' & 'ی'
+# (vowels or semi-vowels), 'ع' & 'ء' are dropped, like the Latin vowels
+PERSIAN_SKELETON = {
+    'ب': 'b', 'پ': 'p', 'ت': 't', 'ط': 't', 'ث': 's', 'س': 's', 'ص': 's',
+    'ج': 'j', 'چ': 'C', 'ح': 'h', 'ه': 'h', 'خ': 'x', 'د': 'd', 'ذ': 'z',
+    'ز': 'z', 'ض': 'z', 'ظ': 'z', 'ژ': 'z', 'ر': 'r', 'ش': 'S', 'غ': 'q',
+    'ق': 'q', 'ف': 'f', 'ک': 'k', 'گ': 'g', 'ل': 'l', 'م': 'm', 'ن': 'n',
+}
+# Latin digraphs & letters to the same classes (vowels, 'v', 'w' & 'y'
+# are dropped)
+LATIN_DIGRAPHS = {
+    'sh': 'S', 'ch': 'C', 'kh': 'x', 'gh': 'q', 'zh': 'z', 'th': 's',
+    'dh': 'z', 'ph': 'f',
+}
+LATIN_SKELETON = {
+    'b': 'b', 'c': 'k', 'd': 'd', 'f': 'f', 'g': 'g', 'h': 'h', 'j': 'j',
+    'k': 'k', 'l': 'l', 'm': 'm', 'n': 'n', 'p': 'p', 'q': 'q', 'r': 'r',
+    's': 's', 't': 't', 'x': 'ks', 'z': 'z',
+}
+_LATIN_TOKENS = re.compile('|'.join(LATIN_DIGRAPHS) + '|.')
+
+KINDS = ('full', 'initial', 'translit')
+
+
+def fold(name: Optional[str]) -> str:
+    """Folds a name for comparison: 'Sánchez-R' -> 'sanchezr'
+
+    The name is lower-cased, accents & non-letters (spaces, hyphens,
+    ZWNJ, tatweel) are removed, and Arabic letters & digits are unified
+    with the Persian ones ('علي' -> 'علی').
+
+    Parameters:
+        name (str): the name to be folded
+
+    Returns:
+        str: the folded name ('' if None)
+    """
+
+    if not name:
+        return ''
+    name = unicodedata.normalize('NFKD', name).translate(ARABIC_TO_PERSIAN)
+    return ''.join(
+        char for char in name.casefold()
+        if char.isalnum() and not unicodedata.combining(char))
+
+
+def transliteration_key(name: Optional[str]) -> str:
+    """Returns the consonant skeleton of a name, in either script
+
+    Vowels are dropped (short vowels are not written in Persian), similar
+    sounds are merged, repeated letters are collapsed and a final 'h' is
+    dropped, so 'Mohammad', 'Muhammad' & 'محمد' are all 'mhmd', and
+    'Fatemeh', 'Fateme' & 'فاطمه' are all 'ftm'.
+
+    Parameters:
+        name (str): the name (Latin or Persian script)
+
+    Returns:
+        str: the key ('' if the name has no consonants)
+    """
+
+    folded = fold(name)
+    letters = []
+    for token in _LATIN_TOKENS.findall(folded):
+        letter = LATIN_DIGRAPHS.get(token) or LATIN_SKELETON.get(token) or \
+            PERSIAN_SKELETON.get(token, '')
+        letters.append(letter)
+    key = re.sub(r'(.)\1+', r'\1', ''.join(letters))
+    return key[:-1] if len(key) > 1 and key.endswith('h') else key
+
+
+def initials(first: Optional[str], middle: Optional[str] = None) -> str:
+    """Returns the folded initials of the given names: 'ma' for
+    'Mohammad Ali' (or 'Mohammad', 'Ali')"""
+
+    parts = f'{first or ""} {middle or ""}'.replace('.', ' ').replace(
+        '-', ' ').split()
+    return ''.join(fold(part)[:1] for part in parts)
+
+
+def name_keys(first: Optional[str], last: Optional[str],
+              middle: Optional[str] = None) -> Dict[str, str]:
+    """Returns the keys of a name (see the module's docstring)
+
+    Parameters:
+        first (str): the first name
+        last (str): the last name
+        middle (str): the middle name
+
+    Returns:
+        dict: {kind: key}; empty if the name has no last name, and
+            without 'full' if it has no given names
+    """
+
+    last_folded = fold(last)
+    if not last_folded:
+        return {}
+    keys = {}
+    given = fold(f'{first or ""}{middle or ""}')
+    if given:
+        keys['full'] = f'{last_folded}|{given}'
+    keys['initial'] = f'{last_folded}|{given[:1]}'
+    last_key = transliteration_key(last)
+    if last_key:
+        keys['translit'] = f'{last_key}|{transliteration_key(first)}'
+    return keys
@@ -0,0 +1,491 @@
+import io
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from time import gmtime, strftime, time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .models.alias_map import ALIASES
+from .models.base import Base, engine, SessionLocal, TOKENS
+from .helpers.checkpoint import Checkpoint
+from .helpers.helpers import get_row
+from .helpers.session import EntityCache, IngestSession
+from .stages import DEPENDENCIES, SINGLE_SECTION_STAGES, STAGES
+from .helpers.process import (
+    ext_country_process,
+    ext_subject_process,
+    ext_source_process,
+    ext_source_metric_process,
+    ext_faculty_process,
+    file_process,
+)
+
+
+# Number of consecutive IntegrityErrors tolerated for a section. These happen
+# when two concurrent stages try to create the same source.
+MAX_RETRIES = 3
+
+
+def retrieval_time(file_path: Path) -> str:
+    """Returns the time a Scopus file was retrieved, using its file name
+
+    Paper files are named '<name>_<unixtime>.json' (or '.txt').
+
+    Parameters:
+        file_path (Path): the path to a JSON formatted file exported
+            from Scopus API containing information about some papers
+
+    Returns:
+        str: a 'datetime' string of the retrieval time of the file
+    """
+
+    return datetime \
+        .utcfromtimestamp(int(file_path.stem.split('_')[-1])) \
+        .strftime('%Y-%m-%d %H:%M:%S')
+
+
+def memory_report(session: IngestSession) -> str:
+    """Returns the peak memory of the process & the sizes of an
+    IngestSession, e.g. 'peak memory: 212.5 MB, 0 objects, 5210 cached
+    keys (84% hits)'"""
+
+    stats = session.stats()
+    peak = stats['peak_memory']
+    peak = f'{peak / 2**20:.1f} MB' if peak is not None else 'unknown'
+    lookups = stats['cache_hits'] + stats['cache_misses']
+    hits = stats['cache_hits'] / lookups if lookups else 0
+    return (f'peak memory: {peak}, {stats["objects"]} objects, '
+            f'{stats["cached_keys"]} cached keys ({hits:.0%} hits)')
+
+
+def paper_files(directory: Path) -> List[Path]:
+    """Returns the sorted list of paper files inside a directory
+
+    Parameters:
+        directory (Path): the directory containing the Scopus files
+
+    Returns:
+        list: the paper files, skipping files like 'thumbs.db'
+    """
+
+    return sorted(
+        file for file in directory.iterdir()
+        if file.suffix in ['.json', '.txt'])
+
+
+class Populator:
+    """Runs the stages of populating the database
+
+    Each stage consists of one or more sections (e.g. the 'metrics'
+    stage has a section for each metrics file in the config). Sections
+    use their own sessions, so independent stages can run concurrently
+    in separate threads. Progress is recorded in a Checkpoint after each
+    commit.
+
+    Parameters:
+        config (dict): the 'database.populate' part of 'config.json'
+        data_path (Path): the directory containing the data files
+        checkpoint (Checkpoint): the progress record of the run
+        batch_size (int): number of .csv rows committed at once
+    """
+
+    def __init__(self, config: dict, data_path: Path,
+                 checkpoint: Checkpoint, batch_size: int = 100) -> None:
+        self.config = config
+        self.data_path = data_path
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.t0 = time()
+
+    def __repr__(self) -> str:
+        return f'Populator: {self.data_path}'
+
+    def log(self, message: str) -> None:
+        elapsed = strftime("%H:%M:%S", gmtime(time() - self.t0))
+        print(f'[{elapsed}] {message}')
+
+    def sections(self, stage: str) -> List[Tuple[str, dict]]:
+        """Returns the (section name, section config) pairs of a stage
+
+        Single-section stages are always returned (selecting the stage is
+        enough). For the other stages, only the items of the config with
+        their 'process' flag set are returned.
+        """
+
+        if stage in SINGLE_SECTION_STAGES:
+            return [(stage, self.config[stage])]
+        if stage == 'institutions':
+            return [(f'institutions: {item["id_scp"]}', item)
+                    for item in self.config[stage] if item['process']]
+        return [(f'{stage}: {item["path"]}', item)
+                for item in self.config[stage] if item['process']]
+
+    def enabled_stages(self) -> List[str]:
+        """Returns the stages enabled by the 'process' flags of config"""
+
+        stages = []
+        for stage in STAGES:
+            if stage in SINGLE_SECTION_STAGES:
+                if self.config[stage]['process']:
+                    stages.append(stage)
+            elif any(item['process'] for item in self.config[stage]):
+                stages.append(stage)
+        return stages
+
+    # --------------------------------------------------------------------------
+    # Sections
+    # --------------------------------------------------------------------------
+
+    def _sources(self, stage: str,
+                 item: dict) -> Callable[[Session, int], Iterator]:
+        # Returns a function creating the (row number, Source) iterator of the
+        # section, starting at 'offset'.
+        path = self.data_path / item['path']
+        if stage == 'journals':
+            return lambda db, offset: ext_source_process(
+                db, path, src_type='Journal', offset=offset)
+        if stage == 'conferences':
+            return lambda db, offset: ext_source_process(
+                db, path, src_type='Conference Proceeding', offset=offset)
+        return lambda db, offset: ext_source_metric_process(
+            db, path, item['year'], offset=offset)
+
+    def run_sources(self, stage: str, section: str, item: dict,
+                    limit: Optional[int] = None,
+                    dry_run: bool = False) -> int:
+        """Imports the sources (or metrics) of a .csv file in batches
+
+        When a concurrent stage commits a source that this section was
+        about to create, the batch fails with an IntegrityError. The
+        section then restarts at its last committed row, where the
+        conflicting source is found in the database this time.
+
+        Returns:
+            int: the number of .csv rows processed
+        """
+
+        sources = self._sources(stage, item)
+        start = 0 if dry_run else self.checkpoint.get_offset(section)
+        # the row number of the last row added; a retry starts again at
+        # the last committed row (its rolled back rows are read again)
+        offset = last_row = start
+        retries = 0
+        while True:
+            db = SessionLocal()
+            try:
+                batch = 0
+                rows = islice(sources(db, offset), limit)
+                for row_no, source in rows:
+                    db.add(source)
+                    batch += 1
+                    last_row = row_no
+                    if batch == self.batch_size and not dry_run:
+                        db.commit()
+                        db.close()
+                        self.checkpoint.set_offset(section, row_no)
+                        batch = 0
+                if dry_run:
+                    db.flush()
+                    db.rollback()
+                    return last_row - start
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                retries += 1
+                if retries > MAX_RETRIES:
+                    raise
+                offset = last_row = start if dry_run \
+                    else self.checkpoint.get_offset(section)
+                self.log(f'{section}: conflict, retrying from row {offset}')
+            finally:
+                db.close()
+
+        if last_row > start:
+            self.checkpoint.set_offset(section, last_row)
+        self.checkpoint.mark_done(section)
+        return last_row - start
+
+    def run_list(self, stage: str, section: str, item: dict,
+                 limit: Optional[int] = None, dry_run: bool = False) -> int:
+        """Imports the countries or the subjects
+
+        Returns:
+            int: the number of objects created
+        """
+
+        process = ext_country_process if stage == 'countries' \
+            else ext_subject_process
+        db = SessionLocal()
+        try:
+            objects = process(db, self.data_path / item['path'])
+            objects = objects[:limit] if limit else objects
+            db.add_all(objects)
+            if dry_run:
+                db.flush()
+                db.rollback()
+                return len(objects)
+            db.commit()
+        finally:
+            db.close()
+
+        self.checkpoint.mark_done(section)
+        return len(objects)
+
+    def run_papers(self, stage: str, section: str, item: dict,
+                   limit: Optional[int] = None, dry_run: bool = False) -> int:
+        """Imports the papers of a directory of Scopus files
+
+        Each file is committed separately and its name is saved in the
+        checkpoint. The problems encountered are logged to a file.
+
+        The files share an IngestSession: the session is emptied after
+        every 'expunge_every' files (config, default: 1), and the ids of
+        the authors, keywords, ... seen so far are kept in a bounded
+        cache ('entity_cache_size' keys), so the memory stays flat on
+        large directories. The peak memory is logged after each file.
+
+        Returns:
+            int: the number of files processed
+        """
+
+        bad_papers = []
+        files = paper_files(self.data_path / item['path'])
+        # Files are processed (and committed) in order, so every file up to
+        # & including the 'last_file' of the checkpoint is already in the DB.
+        last_file = None if dry_run else self.checkpoint.get_last_file(section)
+        if last_file:
+            files = [file for file in files if file.name > last_file]
+
+        processed = 0
+        session = IngestSession(
+            SessionLocal, expunge_every=self.config.get('expunge_every', 1),
+            cache=EntityCache(self.config.get('entity_cache_size', 100_000)))
+        db = session.db
+        try:
+            for file in islice(files, limit):
+                problems, papers_list = file_process(
+                    db, file, retrieval_time(file), encoding='utf8')
+                db.add_all(papers_list)
+                if problems:
+                    bad_papers.append(problems)
+                processed += 1
+
+                if dry_run:
+                    db.flush()
+                    continue
+                session.commit()
+                self.checkpoint.set_last_file(section, file.name)
+                self.log(f'{section}: {file.name} ({memory_report(session)})')
+            if dry_run:
+                session.rollback()
+                return processed
+        finally:
+            session.close()
+
+        if bad_papers:
+            log_folder = self.data_path / self.config['logs']
+            log_folder.mkdir(parents=True, exist_ok=True)
+            log_name = f'bad_papers_{item["path"]}_{int(time())}.json'
+            log_name = log_name.replace('/', '_')
+            with io.open(log_folder / log_name, 'w', encoding='utf8') as log:
+                try:
+                    json.dump(bad_papers, log, indent=4, default=str)
+                except Exception as e:
+                    print(type(e), e)
+                    print(bad_papers)
+
+        self.checkpoint.mark_done(section)
+        return processed
+
+    def run_faculties(self, stage: str, section: str, item: dict,
+                      limit: Optional[int] = None,
+                      dry_run: bool = False) -> int:
+        """Updates the authors of an institution with faculty data
+
+        Returns:
+            int: the number of faculties updated
+        """
+
+        db = SessionLocal()
+        try:
+            faculties_list = ext_faculty_process(
+                db,
+                self.data_path / item['faculties'],
+                self.data_path / item['departments'],
+                institution_id_scp=item['id_scp']
+            )
+            if dry_run:
+                db.flush()
+                db.rollback()
+                return len(faculties_list)
+            db.commit()
+        finally:
+            db.close()
+
+        self.checkpoint.mark_done(section)
+        return len(faculties_list)
+
+    def runner(self, stage: str) -> Callable[..., int]:
+        if stage in ('countries', 'subjects'):
+            return self.run_list
+        if stage in ('journals', 'conferences', 'metrics'):
+            return self.run_sources
+        if stage == 'papers':
+            return self.run_papers
+        return self.run_faculties
+
+    def units(self, stage: str, section: str, item: dict) -> int:
+        """Returns the number of remaining work units of a section
+
+        Work units are .csv rows, or files for the 'papers' stage. The
+        'institutions' sections are counted as a whole.
+        """
+
+        if self.checkpoint.is_done(section):
+            return 0
+        if stage == 'papers':
+            last_file = self.checkpoint.get_last_file(section) or ''
+            return sum(
+                1 for file in paper_files(self.data_path / item['path'])
+                if file.name > last_file)
+        if stage == 'institutions':
+            return sum(1 for _ in get_row(self.data_path / item['faculties']))
+        offset = self.checkpoint.get_offset(section)
+        return sum(1 for _ in get_row(self.data_path / item['path'])) - offset
+
+    # --------------------------------------------------------------------------
+    # Stages
+    # --------------------------------------------------------------------------
+
+    def run_stage(self, stage: str) -> None:
+        """Runs all the (unfinished) sections of a stage in order"""
+
+        runner = self.runner(stage)
+        for section, item in self.sections(stage):
+            if self.checkpoint.is_done(section):
+                self.log(f'{section}: skipping (done)')
+                continue
+            self.log(f'@ {section}')
+            processed = runner(stage, section, item)
+            self.log(f'{section}: done ({processed} processed)')
+
+    def run(self, stages: List[str], workers: int = 1) -> None:
+        """Runs the selected stages, respecting their dependencies
+
+        With more than 1 worker, stages that do not depend on each other
+        (e.g. 'conferences' & 'metrics') run concurrently.
+
+        Parameters:
+            stages (list): the names of the stages to be run
+            workers (int): maximum number of stages running at once
+        """
+
+        Base.metadata.create_all(engine)
+        ALIASES.load()
+        TOKENS.load()
+        pending = [stage for stage in STAGES if stage in stages]
+        finished = set()
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            running = {}
+            while pending or running:
+                for stage in list(pending):
+                    dependencies = [
+                        dep for dep in DEPENDENCIES[stage] if dep in stages]
+                    if all(dep in finished for dep in dependencies):
+                        pending.remove(stage)
+                        running[executor.submit(self.run_stage, stage)] = stage
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    future.result()  # re-raises the stage's exception
+                    finished.add(stage)
+
+        self.log('populate finished')
+
+    def estimate(self, stages: List[str], sample: int = 5,
+                 workers: int = 1) -> List[dict]:
+        """Estimates the duration of each stage without changing the DB
+
+        For each section, the first 'sample' work units are processed in
+        a transaction that is rolled back. The measured throughput is
+        used to estimate the time needed for the remaining units.
+
+        Parameters:
+            stages (list): the names of the stages to be estimated
+            sample (int): number of work units to process per section
+            workers (int): number of workers the real run would use
+
+        Returns:
+            list: a dict per section with the estimation details
+        """
+
+        # a dry run writes nothing (not even the tables of a new database)
+        missing = set(Base.metadata.tables) - \
+            set(inspect(engine).get_table_names())
+        if missing:
+            self.log(f'{len(missing)} tables are not created yet, the '
+                     f'samples using them will fail')
+        estimates = []
+        for stage in [stage for stage in STAGES if stage in stages]:
+            runner = self.runner(stage)
+            for section, item in self.sections(stage):
+                units = self.units(stage, section, item)
+                t0 = time()
+                try:
+                    processed = runner(
+                        stage, section, item, limit=sample, dry_run=True)
+                except Exception as e:
+                    # The samples of the previous stages are rolled back, so
+                    # the sample can fail if it needs their data (e.g. on an
+                    # empty database).
+                    self.log(f'{section}: sample failed ({type(e).__name__})')
+                    processed = 0
+                elapsed = time() - t0
+                rate = processed / elapsed if elapsed and processed else 0
+                seconds = units / rate if rate else None
+                if stage == 'institutions':
+                    # faculty files are always processed as a whole
+                    seconds = elapsed if units else 0
+                estimates.append({
+                    'stage': stage,
+                    'section': section,
+                    'units': units,
+                    'sampled': processed,
+                    'rate': rate,
+                    'seconds': seconds,
+                })
+
+        for estimate in estimates:
+            seconds = estimate['seconds']
+            seconds = strftime('%H:%M:%S', gmtime(seconds)) \
+                if seconds is not None else 'unknown'
+            print(f'{estimate["section"]}: {estimate["units"]} units, '
+                  f'{estimate["rate"]:.1f} units/s, ~{seconds}')
+
+        # Stages can only overlap (when workers > 1) with other stages that
+        # don't depend on them, so the critical path gives the lower bound.
+        stage_seconds = {}
+        for estimate in estimates:
+            stage_seconds[estimate['stage']] = \
+                stage_seconds.get(estimate['stage'], 0) + \
+                (estimate['seconds'] or 0)
+        finish = {}
+        for stage in [stage for stage in STAGES if stage in stages]:
+            start = max(
+                [finish[dep] for dep in DEPENDENCIES[stage] if dep in finish],
+                default=0)
+            finish[stage] = start + stage_seconds.get(stage, 0)
+        total = max(finish.values(), default=0) if workers > 1 \
+            else sum(stage_seconds.values())
+        print(f'Estimated total: {strftime("%H:%M:%S", gmtime(total))} '
+              f'with {workers} worker(s)')
+
+        return estimates
@@ -0,0 +1,360 @@
+"""Full-text search of papers, authors & sources
+
+Each searchable row is a document with a 'title' (paper titles &
+keywords, author name variants, source titles) and a 'body' (paper
+abstracts, source publishers); matches in the title rank higher. The
+documents are indexed by one of:
+    DatabaseIndex: the 'search_document' table, with a tsvector column &
+        a GIN index on postgresql, or FULLTEXT indexes on mysql
+    SqliteIndex: an embedded SQLite FTS5 index in a local file (e.g.
+        for a web server without access to the main database's index)
+
+An index is built once ('build') and then kept up to date with the
+change log of ingestion ('update', see 'elsametric.changelog'), only
+re-indexing the changed rows.
+"""
+
+import re
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from .changelog import Changes
+from .models.base import Base, DIALECT
+from .models.search_document import Search_Document, TS_CONFIGS
+
+
+ENTITIES = ('paper', 'author', 'source')
+# The columns of each entity whose changes need re-indexing
+INDEXED_COLUMNS = {
+    'paper': {'title', 'abstract', 'keywords'},
+    'author': {
+        'first', 'middle', 'last', 'initials', 'first_pref', 'middle_pref',
+        'last_pref', 'initials_pref', 'first_fa', 'last_fa'},
+    'source': {'title', 'publisher'},
+}
+
+
+class Document(NamedTuple):
+    entity: str
+    id: int
+    title: str
+    body: str
+
+
+class SearchResult(NamedTuple):
+    id: int
+    score: float
+    title: str
+
+
+def _join(*values: Optional[str]) -> str:
+    # distinct non-empty values, in order
+    return ' '.join(dict.fromkeys(value for value in values if value))
+
+
+def _id_chunks(db: Session, entity: str, ids: Optional[Iterable[int]],
+               chunk_size: int) -> Iterator[List[int]]:
+    if ids is not None:
+        ids = sorted(ids)
+        for i in range(0, len(ids), chunk_size):
+            yield ids[i:i + chunk_size]
+        return
+
+    # all ids, in keyset-paginated chunks
+    id_column = Base.metadata.tables[entity].c.id
+    last = None
+    while True:
+        query = select([id_column]).order_by(id_column).limit(chunk_size)
+        if last is not None:
+            query = query.where(id_column > last)
+        chunk = [row[0] for row in db.execute(query)]
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+def documents(db: Session, entity: str, ids: Optional[Iterable[int]] = None,
+              chunk_size: int = 1000) -> Iterator[List[Document]]:
+    """Yields the documents of some rows of an entity, in chunks
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        entity (str): one of 'ENTITIES'
+        ids (iterable): the ids of the rows (default: all rows); ids of
+            missing rows are skipped
+        chunk_size (int): number of rows read at once
+
+    Yields:
+        list: the documents of a chunk of rows
+    """
+
+    tables = Base.metadata.tables
+    for chunk in _id_chunks(db, entity, ids, chunk_size):
+        if entity == 'paper':
+            paper = tables['paper']
+            keyword = tables['keyword']
+            paper_keyword = tables['paper_keyword']
+            keywords: Dict[int, List[str]] = {}
+            for paper_id, word in db.execute(
+                    select([paper_keyword.c.paper_id, keyword.c.keyword])
+                    .select_from(paper_keyword.join(keyword))
+                    .where(paper_keyword.c.paper_id.in_(chunk))):
+                keywords.setdefault(paper_id, []).append(word)
+            yield [
+                Document(entity, id_, _join(title, *keywords.get(id_, [])),
+                         abstract or '')
+                for id_, title, abstract in db.execute(
+                    select([paper.c.id, paper.c.title, paper.c.abstract])
+                    .where(paper.c.id.in_(chunk)))]
+        elif entity == 'author':
+            author = tables['author']
+            columns = [author.c[name] for name in (
+                'first', 'middle', 'last', 'first_pref', 'middle_pref',
+                'last_pref', 'initials', 'initials_pref', 'first_fa',
+                'last_fa')]
+            yield [
+                Document(entity, row[0], _join(*row[1:]), '')
+                for row in db.execute(
+                    select([author.c.id, *columns])
+                    .where(author.c.id.in_(chunk)))]
+        elif entity == 'source':
+            source = tables['source']
+            yield [
+                Document(entity, id_, title or '', publisher or '')
+                for id_, title, publisher in db.execute(
+                    select([source.c.id, source.c.title, source.c.publisher])
+                    .where(source.c.id.in_(chunk)))]
+        else:
+            raise ValueError(f'Invalid search entity: {entity}')
+
+
+class DatabaseIndex:
+    """Full-text index in the 'search_document' table of the database
+
+    The documents are written in the transaction of 'db'; 'commit'
+    commits it.
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.table = Search_Document.__table__
+
+    def __repr__(self) -> str:
+        return f'DatabaseIndex: {DIALECT}'
+
+    def clear(self, entity: str) -> None:
+        self.db.execute(self.table.delete().where(
+            self.table.c.entity == entity))
+
+    def replace(self, entity: str, ids: List[int],
+                documents: List[Document]) -> None:
+        """Replaces the documents of some ids (removing the ids without
+        a document)"""
+
+        if ids:
+            self.db.execute(self.table.delete().where(
+                (self.table.c.entity == entity) &
+                self.table.c.entity_id.in_(ids)))
+        if documents:
+            self.db.execute(self.table.insert(), [
+                {'entity': document.entity, 'entity_id': document.id,
+                 'title': document.title, 'body': document.body}
+                for document in documents])
+
+    def search(self, entity: str, query: str, limit: int = 20,
+               offset: int = 0) -> List[SearchResult]:
+        """Returns the documents matching a query, best matches first
+
+        On postgresql, the query is in web search syntax ('"exact
+        phrase"', 'or', '-excluded') and matches are ranked by cover
+        density, normalized by the document's length; on mysql, the query
+        is in natural language.
+        """
+
+        if DIALECT == 'postgresql':
+            statement = text(
+                'SELECT entity_id, ts_rank_cd(document, query, 1) AS score, '
+                'title FROM search_document, '
+                'websearch_to_tsquery(CAST(:config AS regconfig), :query) '
+                'AS query WHERE entity = :entity AND document @@ query '
+                'ORDER BY score DESC, entity_id LIMIT :limit OFFSET :offset')
+            params = {'config': TS_CONFIGS[entity]}
+        else:  # mysql
+            statement = text(
+                'SELECT entity_id, 2 * MATCH(title) AGAINST (:query) + '
+                'MATCH(title, body) AGAINST (:query) AS score, title '
+                'FROM search_document WHERE entity = :entity AND '
+                'MATCH(title, body) AGAINST (:query) '
+                'ORDER BY score DESC, entity_id LIMIT :limit OFFSET :offset')
+            params = {}
+        rows = self.db.execute(statement, {
+            **params, 'entity': entity, 'query': query, 'limit': limit,
+            'offset': offset})
+        return [SearchResult(int(id_), float(score), title)
+                for id_, score, title in rows]
+
+    def commit(self) -> None:
+        self.db.commit()
+
+
+class SqliteIndex:
+    """Embedded full-text index: a SQLite FTS5 table per entity
+
+    The rowid of each document is the id of its row, so documents are
+    replaced without scanning the index. Words are stemmed (porter) and
+    matches are ranked by BM25, with the title weighing 'title_weight'
+    times the body.
+
+    Parameters:
+        path (Path): the path to the SQLite file (created if missing)
+        title_weight (float): weight of the title in the ranking
+    """
+
+    def __init__(self, path: Path, title_weight: float = 10) -> None:
+        self.path = Path(path)
+        self.title_weight = title_weight
+        self.connection = sqlite3.connect(str(self.path))
+        for entity in ENTITIES:
+            self.connection.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {entity} USING '
+                f'fts5(title, body, tokenize='
+                f"'porter unicode61 remove_diacritics 2')")
+
+    def __repr__(self) -> str:
+        return f'SqliteIndex: {self.path}'
+
+    def clear(self, entity: str) -> None:
+        self.connection.execute(f'DELETE FROM {self._table(entity)}')
+
+    @staticmethod
+    def _table(entity: str) -> str:
+        if entity not in ENTITIES:
+            raise ValueError(f'Invalid search entity: {entity}')
+        return entity
+
+    def replace(self, entity: str, ids: List[int],
+                documents: List[Document]) -> None:
+        table = self._table(entity)
+        self.connection.executemany(
+            f'DELETE FROM {table} WHERE rowid = ?', [(id_,) for id_ in ids])
+        self.connection.executemany(
+            f'INSERT INTO {table} (rowid, title, body) VALUES (?, ?, ?)',
+            [(document.id, document.title, document.body)
+             for document in documents])
+
+    @staticmethod
+    def _match(query: str) -> str:
+        # every word of the query, quoted (so FTS5 operators are literal)
+        return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+    def search(self, entity: str, query: str, limit: int = 20,
+               offset: int = 0) -> List[SearchResult]:
+        """Returns the documents with all words of a query, best matches
+        first"""
+
+        table = self._table(entity)
+        match = self._match(query)
+        if not match:
+            return []
+        rows = self.connection.execute(
+            f'SELECT rowid, -bm25({table}, ?, 1) AS score, title '
+            f'FROM {table} WHERE {table} MATCH ? '
+            f'ORDER BY score DESC, rowid LIMIT ? OFFSET ?',
+            (self.title_weight, match, limit, offset))
+        return [SearchResult(*row) for row in rows]
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+
+def reindex(index, db: Session, entity: str, ids: Iterable[int],
+            chunk_size: int = 1000) -> int:
+    """Replaces the documents of some rows of an entity in an index
+
+    Returns:
+        int: number of documents written
+    """
+
+    written = 0
+    for chunk in _id_chunks(db, entity, ids, chunk_size):
+        chunk_documents = next(
+            documents(db, entity, chunk, chunk_size=len(chunk)), [])
+        index.replace(entity, chunk, chunk_documents)
+        written += len(chunk_documents)
+    return written
+
+
+def build(index, db: Session, entities: Iterable[str] = ENTITIES,
+          chunk_size: int = 1000) -> Dict[str, int]:
+    """Indexes all rows of some entities, replacing their documents
+
+    Returns:
+        dict: number of documents of each entity
+    """
+
+    written = {}
+    for entity in entities:
+        index.clear(entity)
+        written[entity] = 0
+        for chunk_documents in documents(db, entity, chunk_size=chunk_size):
+            index.replace(entity, [], chunk_documents)
+            written[entity] += len(chunk_documents)
+    return written
+
+
+def changed_ids(db: Session, changes: Changes) -> Dict[str, set]:
+    """Returns the ids of the documents affected by some changes
+
+    Parameters:
+        db: a Session instance of SQLAlchemy session factory
+        changes (dict): the net changes of a change log
+
+    Returns:
+        dict: {entity: set of ids}
+    """
+
+    ids = {}
+    for entity in ENTITIES:
+        entity_changes = changes.get(entity)
+        if not entity_changes:
+            continue
+        ids[entity] = entity_changes['inserted'] | \
+            entity_changes['deleted'] | {
+                id_ for id_, columns in entity_changes['updated'].items()
+                if columns & INDEXED_COLUMNS[entity]}
+
+    # papers of the keywords whose text changed
+    keyword_ids = [
+        id_ for id_, columns in
+        changes.get('keyword', {}).get('updated', {}).items()
+        if 'keyword' in columns]
+    paper_keyword = Base.metadata.tables['paper_keyword']
+    for i in range(0, len(keyword_ids), 1000):
+        ids.setdefault('paper', set()).update(row[0] for row in db.execute(
+            select([paper_keyword.c.paper_id])
+            .where(paper_keyword.c.keyword_id.in_(keyword_ids[i:i + 1000]))))
+    return ids
+
+
+def update(index, db: Session, changes: Changes,
+           chunk_size: int = 1000) -> Dict[str, int]:
+    """Re-indexes the documents affected by some changes
+
+    Re-indexing is idempotent, so applying the same changes again (e.g.
+    after a crash before the position of the log was saved) is safe.
+
+    Returns:
+        dict: number of documents written for each entity
+    """
+
+    return {
+        entity: reindex(index, db, entity, ids, chunk_size)
+        for entity, ids in changed_ids(db, changes).items() if ids}
@@ -0,0 +1,28 @@
+"""The stages of a populate run
+
+Kept apart from 'elsametric.populate' (which needs the database), so
+that the command line can list them without a database.
+"""
+
+# The order of the stages is the order of a sequential populate run. Each
+# stage can start as soon as the stages it depends on (if selected) are done.
+STAGES = (
+    'countries',
+    'subjects',
+    'journals',
+    'conferences',
+    'metrics',
+    'papers',
+    'institutions',
+)
+DEPENDENCIES = {
+    'countries': (),
+    'subjects': (),
+    'journals': ('countries', 'subjects'),
+    'conferences': ('countries', 'subjects'),
+    'metrics': ('subjects', 'journals'),
+    'papers': ('countries', 'journals', 'conferences', 'metrics'),
+    'institutions': ('papers',),
+}
+# Stages made of a single section: {'process': bool, 'path': str}
+SINGLE_SECTION_STAGES = ('countries', 'subjects', 'journals', 'conferences')
@@ -6,6 +6,7 @@ from pathlib import Path
 from fuzzywuzzy import fuzz
 from sqlalchemy import extract
 
+from elsametric.helpers.stream import stream_query
 from elsametric.models.base import SessionLocal
 from elsametric.models.associations import Author_Department
 from elsametric.models.associations import Paper_Keyword
@@ -23,7 +24,7 @@ from elsametric.models.source import Source
 from elsametric.models.source_metric import Source_Metric
 from elsametric.models.subject import Subject
 
-from helpers import get_row, new_columns, author_faculty_matcher, exporter
+from helpers import get_row, AuthorMatcher, CsvExporter
 
 
 # ==============================================================================
@@ -58,45 +59,35 @@ for item in config['institutions']:
     export_path = DATA_PATH / f'{institution}_scp.csv'
 
     db = SessionLocal()
+    # Only the name columns are needed: they are streamed as lightweight rows
+    # instead of loading full Author objects.
     authors = db \
-        .query(Author) \
+        .query(Author.id, Author.id_scp, Author.first, Author.last,
+               Author.first_pref, Author.last_pref, Author.first_fa,
+               Author.last_fa) \
         .join((Department, Author.departments)) \
         .join((Institution, Department.institution)) \
         .filter(Institution.id_scp == institution_id_scp) \
-        .all()  # empty list if not found
+        .distinct()
+    authors = list(stream_query(db, authors))  # empty list if not found
 
     if not authors:
         print('skipping (no authors found)')
         continue
 
-    csv_headers = not Path(export_path).is_file()
     print(f'processing ({len(authors)} authors found)')
-    for faculty in faculties:
-        print(f'{faculty["Institution ID"]} ...', end=' ')
-        new_columns(faculty, ['Scopus ID', 'Scopus ID Confidence'], None)
-
-        if faculty['Scopus ID']:  # faculty's Scopus ID already known
-            print('skipping (Scopus ID already present)')
-            exporter(export_path, [faculty],  headers=csv_headers)
-            csv_headers = False
-            continue
-
-        try:
-            initials = faculty['Initials En']
-            if not initials:
-                raise ValueError
-        except (KeyError, ValueError):
-            initials = faculty['First En'][0]
-
-        matches, confidence_level = author_faculty_matcher(
-            authors, faculty['First En'], faculty['Last En'], initials, cutoff)
-
-        if matches:
-            faculty['Scopus ID'] = ', '.join(str(match) for match in matches)
-            faculty['Scopus ID Confidence'] = confidence_level
-            print(f'found: {confidence_level} confidence')
-        else:
-            print('not found')
-
-        exporter(export_path, [faculty],  headers=csv_headers)
-        csv_headers = False
+    # The indexes are built once per institution; each faculty is then
+    # matched against its candidates only.
+    matcher = AuthorMatcher(authors, cutoff)
+    db.close()
+    with CsvExporter(export_path) as export_file:
+        for faculty in matcher.match_rows(faculties):
+            confidence_level = faculty['Scopus ID Confidence']
+            if confidence_level:
+                status = f'found: {confidence_level} confidence'
+            elif faculty['Scopus ID']:
+                status = 'skipping (Scopus ID already present)'
+            else:
+                status = 'not found'
+            print(f'{faculty["Institution ID"]} ... {status}')
+            export_file.write(faculty)
@@ -0,0 +1,80 @@
+"""Benchmarks the loading of Paper objects with different column profiles
+
+For each profile, the first 'limit' papers are loaded with a fresh session
+and the following are reported:
+    - time: seconds to query & build the objects
+    - payload: bytes of the column values received (approximately the bytes
+    transferred from the database)
+    - memory: peak memory (tracemalloc) while loading
+
+Usage (from a directory with the elsametric '.env' file):
+    python deferred_benchmark.py --limit 10000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import undefer_group
+
+from elsametric.helpers import Paper  # registers all the mapped classes
+from elsametric.models.base import SessionLocal
+
+
+PROFILES = {
+    'all columns': lambda query: query.options(undefer_group('heavy')),
+    'default (heavy deferred)': lambda query: query,
+    'analytics (load_only)': lambda query: query.options(Paper.analytics()),
+}
+
+
+def payload(papers: list) -> int:
+    # bytes of the loaded column values of the papers
+    total = 0
+    for paper in papers:
+        for value in inspect(paper).dict.values():
+            if isinstance(value, str):
+                total += len(value.encode('utf-8'))
+            elif isinstance(value, (int, float, bool, date)):
+                total += sys.getsizeof(value)
+    return total
+
+
+def benchmark(profile, limit: int) -> dict:
+    db = SessionLocal()
+    try:
+        tracemalloc.start()
+        t0 = time.time()
+        papers = profile(db.query(Paper)).order_by(Paper.id).limit(limit).all()
+        duration = time.time() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'papers': len(papers),
+            'time': duration,
+            'payload': payload(papers),
+            'memory': peak,
+        }
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--limit', type=int, default=10000)
+    args = parser.parse_args()
+
+    results = {
+        name: benchmark(profile, args.limit)
+        for name, profile in PROFILES.items()}
+    base = results['all columns']
+    print(f'{"profile":<26}{"papers":>8}{"time (s)":>10}'
+          f'{"payload (KB)":>14}{"memory (KB)":>13}{"saved":>8}')
+    for name, result in results.items():
+        saved = 1 - result['memory'] / base['memory'] if base['memory'] else 0
+        print(f'{name:<26}{result["papers"]:>8}{result["time"]:>10.3f}'
+              f'{result["payload"] / 1024:>14.1f}'
+              f'{result["memory"] / 1024:>13.1f}{saved:>8.0%}')
@@ -1,170 +1,112 @@
 import io
-import csv
 import json
+import asyncio
+from pathlib import Path
+from typing import Dict, List, Optional
 
-import requests as req
 from bs4 import BeautifulSoup
 from furl import furl
-from pathlib import Path
 
-from helpers import get_row, exporter, nullify, new_columns
+from faculty_crawler import crawl, FacultyCrawler, FacultyParser, Request
+from helpers import new_columns
 
 
 # ==============================================================================
-# Config
+# Parser
 # ==============================================================================
 
 
-CURRENT_DIR = Path.cwd()
-with io.open(CURRENT_DIR / 'crawlers_config.json', 'r') as config_file:
-    config = json.load(config_file)
-config = config['institutions']['University of Tehran']
-
-DATA_PATH = CURRENT_DIR / config['data_directory']
-FACULTY_LIST_PATH = DATA_PATH / config['faculties_list_raw']
-FACULTY_DETAILS_PATH = DATA_PATH / config['faculties_details_raw']
-ERRORS_LOG_PATH = DATA_PATH / config['errors_log']
-BASE = config['base_url']
-FIRST_PAGE = config['first_page']
-FIRST_FACULTY_ID = config['first_faculty_id']
-
-HEADERS = {'User-Agent': config['user_agent']}
-
-try:  # find the total number of pages
-    page = req.get(url=BASE, headers=HEADERS)
-    page.raise_for_status()
-    last_page_url = BeautifulSoup(page.text, 'html.parser') \
-        .find('ul', attrs={'class': 'pagination'}) \
-        .find('li', attrs={'class': 'last'}) \
-        .find('a')['href']  # format: https://ut.ac.ir/fa/faculty?page=1
-    LAST_PAGE = int(furl(last_page_url).args['page'])
-except (AttributeError, req.HTTPError):
-    LAST_PAGE = 106  # hardcoded value
-
-
-# ==============================================================================
-# Step 1: Get a list of all faculties
-# ==============================================================================
+class TehranParser(FacultyParser):
+    name = 'tehran'
+
+    table_attrs = {
+        'class': 'table table-striped table-bordered responsive-table'}
+    list_mapper = {
+        'نام': 'First Fa',
+        'نام خانوادگی': 'Last Fa',
+        'دانشکده/گروه': 'Faculty & Department Fa',
+        'رتبه': 'Rank Fa',
+        'پست الکترونیکی': ''  # Email address, shown as an image: skip it
+    }
+    COLUMNS = ['First Fa', 'Last Fa', 'Faculty & Department Fa', 'Rank Fa',
+               'Email', 'Institution ID', 'Personal Website']
+    info_mapper = {
+        'نام و نام خانوادگی': '',  # Full Name, already collected: skip it
+        'پست الکترونیک': '',  # Email address, already collected: skip it
+        'مرتبه علمی': '',  # Rank, already collected: skip it
+        'آدرس محل کار': '',  # Office address, not needed: skip it
+        'دانشکده/گروه': 'Department Fa',
+        'تلفن محل کار': 'Phone (Office)',
+        'نمابر': 'Fax',
+        'ادرس وب سایت': '',  # Personal Website, already collected: skip it
+        'Full Name': 'Full Name En',
+        'Email': '',
+        'Academic Rank': 'Rank En',
+        'Department': 'Department En',
+        'Work phone': '',
+        'Fax': '',
+        'Website': '',
+    }
+    ADDITIONAL_COLUMNS = ['Department Fa', 'Phone (Office)',
+                          'Fax', 'Full Name En', 'Rank En', 'Department En']
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url
+
+    async def list_requests(self, crawler: FacultyCrawler) -> List[Request]:
+        last_page = 106  # hardcoded value, used if the pagination is missing
+        page = await crawler.fetch(Request(self.base_url))
+        try:  # find the total number of pages
+            # format of the url: https://ut.ac.ir/fa/faculty?page=1
+            last_page_url = BeautifulSoup(page, 'html.parser') \
+                .find('ul', attrs={'class': 'pagination'}) \
+                .find('li', attrs={'class': 'last'}) \
+                .find('a')['href']
+            last_page = int(furl(last_page_url).args['page'])
+        except (AttributeError, TypeError, KeyError, ValueError):
+            pass
 
+        return [Request(self.base_url, params={'page': page_num})
+                for page_num in range(1, last_page + 1)]
 
-table_attrs = {'class': 'table table-striped table-bordered responsive-table'}
-info_mapper = {
-    'نام': 'First Fa',
-    'نام خانوادگی': 'Last Fa',
-    'دانشکده/گروه': 'Faculty & Department Fa',
-    'رتبه': 'Rank Fa',
-    'پست الکترونیکی': ''  # Email address, which is shown as an image: skip it
-}
-# if file exists don't write headers row
-COLUMNS = ['First Fa', 'Last Fa', 'Faculty & Department Fa', 'Rank Fa',
-           'Email', 'Institution ID', 'Personal Website']
-csv_headers = not(Path(FACULTY_LIST_PATH).is_file())
-for page_num in range(FIRST_PAGE or 1, LAST_PAGE + 1):  # loop through each page
-    print(f'Page {page_num}/{LAST_PAGE} ...', end=' ')
-    if not FIRST_PAGE:
-        print('skipping (config)')
-        continue
-
-    try:
-        page = req.get(url=BASE, params={'page': page_num}, headers=HEADERS)
-        page.raise_for_status()
-        rows = BeautifulSoup(page.text, 'html.parser') \
-            .find('table', attrs=table_attrs) \
+    def parse_list(self, request: Request, page: str) -> List[dict]:
+        rows = BeautifulSoup(page, 'html.parser') \
+            .find('table', attrs=self.table_attrs) \
             .find('tbody') \
             .find_all('tr')
-    except (AttributeError, req.HTTPError):  # table not found, go to next page
-        print('error')
-        continue
-
-    for row in rows:  # each row contains the contact info of a faculty member
-        parsed_row = {}
-        new_columns(parsed_row, COLUMNS, None)
-        try:
-            faculty_url = row.find('a', href=True)['href']
-            parsed_row['Personal Website'] = faculty_url.strip()
-            parsed_row['Institution ID'] = furl(faculty_url).path.segments[-1]
-            parsed_row['Email'] = f'{parsed_row["Institution ID"]}@ut.ac.ir'
-        except TypeError:
-            pass
-
-        columns = row.find_all('td')
-        for column in columns:
-            column_name_en = info_mapper[column['data-title']]
-            if not column_name_en:
-                continue
-            parsed_row[column_name_en] = column.text \
-                .strip().replace('\u200c', '')
-
-        nullify(parsed_row)  # replace null like values (e.g. '---') with None
-        exporter(FACULTY_LIST_PATH, [parsed_row], headers=csv_headers)
-        csv_headers = False
-    print('exported')
-
-
-# ==============================================================================
-# Step 2: Get additional data for each faculty (from Farsi & English pages)
-# ==============================================================================
-
 
-rows = get_row(FACULTY_LIST_PATH)
-info_mapper = {
-    'نام و نام خانوادگی': '',  # Full Name, which is already collected: skip it
-    'پست الکترونیک': '',  # Email address, which is already collected: skip it
-    'مرتبه علمی': '',  # Rank, which is already collected: skip it
-    'آدرس محل کار': '',  # Office address, which is not needed: skip it
-    'دانشکده/گروه': 'Department Fa',
-    'تلفن محل کار': 'Phone (Office)',
-    'نمابر': 'Fax',
-    'ادرس وب سایت': '',  # Personal Website, which is already collected: skip it
-    'Full Name': 'Full Name En',
-    'Email': '',
-    'Academic Rank': 'Rank En',
-    'Department': 'Department En',
-    'Work phone': '',
-    'Fax': '',
-    'Website': '',
-}
-ADDITIONAL_COLUMNS = ['Department Fa', 'Phone (Office)',
-                      'Fax', 'Full Name En', 'Rank En', 'Department En']
-errors = []
-# if file exists don't write headers row
-csv_headers = not(Path(FACULTY_DETAILS_PATH).is_file())
-first_faculty_crawled = not FIRST_FACULTY_ID or False  # no config => crawl all
-for row in rows:
-    if not row['Institution ID']:
-        continue
-    print(f'ID: {row["Institution ID"]} ...', end=' ')
-    if row['Institution ID'] == FIRST_FACULTY_ID:  # reached the first faculty
-        first_faculty_crawled = True
-    if not first_faculty_crawled:  # first faculty (in config) not reached yet
-        print('skipping (config)')
-        continue
-    if not row['Personal Website']:  # faculty page not available
-        exporter(FACULTY_DETAILS_PATH, [row], headers=csv_headers)
-        csv_headers = False
-        print('error (page not available) ... exported')
-        continue
-
-    new_columns(row, ADDITIONAL_COLUMNS, None)
-    try:
-        page_fa = req.get(
-            url=row['Personal Website'],
-            params={'lang': 'fa-ir'},
-            allow_redirects=False,
-            headers=HEADERS
-        )
-        page_fa.raise_for_status()
-        soup = BeautifulSoup(page_fa.text, 'html.parser')
-    except req.HTTPError as e:
-        exporter(FACULTY_DETAILS_PATH, [row], headers=csv_headers)
-        csv_headers = False
-        errors.append({
-            'type': str(type(e)), 'msg': str(e), 'section': 'page',
-            'id': row['Institution ID']})
-        print('error (page not available) ... exported')
-        continue
-
-    try:  # faculty's general info
+        parsed_rows = []
+        for row in rows:  # each row contains the contact info of a faculty
+            parsed_row = {}
+            new_columns(parsed_row, self.COLUMNS, None)
+            try:
+                faculty_url = row.find('a', href=True)['href']
+                parsed_row['Personal Website'] = faculty_url.strip()
+                parsed_row['Institution ID'] = \
+                    furl(faculty_url).path.segments[-1]
+                parsed_row['Email'] = \
+                    f'{parsed_row["Institution ID"]}@ut.ac.ir'
+            except TypeError:
+                pass
+
+            for column in row.find_all('td'):
+                column_name_en = self.list_mapper[column['data-title']]
+                if not column_name_en:
+                    continue
+                parsed_row[column_name_en] = column.text \
+                    .strip().replace('\u200c', '')
+            parsed_rows.append(parsed_row)
+        return parsed_rows
+
+    def detail_requests(self, row: dict) -> Dict[str, Request]:
+        if not row['Personal Website']:  # faculty page not available
+            return {}
+        return {
+            lang: Request(row['Personal Website'], params={'lang': lang},
+                          tag=lang, allow_redirects=False)
+            for lang in ('fa-ir', 'en-gb')}
+
+    def _general_info(self, row: dict, soup: BeautifulSoup) -> None:
         general_info = soup \
             .find('div', attrs={'class': 'cv-info'}) \
             .find('table') \
@@ -174,66 +116,66 @@ for row in rows:
             # table columns format: [item_type, ':', item_content]
             columns = item.find_all('td')
             columns = [element.text.strip() for element in columns]
-            column_name_en = info_mapper[columns[0]]
+            column_name_en = self.info_mapper[columns[0]]
             if not column_name_en:
                 continue
             row[column_name_en] = columns[2].strip()
-        print('General info done ...', end=' ')
-    except AttributeError:
-        print('General info error ...', end=' ')
-        errors.append({
-            'type': str(type(e)), 'msg': str(e), 'section': 'info',
-            'id': row['Institution ID']})
-        pass
-
-    try:  # faculty's profile picture
-        main_content = soup.find('div', attrs={'class': 'main-content'})
-        row['Profile Picture URL'] = main_content \
-            .find('div', attrs={'class': 'profile-pic'}) \
-            .find('img', src=True)['src']
-        print('Profile picture done ...', end=' ')
-    except Exception as e:  # catchall
-        print('Profile picture error ...', end=' ')
-        errors.append({
-            'type': str(type(e)), 'msg': str(e), 'section': 'pic',
-            'id': row['Institution ID']})
-        pass
-
-    try:  # crawl the english page for general_info as well
-        page_en = req.get(
-            url=row['Personal Website'],
-            params={'lang': 'en-gb'},
-            allow_redirects=False,
-            headers=HEADERS
-        )
-        page_en.raise_for_status()
-        general_info = BeautifulSoup(page_en.text, 'html.parser') \
-            .find('div', attrs={'class': 'cv-info'}) \
-            .find('table') \
-            .find_all('tr')
 
-        for item in general_info:
-            columns = item.find_all('td')
-            columns = [element.text.strip() for element in columns]
-            column_name_en = info_mapper[columns[0]]
-            if not column_name_en:
-                continue
-            row[column_name_en] = columns[2].strip()
-        print('English page done ...', end=' ')
-    except Exception as e:  # catchall
-        print('English page error ...', end=' ')
-        errors.append({
-            'type': str(type(e)), 'msg': str(e), 'section': 'eng',
-            'id': row['Institution ID']})
-        pass
-
-    nullify(row)
-    exporter(FACULTY_DETAILS_PATH, [row], headers=csv_headers)
-    csv_headers = False
-    print('exported')
-
-if errors:
-    csv_headers = not Path(ERRORS_LOG_PATH).is_file()
-    exporter(ERRORS_LOG_PATH, errors, bulk=True, headers=csv_headers)
-    print()
-    print('error logs exported')
+    def parse_detail(self, row: dict,
+                     pages: Dict[str, Optional[str]]) -> List[dict]:
+        errors = []
+        faculty_id = row['Institution ID']
+        if not pages:  # faculty page not available
+            return errors
+
+        new_columns(row, self.ADDITIONAL_COLUMNS, None)
+        if pages['fa-ir'] is None:
+            errors.append({
+                'type': 'HTTPError', 'msg': 'page not available',
+                'section': 'page', 'id': faculty_id})
+            return errors
+        soup = BeautifulSoup(pages['fa-ir'], 'html.parser')
+
+        try:  # faculty's general info
+            self._general_info(row, soup)
+        except AttributeError as e:
+            errors.append({
+                'type': str(type(e)), 'msg': str(e), 'section': 'info',
+                'id': faculty_id})
+
+        try:  # faculty's profile picture
+            main_content = soup.find('div', attrs={'class': 'main-content'})
+            row['Profile Picture URL'] = main_content \
+                .find('div', attrs={'class': 'profile-pic'}) \
+                .find('img', src=True)['src']
+        except Exception as e:  # catchall
+            errors.append({
+                'type': str(type(e)), 'msg': str(e), 'section': 'pic',
+                'id': faculty_id})
+
+        try:  # the english page has the general_info as well
+            soup_en = BeautifulSoup(pages['en-gb'], 'html.parser')
+            self._general_info(row, soup_en)
+        except Exception as e:  # catchall (including a missing page)
+            errors.append({
+                'type': str(type(e)), 'msg': str(e), 'section': 'eng',
+                'id': faculty_id})
+
+        return errors
+
+
+# ==============================================================================
+# Config & Script
+# ==============================================================================
+
+
+if __name__ == '__main__':
+    CURRENT_DIR = Path.cwd()
+    with io.open(CURRENT_DIR / 'crawlers_config.json', 'r') as config_file:
+        config = json.load(config_file)
+    config = config['institutions']['University of Tehran']
+
+    asyncio.run(crawl(
+        TehranParser(config['base_url']),
+        config,
+        CURRENT_DIR / config['data_directory']))
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import io
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fetcher import Fetcher, ResponseCache
+from helpers import CsvExporter, get_row, nullify
+
+
+class Request(NamedTuple):
+    url: str
+    params: Optional[dict] = None
+    tag: str = ''  # used by parsers to tell different kinds of pages apart
+    allow_redirects: bool = True
+
+
+class FacultyParser:
+    """Base class of the site-specific parsers used by FacultyCrawler
+
+    Crawling an institution's faculty directory has two steps:
+        1. list: fetch the directory pages (the ones returned by
+        'list_requests') and extract a row for each faculty using
+        'parse_list'; the rows of all pages are combined by 'merge'
+        2. details: for each faculty row, fetch the pages returned by
+        'detail_requests' and update the row using 'parse_detail'
+
+    Adding a new institution means sub-classing this class and
+    implementing the methods below; fetching, caching, concurrency,
+    resuming and exporting are handled by FacultyCrawler.
+    """
+
+    name = ''
+    key = 'Institution ID'  # the column identifying each faculty
+
+    async def list_requests(self, crawler: 'FacultyCrawler') -> List[Request]:
+        """Returns the directory pages; may fetch pages using 'crawler'"""
+
+        raise NotImplementedError
+
+    def parse_list(self, request: Request, page: str) -> List[dict]:
+        """Returns the faculty rows found in a directory page"""
+
+        raise NotImplementedError
+
+    def merge(self, pages: List[Tuple[Request, List[dict]]]) -> List[dict]:
+        """Combines the rows of all directory pages into a single list
+
+        By default, rows with the same 'key' are merged, the values of
+        the later rows filling the missing values of the earlier ones.
+        Rows without a key (e.g. no profile link) are kept as they are.
+        """
+
+        rows: List[dict] = []
+        keyed: Dict[str, dict] = {}
+        for _, page_rows in pages:
+            for row in page_rows:
+                key = row.get(self.key)
+                if key is None:
+                    rows.append(row)
+                    continue
+                current = keyed.get(key)
+                if current is None:
+                    keyed[key] = row
+                    rows.append(row)
+                    continue
+                for column, value in row.items():
+                    if current.get(column) is None:
+                        current[column] = value
+        return rows
+
+    def detail_requests(self, row: dict) -> Dict[str, Request]:
+        """Returns the pages of a faculty: {tag: Request}"""
+
+        return {}
+
+    def parse_detail(self, row: dict,
+                     pages: Dict[str, Optional[str]]) -> List[dict]:
+        """Updates 'row' in-place using the fetched pages of the faculty
+
+        Pages that could not be fetched are None.
+
+        Returns:
+            list: the errors encountered, as dicts with 'type', 'msg',
+                'section', and 'id' keys
+        """
+
+        return []
+
+
+class Progress:
+    """Append-only record of the finished steps & faculties of a crawl
+
+    Each finished item is a line in the file at 'path', so recording
+    progress is a single small write and an interrupted crawl can be
+    resumed by re-reading the file.
+
+    Parameters:
+        path (Path): the path to the progress file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.done: Set[str] = set()
+        if self.path.is_file():
+            with io.open(self.path, 'r', encoding='utf-8') as file:
+                self.done = {line.strip() for line in file if line.strip()}
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.done
+
+    def add(self, item: str) -> None:
+        self.update([item])
+
+    def update(self, items: List[str]) -> None:
+        if not items:
+            return
+        with io.open(self.path, 'a', encoding='utf-8') as file:
+            file.write(''.join(f'{item}\n' for item in items))
+        self.done.update(items)
+
+
+class FacultyCrawler:
+    """Crawls an institution's faculty directory using a FacultyParser
+
+    Pages are fetched concurrently through a shared Fetcher and their
+    raw html is cached on disk, so re-runs don't hit the website again.
+    The faculty list is exported to 'list_path' and the detailed rows
+    are appended to 'details_path' as they are finished. Finished steps
+    & faculties are recorded in a Progress file, so an interrupted crawl
+    continues where it stopped.
+
+    Parameters:
+        parser (FacultyParser): the site-specific parser
+        fetcher (Fetcher): an open Fetcher to make the requests
+        list_path (Path): the .csv file for the faculty list
+        details_path (Path): the .csv file for the detailed rows
+        errors_path (Path): the .csv file for the errors log
+        progress_path (Path): the file recording the crawl's progress
+        cache (ResponseCache): the cache of the raw html pages
+    """
+
+    def __init__(self, parser: FacultyParser, fetcher: Fetcher,
+                 list_path: Path, details_path: Path, errors_path: Path,
+                 progress_path: Path,
+                 cache: Optional[ResponseCache] = None) -> None:
+        self.parser = parser
+        self.fetcher = fetcher
+        self.list_path = Path(list_path)
+        self.details_path = Path(details_path)
+        self.errors_path = Path(errors_path)
+        self.progress = Progress(progress_path)
+        self.cache = cache
+        self.errors: List[dict] = []
+
+    def __repr__(self) -> str:
+        return f'FacultyCrawler: {self.parser.name}'
+
+    async def fetch(self, request: Request) -> Optional[str]:
+        """Returns the html of a page, from the cache if available"""
+
+        key = hashlib.sha1(
+            f'{request.url}|{sorted((request.params or {}).items())}'
+            .encode('utf-8')).hexdigest()
+        key = f'{self.parser.name}_{key}'
+        if self.cache:
+            entry = self.cache.get(key)
+            if entry:
+                return entry['body']
+
+        page = await self.fetcher.fetch(
+            request.url, params=request.params,
+            allow_redirects=request.allow_redirects)
+        if page is not None and self.cache:
+            self.cache.set(key, page)
+        return page
+
+    async def crawl_list(self) -> None:
+        """Step 1: fetches the directory pages & exports the faculty list"""
+
+        if 'step: list' in self.progress and self.list_path.is_file():
+            print('faculty list: skipping (already crawled)')
+            return
+
+        requests = await self.parser.list_requests(self)
+        pages = await asyncio.gather(
+            *(self.fetch(request) for request in requests))
+
+        parsed = []
+        for request, page in zip(requests, pages):
+            if page is None:
+                print(f'{request.url} {request.params}: error (not available)')
+                continue
+            try:
+                parsed.append((request, self.parser.parse_list(request, page)))
+            except AttributeError:  # page doesn't have the expected structure
+                print(f'{request.url} {request.params}: error (parsing)')
+
+        rows = self.parser.merge(parsed)
+        for row in rows:
+            nullify(row)
+        with CsvExporter(self.list_path, reset=True) as list_file:
+            list_file.writerows(rows)
+        self.progress.add('step: list')
+        print(f'faculty list: {len(rows)} faculties exported')
+
+    async def crawl_faculty(self, row: dict) -> dict:
+        requests = self.parser.detail_requests(row)
+        tags = list(requests)
+        pages = await asyncio.gather(
+            *(self.fetch(requests[tag]) for tag in tags))
+        errors = self.parser.parse_detail(row, dict(zip(tags, pages)))
+        self.errors.extend(errors)
+        nullify(row)
+        return row
+
+    async def crawl_details(self) -> None:
+        """Step 2: fetches the pages of each faculty & exports the rows"""
+
+        key = self.parser.key
+        rows = [row for row in get_row(self.list_path)
+                if row[key] and f'faculty: {row[key]}' not in self.progress]
+        # Faculties are recorded as finished only after their rows are
+        # synced to disk, so a crash never skips an unsaved row on resume.
+        finished: List[str] = []
+        with CsvExporter(self.details_path) as details_file:
+            try:
+                tasks = [self.crawl_faculty(row) for row in rows]
+                for task in asyncio.as_completed(tasks):
+                    row = await task
+                    details_file.write(row)
+                    finished.append(f'faculty: {row[key]}')
+                    print(f'ID: {row[key]} ... exported')
+                    if len(finished) >= details_file.buffer_size:
+                        details_file.checkpoint()
+                        self.progress.update(finished)
+                        finished = []
+            finally:
+                details_file.checkpoint()
+                self.progress.update(finished)
+
+        if self.errors:
+            with CsvExporter(self.errors_path) as errors_file:
+                errors_file.writerows(self.errors)
+            print('error logs exported')
+
+    async def run(self) -> None:
+        await self.crawl_list()
+        await self.crawl_details()
+
+
+async def crawl(parser: FacultyParser, config: dict, data_path: Path) -> None:
+    """Crawls an institution using its section of 'crawlers_config.json'
+
+    Parameters:
+        parser (FacultyParser): the site-specific parser
+        config (dict): the institution's config
+        data_path (Path): the directory of the exported files
+    """
+
+    headers = {'User-Agent': config['user_agent']}
+    cache = ResponseCache(
+        data_path / config.get('cache_directory', f'{parser.name}_html'),
+        expiration_days=config.get('cache_expiration_days', 0))
+    async with Fetcher(headers=headers,
+                       concurrency=config.get('concurrency', 8),
+                       rate=config.get('rate', 4),
+                       burst=config.get('burst', 8)) as fetcher:
+        crawler = FacultyCrawler(
+            parser, fetcher,
+            list_path=data_path / config['faculties_list_raw'],
+            details_path=data_path / config['faculties_details_raw'],
+            errors_path=data_path / config['errors_log'],
+            progress_path=data_path / config.get(
+                'progress_file', f'{parser.name}_progress.txt'),
+            cache=cache)
+        await crawler.run()
+        print(f'{parser.name}: {fetcher.stats}')
@@ -0,0 +1,227 @@
+import asyncio
+import io
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+
+class TokenBucket:
+    """Rate limiter allowing 'rate' requests per second on average
+
+    Up to 'capacity' requests can be made at once (a burst); after that,
+    each request has to wait for a new token, which are added to the
+    bucket at 'rate' tokens per second.
+
+    Parameters:
+        rate (float): number of tokens added to the bucket per second
+        capacity (int): maximum number of tokens in the bucket
+    """
+
+    def __init__(self, rate: float, capacity: int = 1) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ResponseCache:
+    """Persistent on-disk cache of HTTP response bodies
+
+    Each response is stored in a separate JSON file inside 'directory',
+    named after its key (e.g. a google scholar id), along with the time
+    it was retrieved. Entries older than 'expiration_days' are ignored.
+
+    Parameters:
+        directory (Path): the directory to store the cached responses
+        expiration_days (float): the number of days a response is valid;
+            0 means responses never expire
+    """
+
+    def __init__(self, directory: Path, expiration_days: float = 0) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.expiration = expiration_days * 24 * 3600
+
+    def _path(self, key: str) -> Path:
+        # keep the file names safe on every OS
+        return self.directory / f'{re.sub(r"[^A-Za-z0-9_.-]", "_", key)}.json'
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached entry: {'time': int, 'body': str} or None"""
+
+        try:
+            with io.open(self._path(key), 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):  # not cached (or a corrupt file)
+            return None
+
+        if self.expiration and time.time() - entry['time'] > self.expiration:
+            return None
+        return entry
+
+    def set(self, key: str, body: str) -> dict:
+        entry = {'time': int(time.time()), 'body': body}
+        path = self._path(key)
+        temp_path = path.with_name(f'{path.name}.tmp')
+        with io.open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file)
+        temp_path.replace(path)
+        return entry
+
+
+class Fetcher:
+    """Concurrent, rate limited & cached HTTP client
+
+    All requests share a pooled 'aiohttp' session, so connections are
+    reused. At most 'concurrency' requests are in flight at once and each
+    host gets its own TokenBucket. Failed requests (connection errors,
+    HTTP 429 & 5xx) are retried with exponential backoff (plus jitter),
+    honouring the 'Retry-After' header when present.
+
+    Use it as an async context manager:
+        async with Fetcher(headers=HEADERS) as fetcher:
+            body = await fetcher.fetch(url, params)
+
+    Parameters:
+        headers (dict): the headers sent with every request
+        concurrency (int): maximum number of requests in flight
+        rate (float): maximum requests per second, per host
+        burst (int): maximum number of back-to-back requests, per host
+        retries (int): number of times a failed request is retried
+        backoff (float): seconds to wait before the first retry; doubled
+            after each retry
+        cache (ResponseCache): optional cache for the response bodies
+        timeout (float): total seconds allowed for each request
+    """
+
+    def __init__(self, headers: Optional[dict] = None, concurrency: int = 8,
+                 rate: float = 2, burst: int = 5, retries: int = 4,
+                 backoff: float = 1, cache: Optional[ResponseCache] = None,
+                 timeout: float = 30) -> None:
+        self.headers = headers or {}
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {'requests': 0, 'cached': 0, 'retries': 0, 'failed': 0}
+
+    async def __aenter__(self) -> 'Fetcher':
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.session = aiohttp.ClientSession(
+            headers=self.headers, timeout=self.timeout,
+            connector=aiohttp.TCPConnector(limit=self.concurrency))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.session.close()
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    async def request(self, url: str, params: Optional[dict] = None,
+                      method: str = 'GET', allow_redirects: bool = True,
+                      **kwargs) -> Optional[aiohttp.ClientResponse]:
+        """Makes a request (with retries) and returns the read response
+
+        The body of the returned response is already read, so it can be
+        used after the connection is released. Responses with a 4xx
+        status (other than 429) are returned as-is, without retrying; so
+        are 429 responses with an 'X-RateLimit-Remaining: 0' header, as
+        the quota is used up and retrying before it resets is pointless.
+
+        Returns:
+            the response, or None if all retries failed
+        """
+
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self._bucket(url).acquire()
+                self.stats['requests'] += 1
+                try:
+                    async with self.session.request(
+                            method, url, params=params,
+                            allow_redirects=allow_redirects,
+                            **kwargs) as response:
+                        await response.read()
+                        if response.status != 429 and response.status < 500:
+                            return response
+                        if response.headers.get(
+                                'X-RateLimit-Remaining') == '0':
+                            return response
+                        retry_after = response.headers.get('Retry-After')
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+
+            if attempt == self.retries:
+                break
+            self.stats['retries'] += 1
+            try:
+                wait = float(retry_after)
+            except (TypeError, ValueError):  # no valid 'Retry-After' header
+                wait = delay * (1 + random.random() / 2)
+            await asyncio.sleep(wait)
+            delay *= 2
+
+        self.stats['failed'] += 1
+        return None
+
+    async def fetch(self, url: str, params: Optional[dict] = None,
+                    cache_key: Optional[str] = None,
+                    **kwargs) -> Optional[str]:
+        """Returns the body of a successful GET request, using the cache
+
+        Parameters:
+            url (str): the url to get
+            params (dict): the query string parameters
+            cache_key (str): the key to store the response in the cache;
+                if not provided, the response won't be cached
+
+        Returns:
+            str: the body of the response, or None if the request failed
+        """
+
+        if self.cache and cache_key:
+            entry = self.cache.get(cache_key)
+            if entry:
+                self.stats['cached'] += 1
+                return entry['body']
+
+        response = await self.request(url, params=params, **kwargs)
+        if response is None or response.status >= 400:
+            return None
+
+        body = await response.text()
+        if self.cache and cache_key:
+            self.cache.set(cache_key, body)
+        return body
@@ -0,0 +1,135 @@
+import asyncio
+import time
+from typing import Callable, Iterable, List, Optional
+
+import scholarly
+
+from fetcher import Fetcher
+from helpers import gsc_parse_metrics, new_columns
+
+
+COLUMNS = [f'Google Scholar {i}'
+           for i in ['ID', 'Name', 'h-index', 'i10-index', 'Retrieval Time']]
+
+
+def _search_author(query: str):
+    # 'scholarly' is blocking; this runs in a thread of the default executor
+    return next(scholarly.search_author(query), None)
+
+
+async def find_gsc_profile(row: dict, institution: str,
+                           search_lock: asyncio.Semaphore):
+    """Finds the google scholar profile of a faculty using 'scholarly'
+
+    A query with high specificity (names & institution) is tried first;
+    if it has no results, the institution is dropped from the query.
+
+    Parameters:
+        row (dict): the faculty row, with 'First En' & 'Last En' keys
+        institution (str): the name of the faculty's institution
+        search_lock (Semaphore): bounds the concurrent 'scholarly' calls
+
+    Returns:
+        the first 'scholarly' author found, or None
+    """
+
+    loop = asyncio.get_event_loop()
+    query = [row['First En'], row['Last En'], institution]
+    async with search_lock:
+        author = await loop.run_in_executor(
+            None, _search_author, ' '.join(query))
+        if not author:
+            author = await loop.run_in_executor(
+                None, _search_author, ' '.join(query[:-1]))
+    return author
+
+
+async def crawl_row(fetcher: Fetcher, row: dict, base_url: str,
+                    expiration_days: float, institution: str,
+                    search_lock: asyncio.Semaphore) -> dict:
+    """Updates a faculty row with its google scholar id & metrics
+
+    Metrics are fetched only if they are missing from the row or are
+    older than 'expiration_days'. Profile pages are looked up in the
+    fetcher's cache (keyed by google scholar id) first.
+
+    Returns:
+        dict: the updated row
+    """
+
+    new_columns(row, COLUMNS, None)
+    if not row['Google Scholar ID']:  # find gsc_id using 'scholarly'
+        author = await find_gsc_profile(row, institution, search_lock)
+        if not author:
+            row['status'] = 'profile not found'
+            return row
+        row['Google Scholar ID'] = author.id
+        row['Google Scholar Name'] = author.name
+
+    time_diff = 0
+    try:
+        last_update = int(row['Google Scholar Retrieval Time'])
+        time_diff = (time.time() - last_update) / (3600 * 24)  # days since
+    except (KeyError, ValueError, TypeError):
+        pass
+
+    if time_diff and time_diff <= expiration_days:  # metrics are up-to-date
+        row['status'] = 'up-to-date'
+        return row
+
+    gsc_id = row['Google Scholar ID']
+    page = await fetcher.fetch(
+        base_url, params={'user': gsc_id}, cache_key=gsc_id)
+    if page is None:
+        row['status'] = 'page not available'
+        return row
+
+    h_index, i10_index = gsc_parse_metrics(page)
+    entry = fetcher.cache.get(gsc_id) if fetcher.cache else None
+    row['Google Scholar h-index'] = h_index
+    row['Google Scholar i10-index'] = i10_index
+    row['Google Scholar Retrieval Time'] = \
+        entry['time'] if entry else int(time.time())
+    row['status'] = 'done'
+    return row
+
+
+async def crawl_metrics(
+        fetcher: Fetcher, rows: Iterable[dict], base_url: str,
+        expiration_days: float, institution: str,
+        on_row: Optional[Callable[[dict], None]] = None,
+        search_concurrency: int = 1) -> List[dict]:
+    """Crawls the google scholar metrics of faculty rows concurrently
+
+    Rows are processed concurrently (bounded by the fetcher) and each
+    finished row is handed to 'on_row' (e.g. to export it) as soon as it
+    is ready, so the order of the rows is not preserved.
+
+    Parameters:
+        fetcher (Fetcher): an open Fetcher to make the requests
+        rows (iterable): the faculty rows (dicts) to be processed
+        base_url (str): the base url of every google scholar profile
+        expiration_days (float): age (in days) of metrics to be renewed
+        institution (str): the name of the faculties' institution
+        on_row (callable): called with each finished row
+        search_concurrency (int): maximum concurrent 'scholarly' calls
+
+    Returns:
+        list: the updated rows, in the order they were finished
+    """
+
+    search_lock = asyncio.Semaphore(search_concurrency)
+    tasks = [
+        crawl_row(fetcher, row, base_url, expiration_days, institution,
+                  search_lock)
+        for row in rows]
+
+    results = []
+    for task in asyncio.as_completed(tasks):
+        row = await task
+        status = row.pop('status', None)
+        print(f'{institution}: {row["Institution ID"]} ... {status}')
+        if on_row:
+            on_row(row)
+        results.append(row)
+    return results
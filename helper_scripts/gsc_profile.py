@@ -1,11 +1,11 @@
 import io
-import csv
 import json
-import time
-import scholarly
+import asyncio
 from pathlib import Path
 
-from helpers import get_row, exporter, new_columns, gsc_metrics
+from fetcher import Fetcher, ResponseCache
+from gsc_crawler import crawl_metrics
+from helpers import get_row, CsvExporter
 
 
 # ==============================================================================
@@ -23,8 +23,14 @@ inst_config = config['institutions']
 BASE = gsc_config['base_url']
 
 METRICS_EXPIRATION = gsc_config['metrics_expiration_days']
-COLUMNS = [f'Google Scholar {i}'
-           for i in ['ID', 'Name', 'h-index', 'i10-index', 'Retrieval Time']]
+CONCURRENCY = gsc_config.get('concurrency', 8)
+RATE = gsc_config.get('rate', 2)  # requests per second
+BURST = gsc_config.get('burst', 5)
+# Google Scholar pages are cached by 'gsc_id', so that an interrupted crawl
+# can be re-run quickly.
+CACHE = ResponseCache(
+    CURRENT_DIR / gsc_config.get('cache_directory', 'gsc_cache'),
+    expiration_days=METRICS_EXPIRATION)
 
 
 # ==============================================================================
@@ -32,74 +38,38 @@ COLUMNS = [f'Google Scholar {i}'
 # ==============================================================================
 
 
-# This script can process authors from multiple institutions, separately
-for institution in inst_config:
-    if not inst_config[institution]['process']:
-        continue
+async def main() -> None:
+    # This script can process authors from multiple institutions, separately
+    for institution in inst_config:
+        if not inst_config[institution]['process']:
+            continue
 
-    # --------------------------------------------------------------------------
-    # Institution-Level config
-    # --------------------------------------------------------------------------
+        # ----------------------------------------------------------------------
+        # Institution-Level config
+        # ----------------------------------------------------------------------
 
-    HEADERS = {'User-Agent': inst_config[institution]['user_agent']}
-    DATA_PATH = CURRENT_DIR / inst_config[institution]['data_directory']
-    EXPORT_FILE = f'{institution}_faculties_with_gsc.csv'
-    EXPORT_PATH = DATA_PATH / EXPORT_FILE
-    FIRST_AUTHOR_ID = inst_config[institution]['first_faculty_id']
+        HEADERS = {'User-Agent': inst_config[institution]['user_agent']}
+        DATA_PATH = CURRENT_DIR / inst_config[institution]['data_directory']
+        EXPORT_FILE = f'{institution}_faculties_with_gsc.csv'
+        EXPORT_PATH = DATA_PATH / EXPORT_FILE
 
-    rows = get_row(DATA_PATH / inst_config[institution]['faculties'])
-    first_author_crawled = not FIRST_AUTHOR_ID or False  # no config: crawl all
-    csv_headers = not Path(EXPORT_PATH).is_file()
+        rows = get_row(DATA_PATH / inst_config[institution]['faculties'])
 
-    # --------------------------------------------------------------------------
-    # Main script
-    # --------------------------------------------------------------------------
+        # ----------------------------------------------------------------------
+        # Main script
+        # ----------------------------------------------------------------------
 
-    for row in rows:
-        print(f'{institution}: {row["Institution ID"]} ...', end=' ')
-        new_columns(row, COLUMNS, None)
+        # The export file is re-written in each run; already crawled pages
+        # are served from the cache.
+        with CsvExporter(EXPORT_PATH, reset=True) as export_file:
+            async with Fetcher(headers=HEADERS, concurrency=CONCURRENCY,
+                               rate=RATE, burst=BURST,
+                               cache=CACHE) as fetcher:
+                await crawl_metrics(
+                    fetcher, rows, BASE, METRICS_EXPIRATION, institution,
+                    on_row=export_file.write)
+                print(f'{institution}: {fetcher.stats}')
 
-        if row['Institution ID'] == FIRST_AUTHOR_ID:  # 1st author reached
-            first_author_crawled = True
-        if not first_author_crawled:  # 1st author (config) not reached yet
-            print('skipping (config)')
-            continue
 
-        if not row['Google Scholar ID']:  # find gsc_id using 'scholarly'
-            query = [row["First En"], row["Last En"], institution]
-
-            # query with high specificity
-            author = next(scholarly.search_author(' '.join(query)), None)
-            if not author:
-                # no results, trying query with lower specificity (without the
-                # institution name)
-                author = next(
-                    scholarly.search_author(' '.join(query[: -1])),
-                    None
-                )
-            if not author:
-                print('profile not found')
-                exporter(EXPORT_PATH, [row], headers=csv_headers)
-                csv_headers = False
-                continue
-            row['Google Scholar ID'] = author.id
-            row['Google Scholar Name'] = author.name
-
-        time_diff = 0
-        try:
-            last_update = int(row['Google Scholar Retrieval Time'])
-            time_diff = (time.time() - last_update) / (3600 * 24)  # days since
-        except (KeyError, ValueError, TypeError):
-            pass
-
-        # metrics do not exist or are old
-        if not(time_diff) or time_diff > METRICS_EXPIRATION:
-            h_index, i10_index = gsc_metrics(
-                BASE, row['Google Scholar ID'], HEADERS)
-            row['Google Scholar h-index'] = h_index
-            row['Google Scholar i10-index'] = i10_index
-            row['Google Scholar Retrieval Time'] = int(time.time())
-
-        print('done')
-        exporter(EXPORT_PATH, [row], headers=csv_headers)
-        csv_headers = False
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -1,11 +1,16 @@
 import io
+import os
 import csv
-from typing import Iterator, List, Tuple
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
 import requests as req
 from bs4 import BeautifulSoup
 from fuzzywuzzy import fuzz
 
+from elsametric.names import fold, KINDS, name_keys, transliteration_key
+
 
 def get_row(path: Path, encoding: str = 'utf-8',
             delimiter: str = ',') -> Iterator[dict]:
@@ -75,6 +80,140 @@ def exporter(path: Path, rows: List[dict],
             writer.writerows(rows[-1:])  # write to the csv file row-by-row
 
 
+class CsvExporter:
+    """Streams dictionaries to a .csv file through a single open handle
+
+    Unlike 'exporter', the file is opened once: rows are buffered and
+    written every 'buffer_size' rows or 'flush_interval' seconds, and
+    'checkpoint' makes sure everything written so far is on disk. This
+    avoids an open/close per row, which dominates the I/O time of the
+    crawlers on network filesystems.
+
+    The header is fixed by 'fieldnames', by the header of an existing
+    file (when appending), or by the first row. Rows with new columns
+    extend the header; since columns are only appended, the file is
+    re-written with the final header when it is closed.
+
+    Parameters:
+        path (Path): the path to the .csv file
+        fieldnames (list): the columns of the file, if known up front
+        reset (bool): whether to write to the file from the beginning or
+        append to it
+        buffer_size (int): number of rows to buffer before writing
+        flush_interval (float): maximum seconds between writes
+        encoding (str): encoding to be used when writing the .csv file
+        delimiter (str): the delimiter used in the .csv file
+        lineterminator (str): the line ending used in the .csv file
+    """
+
+    def __init__(self, path: Path, fieldnames: Optional[List[str]] = None,
+                 reset: bool = False, buffer_size: int = 100,
+                 flush_interval: float = 5.0, encoding: str = 'utf-8',
+                 delimiter: str = ',', lineterminator: str = '\n') -> None:
+        self.path = Path(path)
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.lineterminator = lineterminator
+
+        self.fieldnames: List[str] = list(fieldnames or [])
+        self.file_fieldnames: List[str] = []  # the header written to file
+        if not reset and self.path.is_file():
+            with io.open(self.path, 'r', encoding=encoding) as csv_file:
+                header = next(csv.reader(csv_file, delimiter=delimiter), [])
+            self.file_fieldnames = header
+            self.fieldnames = header + [
+                column for column in self.fieldnames
+                if column not in header]
+
+        self.buffer: List[dict] = []
+        self.rows = 0  # number of rows received
+        self.last_flush = time.monotonic()
+        self.file = io.open(
+            self.path, 'w' if reset else 'a', encoding=encoding, newline='')
+
+    def __repr__(self) -> str:
+        return f'CsvExporter: {self.path}'
+
+    def __enter__(self) -> 'CsvExporter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, row: dict) -> None:
+        """Adds a row to the buffer, writing the buffer if it's due"""
+
+        for column in row:
+            if column not in self.fieldnames:
+                self.fieldnames.append(column)
+        self.buffer.append(row)
+        self.rows += 1
+        if len(self.buffer) >= self.buffer_size or \
+                time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def writerows(self, rows: Iterable[dict]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """Writes the buffered rows to the file (without fsync)"""
+
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        if not self.file_fieldnames:  # new (or reset) file: write the header
+            self.file_fieldnames = list(self.fieldnames)
+            csv.writer(self.file, delimiter=self.delimiter,
+                       lineterminator=self.lineterminator) \
+                .writerow(self.file_fieldnames)
+        writer = csv.DictWriter(
+            self.file, fieldnames=self.fieldnames, delimiter=self.delimiter,
+            lineterminator=self.lineterminator)
+        writer.writerows(self.buffer)
+        self.buffer = []
+        self.file.flush()
+
+    def checkpoint(self) -> None:
+        """Writes the buffered rows and makes sure they are on disk"""
+
+        self.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        """Writes the remaining rows, closes the file & fixes its header"""
+
+        if self.file.closed:
+            return
+        self.checkpoint()
+        self.file.close()
+        if self.file_fieldnames and self.fieldnames != self.file_fieldnames:
+            self._rewrite_header()
+
+    def _rewrite_header(self) -> None:
+        # Columns are only ever appended, so the values of each row are a
+        # prefix of the final header: only the header and padding change.
+        temp_path = self.path.with_name(f'{self.path.name}.tmp')
+        with io.open(self.path, 'r', encoding=self.encoding,
+                     newline='') as src, \
+                io.open(temp_path, 'w', encoding=self.encoding,
+                        newline='') as dst:
+            reader = csv.reader(src, delimiter=self.delimiter)
+            writer = csv.writer(dst, delimiter=self.delimiter,
+                                lineterminator=self.lineterminator)
+            next(reader, None)
+            writer.writerow(self.fieldnames)
+            width = len(self.fieldnames)
+            for values in reader:
+                writer.writerow(values + [''] * (width - len(values)))
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(temp_path, self.path)
+        self.file_fieldnames = list(self.fieldnames)
+
+
 def nullify(data: dict,
             null_types: tuple = (None, '', ' ', '-', '#N/A', '---')) -> None:
     """Changes the null-looking values in a dictionary to None in-place
@@ -160,13 +299,30 @@ def gsc_metrics(
     """
 
     params = {'user': gsc_id}
-    h_index = i10_index = None
     try:
         page = req.get(base_url, headers=headers, params=params)
         page.raise_for_status()
-        index_table = BeautifulSoup(page.content, 'html.parser') \
+    except req.HTTPError:
+        return None, None
+
+    return gsc_parse_metrics(page.content)
+
+
+def gsc_parse_metrics(content) -> Tuple[int, int]:
+    """Extracts h-index & i10-index metrics from a google scholar page
+
+    Parameters:
+        content (str | bytes): the html of a google scholar profile
+
+    Returns:
+        h-index & i10-index of the author (None if not found)
+    """
+
+    h_index = i10_index = None
+    try:
+        index_table = BeautifulSoup(content, 'html.parser') \
             .find('table', attrs={'id': 'gsc_rsb_st'})
-    except (AttributeError, req.HTTPError):
+    except AttributeError:
         return h_index, i10_index
 
     try:
@@ -197,6 +353,9 @@ def author_faculty_matcher(authors: list, first: str, last: str, initials: str,
     If no methods are able to match, an empty list and an empty string
     will be returned.
 
+    The indexes of the authors are built on each call; to match many
+    faculties against the same authors, use AuthorMatcher directly.
+
     Parameters:
         authors (list): a list of author objects, queried from database
         first (str): first name of the faculty to be matched
@@ -209,41 +368,197 @@ def author_faculty_matcher(authors: list, first: str, last: str, initials: str,
         (list, str): a list of Scopus IDs and a level of confidence
     """
 
-    # High confidence: first name (exact) & last name (exact) -> 100%
-    matches = [author.id_scp for author in authors
-               if author.last == last and author.first == first]
-    if matches:
-        return matches, 'High'
-
-    # Medium confidence: initials (exact) & last name (exact)
-    matches = []
-    for author in authors:
-        try:
-            if author.last == last and author.first[0] == initials:
-                matches.append(author.id_scp)
-        except TypeError:  # author did not have a first name
-            continue
-    if matches:
-        return matches, 'Medium'
-
-    # Medium confidence: first name(fuzzy) & last name(exact) -> 80%
-    matches = []
-    for author in authors:
-        condition_first = fuzz.partial_ratio(author.first, first) >= cutoff
-        if author.last == last and condition_first:
-            matches.append(author.id_scp)
-    if matches:
-        return matches, 'Medium'
-
-    # Low confidence: first name (fuzzy) & last name (fuzzy) -> 64%
-    matches = []
-    for author in authors:
-        condition_first = fuzz.partial_ratio(author.first, first) >= cutoff
-        condition_last = fuzz.partial_ratio(author.first, last) >= cutoff
-        if condition_first and condition_last:
-            matches.append(author.id_scp)
-    if matches:
-        return matches, 'Low'
-
-    # None of the above method worked
-    return [], ''
+    return AuthorMatcher(authors, cutoff, use_pref=False) \
+        .match(first, last, initials)
+
+
+class AuthorMatcher:
+    """Matches faculty names to the authors of an institution
+
+    The names are indexed once by their normalized keys (see
+    'elsametric.names'): case, accents, spaces, hyphens and Arabic or
+    Persian letter variants are ignored, and the transliteration key is
+    the same for both scripts ('Mohammad', 'Muhammad' & 'محمد' are all
+    'mhmd'). Matching a faculty is a few hash lookups; the fuzzy tiers
+    only score the authors of the faculty's blocks:
+        - the authors with the same (normalized) last name
+        - the authors with the same last name transliteration key, or
+        the same initials of the last & first names (so a typo in the
+        rest of the last name is still a candidate)
+
+    Confidence levels (tried in this order):
+        - High: first name & last name (normalized, exact)
+        - Medium: first initial & last name (normalized, exact)
+        - Medium: first name (fuzzy) & last name (normalized, exact)
+        - Medium: first & last names (same transliteration keys)
+        - Low: first name (fuzzy) & last name (fuzzy), in the blocks
+
+    Unlike the original 'author_faculty_matcher', the exact tiers ignore
+    case & accents and match Persian names with their transliterations.
+
+    Parameters:
+        authors (list): a list of author objects, queried from database
+        cutoff (int): indicates how high the score of fuzzy-matching
+        should be for the strings considered to be the same
+        use_pref (bool): whether to index the preferred & Persian names
+        of the authors ('first_pref', 'last_pref', 'first_fa' &
+        'last_fa') as well
+    """
+
+    def __init__(self, authors: list, cutoff: int,
+                 use_pref: bool = True) -> None:
+        self.cutoff = cutoff
+        self.keys: Dict[str, Dict[str, List[int]]] = {
+            kind: defaultdict(list) for kind in KINDS}
+        # (id_scp, folded first name) of each folded last name
+        self.last: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        # (id_scp, folded first & last names) of each block
+        self.blocks: Dict[str, List[Tuple[int, str, str]]] = \
+            defaultdict(list)
+        self.names: List[Tuple[int, str, str]] = []  # (id_scp, first, last)
+
+        for author in authors:
+            variants = [(author.first, author.last)]
+            if use_pref:
+                variants.append((author.first_pref, author.last_pref))
+                variants.append((author.first_fa, author.last_fa))
+            for first, last in dict.fromkeys(variants):
+                if not last:
+                    continue
+                self.add(author.id_scp, first, last)
+
+    def __repr__(self) -> str:
+        return f'AuthorMatcher: {len(self.names)} names'
+
+    @staticmethod
+    def _block_keys(first: Optional[str], last: Optional[str]) -> List[str]:
+        # the blocks of a name: its last name transliteration key, and the
+        # initials of its last & first names
+        keys = []
+        last_key = transliteration_key(last)
+        if last_key:
+            keys.append(f'translit|{last_key}')
+        last_folded = fold(last)
+        if last_folded:
+            keys.append(f'initials|{last_folded[0]}{fold(first)[:1]}')
+        return keys
+
+    def add(self, id_scp: int, first: Optional[str], last: str) -> None:
+        """Adds a name of an author to the indexes"""
+
+        self.names.append((id_scp, first, last))
+        for kind, key in name_keys(first, last).items():
+            self.keys[kind][key].append(id_scp)
+        first_folded = fold(first)
+        last_folded = fold(last)
+        self.last[last_folded].append((id_scp, first_folded))
+        for block_key in self._block_keys(first, last):
+            self.blocks[block_key].append(
+                (id_scp, first_folded, last_folded))
+
+    def block(self, first: Optional[str],
+              last: Optional[str]) -> List[Tuple[int, str, str]]:
+        """Returns the (id_scp, folded first & last names) of the blocks
+        of a name"""
+
+        candidates = {}
+        for block_key in self._block_keys(first, last):
+            for candidate in self.blocks.get(block_key, ()):
+                candidates[candidate] = None
+        return list(candidates)
+
+    def match(self, first: str, last: str,
+              initials: str) -> Tuple[list, str]:
+        """Attemps to match the provided names with the indexed authors
+
+        Parameters:
+            first (str): first name of the faculty to be matched
+            last (str): last name of the faculty to be matched
+            initials (str): initials of the faculty to be matched
+
+        Returns:
+            (list, str): a list of Scopus IDs and a level of confidence
+        """
+
+        keys = name_keys(first, last)
+        if not keys:  # no last name
+            return [], ''
+        first_folded = fold(first)
+        last_folded = fold(last)
+
+        # High confidence: first name (exact) & last name (exact) -> 100%
+        matches = self.keys['full'].get(keys.get('full'))
+        if matches:
+            return _unique(matches), 'High'
+
+        # Medium confidence: initials (exact) & last name (exact)
+        if initials or first:
+            matches = self.keys['initial'].get(
+                name_keys(initials or first, last)['initial'])
+            if matches:
+                return _unique(matches), 'Medium'
+
+        # Medium confidence: first name(fuzzy) & last name(exact) -> 80%
+        matches = [
+            id_scp for id_scp, author_first in self.last.get(last_folded, ())
+            if fuzz.partial_ratio(author_first, first_folded) >= self.cutoff]
+        if matches:
+            return _unique(matches), 'Medium'
+
+        # Medium confidence: first & last names (same transliteration)
+        matches = self.keys['translit'].get(keys.get('translit'))
+        if matches:
+            return _unique(matches), 'Medium'
+
+        # Low confidence: first name (fuzzy) & last name (fuzzy) -> 64%
+        matches = [
+            id_scp for id_scp, author_first, author_last
+            in self.block(first, last)
+            if fuzz.partial_ratio(author_first, first_folded) >= self.cutoff
+            and fuzz.partial_ratio(author_last, last_folded) >= self.cutoff]
+        if matches:
+            return _unique(matches), 'Low'
+
+        # None of the above method worked
+        return [], ''
+
+    def match_rows(self, rows: Iterable[dict], first: str = 'First En',
+                   last: str = 'Last En',
+                   initials: str = 'Initials En') -> Iterator[dict]:
+        """Matches a batch of faculty rows, yielding the updated rows
+
+        The 'Scopus ID' & 'Scopus ID Confidence' columns of each row are
+        filled; rows that already have a Scopus ID are yielded as-is.
+
+        Parameters:
+            rows (iterable): the faculty rows (dicts) to be matched
+            first (str): the column of the first names
+            last (str): the column of the last names
+            initials (str): the column of the initials; if missing or
+            empty, the first letter of the first name is used
+
+        Yields:
+            row: the faculty row, with the matching results
+        """
+
+        for row in rows:
+            new_columns(row, ['Scopus ID', 'Scopus ID Confidence'], None)
+            if row['Scopus ID']:  # faculty's Scopus ID already known
+                yield row
+                continue
+
+            row_initials = row.get(initials)
+            if not row_initials:
+                row_initials = row[first][0] if row[first] else None
+
+            matches, confidence_level = self.match(
+                row[first], row[last], row_initials)
+            if matches:
+                row['Scopus ID'] = ', '.join(str(match) for match in matches)
+                row['Scopus ID Confidence'] = confidence_level
+            yield row
+
+
+def _unique(ids: List[int]) -> List[int]:
+    # an author may be indexed under both of its names
+    return list(dict.fromkeys(ids))
@@ -0,0 +1,308 @@
+import asyncio
+import io
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from fetcher import Fetcher
+
+
+SCOPUS_SEARCH_URL = 'https://api.elsevier.com/content/search/scopus'
+
+
+class Query(NamedTuple):
+    name: str  # the prefix of the files, e.g. 'sharif_2019'
+    query: str  # a Scopus advanced search query
+    directory: Path  # where the files of the query are written
+
+
+def year_queries(name: str, query: str, years: Iterable[int],
+                 directory: Path) -> List[Query]:
+    """Splits a query by publication year, so the years are harvested
+    concurrently (the pages of a single query are fetched one by one)
+
+    Returns:
+        list: a Query for each year, named '<name>_<year>'
+    """
+
+    return [Query(f'{name}_{year}', f'({query}) AND PUBYEAR IS {year}',
+                  directory)
+            for year in years]
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+class Quota:
+    """The state of the API key's quota, from the 'X-RateLimit-*' headers
+
+    Parameters:
+        reserve (int): number of requests left unused in the quota
+        max_wait (float): maximum seconds to wait for the quota to reset;
+            if it resets later, the harvest stops (and can be resumed)
+    """
+
+    def __init__(self, reserve: int = 0, max_wait: float = 0) -> None:
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset: Optional[float] = None  # unix time
+
+    def __repr__(self) -> str:
+        return f'Quota: {self.remaining}/{self.limit} (reset: {self.reset})'
+
+    def update(self, headers) -> None:
+        try:
+            self.limit = int(headers['X-RateLimit-Limit'])
+            self.remaining = int(headers['X-RateLimit-Remaining'])
+            self.reset = float(headers['X-RateLimit-Reset'])
+        except (KeyError, ValueError):  # no (valid) quota headers
+            pass
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining is not None and self.remaining <= self.reserve
+
+    async def wait(self) -> None:
+        """Waits for the quota to reset, if it is exhausted
+
+        Raises:
+            QuotaExceeded: if the quota resets after 'max_wait' seconds
+        """
+
+        if not self.exhausted:
+            return
+        wait = (self.reset or 0) - time.time()
+        if wait > self.max_wait:
+            raise QuotaExceeded(f'{self}, resets in {wait:.0f} seconds')
+        await asyncio.sleep(max(wait, 0))
+        self.remaining = None  # unknown, until the next response
+
+
+class HarvestState:
+    """Persistent cursors of the queries of a harvest
+
+    The state of each query ('cursor', 'page', 'retrieved', 'total' &
+    'done') is kept in a JSON file at 'path', which is replaced after
+    every page, so an interrupted harvest resumes from the last page
+    written to disk.
+
+    Parameters:
+        path (Path): the path to the state file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.queries: Dict[str, dict] = {}
+        if self.path.is_file():
+            with io.open(self.path, 'r', encoding='utf-8') as file:
+                self.queries = json.load(file)
+
+    def __getitem__(self, name: str) -> dict:
+        return self.queries.setdefault(name, {
+            'cursor': '*', 'page': 0, 'retrieved': 0, 'total': None,
+            'done': False})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f'{self.path.name}.tmp')
+        with io.open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.queries, file, indent=2)
+        temp_path.replace(self.path)
+
+
+class ScopusHarvester:
+    """Harvests the results of Scopus search queries into paper files
+
+    The results of each query are paged through with the Scopus cursor
+    ('cursor=*', then the '@next' cursor of each page), and every page is
+    written as-is to '<query name>_p<page>_<unixtime>.json' in the
+    query's directory; the layout 'elsametric populate' reads (the
+    retrieval time is the last part of the file name). Queries are
+    harvested concurrently, sharing a Fetcher (rate limits, retries) and
+    the quota of the API key, which is read from the 'X-RateLimit-*'
+    headers of the responses.
+
+    Parameters:
+        fetcher (Fetcher): an open Fetcher to make the requests
+        state (HarvestState): the cursors of the queries
+        url (str): the url of the Scopus search API
+        view (str): the view of the results: 'STANDARD' or 'COMPLETE'
+        count (int): number of results per page (at most 25 for the
+            'COMPLETE' view)
+        quota (Quota): the quota of the API key
+    """
+
+    def __init__(self, fetcher: Fetcher, state: HarvestState,
+                 url: str = SCOPUS_SEARCH_URL, view: str = 'COMPLETE',
+                 count: int = 25, quota: Optional[Quota] = None) -> None:
+        self.fetcher = fetcher
+        self.state = state
+        self.url = url
+        self.view = view
+        self.count = count
+        self.quota = quota or Quota()
+        self.stats = {'pages': 0, 'papers': 0, 'failed': 0}
+
+    def __repr__(self) -> str:
+        return f'ScopusHarvester: {self.url}'
+
+    async def fetch_page(self, query: Query, cursor: str) -> Optional[dict]:
+        """Returns a page of the results of a query, or None on errors
+
+        Raises:
+            QuotaExceeded: if the quota is used up & doesn't reset soon
+        """
+
+        while True:
+            await self.quota.wait()
+            response = await self.fetcher.request(self.url, params={
+                'query': query.query, 'cursor': cursor,
+                'count': self.count, 'view': self.view})
+            if response is None:
+                return None
+            self.quota.update(response.headers)
+            if response.status == 429:  # quota exceeded
+                self.quota.remaining = 0
+                continue
+            if response.status >= 400:
+                print(f'{query.name}: error (HTTP {response.status})')
+                return None
+            return json.loads(await response.text())
+
+    def write_page(self, query: Query, page: int, body: dict) -> Path:
+        query.directory.mkdir(parents=True, exist_ok=True)
+        # a page fetched again (after an interruption) replaces its file
+        for old_path in query.directory.glob(f'{query.name}_p{page:04d}_*'):
+            old_path.unlink()
+        path = query.directory / \
+            f'{query.name}_p{page:04d}_{int(time.time())}.json'
+        temp_path = path.with_name(f'{path.name}.tmp')
+        with io.open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(body, file)
+        temp_path.replace(path)
+        return path
+
+    async def harvest_query(self, query: Query) -> dict:
+        """Fetches the remaining pages of a query, one after another
+
+        Returns:
+            dict: the state of the query
+        """
+
+        state = self.state[query.name]
+        while not state['done']:
+            body = await self.fetch_page(query, state['cursor'])
+            if body is None:
+                self.stats['failed'] += 1
+                break
+
+            results = body.get('search-results', {})
+            # an empty result set is a single entry with an 'error' key
+            entries = [
+                entry for entry in results.get('entry', [])
+                if 'error' not in entry]
+            if entries:
+                self.write_page(query, state['page'], body)
+                self.stats['pages'] += 1
+                self.stats['papers'] += len(entries)
+
+            next_cursor = results.get('cursor', {}).get('@next')
+            state['page'] += 1
+            state['retrieved'] += len(entries)
+            state['total'] = int(results.get('opensearch:totalResults', 0))
+            state['cursor'] = next_cursor
+            state['done'] = not entries or not next_cursor or \
+                state['retrieved'] >= state['total']
+            self.state.save()
+
+        print(f'{query.name}: {state["retrieved"]}/{state["total"]} '
+              f'papers ... {"done" if state["done"] else "incomplete"}')
+        return state
+
+    async def harvest(self, queries: Iterable[Query]) -> dict:
+        """Harvests the queries concurrently
+
+        If the quota runs out (and doesn't reset within 'max_wait'), the
+        harvest stops; running it again continues from the saved cursors.
+
+        Returns:
+            dict: the stats of the harvest
+        """
+
+        t0 = time.monotonic()
+        results = await asyncio.gather(
+            *(self.harvest_query(query) for query in queries),
+            return_exceptions=True)
+        for result in results:
+            if isinstance(result, QuotaExceeded):
+                print(f'quota exceeded: {result}')
+                break
+            if isinstance(result, Exception):
+                raise result
+
+        elapsed = time.monotonic() - t0
+        return {**self.stats, 'seconds': round(elapsed, 2),
+                'papers/s': round(self.stats['papers'] / elapsed, 1)
+                if elapsed else 0}
+
+
+async def harvest(config: dict, data_path: Path) -> dict:
+    """Harvests the queries of the 'scopus' section of
+    'crawlers_config.json'
+
+    Parameters:
+        config (dict): the 'scopus' section of the config
+        data_path (Path): the directory of the paper files
+
+    Returns:
+        dict: the stats of the harvest
+    """
+
+    queries = []
+    for item in config['queries']:
+        if not item['process']:
+            continue
+        directory = data_path / item.get('directory', item['name'])
+        if item.get('years'):
+            queries.extend(year_queries(
+                item['name'], item['query'], item['years'], directory))
+        else:
+            queries.append(Query(item['name'], item['query'], directory))
+
+    headers = {'X-ELS-APIKey': config['api_key'],
+               'Accept': 'application/json'}
+    quota = Quota(reserve=config.get('quota_reserve', 0),
+                  max_wait=config.get('max_quota_wait', 60))
+    async with Fetcher(headers=headers,
+                       concurrency=config.get('concurrency', 4),
+                       rate=config.get('rate', 6),
+                       burst=config.get('burst', 6)) as fetcher:
+        harvester = ScopusHarvester(
+            fetcher,
+            HarvestState(data_path / config.get(
+                'state_file', 'scopus_harvest_state.json')),
+            url=config.get('base_url', SCOPUS_SEARCH_URL),
+            view=config.get('view', 'COMPLETE'),
+            count=config.get('count', 25),
+            quota=quota)
+        stats = await harvester.harvest(queries)
+        print(f'scopus: {stats}, {fetcher.stats}')
+    return stats
+
+
+# ==============================================================================
+# Config & Script
+# ==============================================================================
+
+
+if __name__ == '__main__':
+    CURRENT_DIR = Path.cwd()
+    with io.open(CURRENT_DIR / 'crawlers_config.json', 'r') as config_file:
+        config = json.load(config_file)
+    config = config['scopus']
+
+    asyncio.run(harvest(config, CURRENT_DIR / config['data_directory']))
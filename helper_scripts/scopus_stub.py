@@ -0,0 +1,217 @@
+"""A local stand-in for the Scopus search API, replaying recorded papers
+
+Serves the entries of recorded paper files (e.g. the files written by
+'scopus_harvester.py': '<name>_<unixtime>.json') as cursor-paged search
+results, with the 'X-RateLimit-*' quota headers of the real API, so the
+harvester's throughput & resume behaviour can be tested offline. Point
+the 'base_url' of the 'scopus' section of 'crawlers_config.json' to
+http://localhost:<port>/content/search/scopus to use it.
+
+Only 'AF-ID(<id>)' & 'PUBYEAR IS <year>' (or '= <year>') terms of the
+queries are applied; the rest of a query is ignored.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+
+MAX_COUNT = {'STANDARD': 200, 'COMPLETE': 25}
+
+
+def load_entries(directory: Path) -> List[dict]:
+    """Returns the distinct entries of the paper files in a directory"""
+
+    entries: Dict[str, dict] = {}
+    for path in sorted(Path(directory).rglob('*')):
+        if path.suffix not in ['.json', '.txt']:
+            continue
+        with io.open(path, 'r', encoding='utf-8') as file:
+            for entry in json.load(file)['search-results'].get('entry', []):
+                if 'error' not in entry:
+                    entries.setdefault(entry['dc:identifier'], entry)
+    return list(entries.values())
+
+
+def matches(entry: dict, query: str) -> bool:
+    for afid in re.findall(r'AF-ID\s*\(\s*(\d+)\s*\)', query):
+        if afid not in [
+                str(affiliation.get('afid'))
+                for affiliation in entry.get('affiliation', [])]:
+            return False
+    for year in re.findall(r'PUBYEAR\s*(?:IS|=)\s*(\d{4})', query):
+        if not entry.get('prism:coverDate', '').startswith(year):
+            return False
+    return True
+
+
+class ScopusStub:
+    """The state of the stub: the recorded entries & the quota
+
+    Parameters:
+        entries (list): the recorded entries
+        quota (int): number of requests allowed until the quota resets
+        reset_seconds (float): seconds until the quota resets
+        rate (float): requests per second allowed before throttling
+            (HTTP 429, without using up the quota); 0 means no limit
+        latency (float): seconds added to each response
+        failure_rate (float): share of requests answered with HTTP 500
+        api_key (str): the required 'X-ELS-APIKey' (any key if None)
+    """
+
+    def __init__(self, entries: List[dict], quota: int = 20000,
+                 reset_seconds: float = 7 * 24 * 3600, rate: float = 0,
+                 latency: float = 0, failure_rate: float = 0,
+                 api_key: Optional[str] = None) -> None:
+        self.entries = entries
+        self.quota = quota
+        self.remaining = quota
+        self.reset = time.time() + reset_seconds
+        self.rate = rate
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.api_key = api_key
+        self.window = (0, 0)  # (second, requests in that second)
+        self.results: Dict[str, List[dict]] = {}  # query digest: entries
+        self.stats = {'requests': 0, 'throttled': 0, 'failed': 0}
+
+    def _digest(self, query: str) -> str:
+        digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:12]
+        if digest not in self.results:
+            self.results[digest] = [
+                entry for entry in self.entries if matches(entry, query)]
+        return digest
+
+    @staticmethod
+    def _cursor(digest: str, offset: int) -> str:
+        return base64.urlsafe_b64encode(
+            f'{digest}:{offset}'.encode('ascii')).decode('ascii')
+
+    def _headers(self) -> dict:
+        return {
+            'X-RateLimit-Limit': str(self.quota),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(int(self.reset)),
+        }
+
+    def _throttled(self) -> bool:
+        second = int(time.monotonic())
+        count = self.window[1] + 1 if self.window[0] == second else 1
+        self.window = (second, count)
+        return bool(self.rate) and count > self.rate
+
+    async def search(self, request: web.Request) -> web.Response:
+        self.stats['requests'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.api_key and \
+                request.headers.get('X-ELS-APIKey') != self.api_key:
+            return web.json_response(
+                {'service-error': {'status': {
+                    'statusCode': 'AUTHENTICATION_ERROR'}}}, status=401)
+        if time.time() >= self.reset:
+            self.remaining = self.quota
+            self.reset = time.time() + 7 * 24 * 3600
+        if self.remaining <= 0:
+            return web.json_response(
+                {'error-response': {'error-code': 'TOO_MANY_REQUESTS'}},
+                status=429, headers={
+                    **self._headers(),
+                    'X-ELS-Status': 'QUOTA_EXCEEDED - Quota Exceeded'})
+        if self._throttled():
+            self.stats['throttled'] += 1
+            return web.json_response(
+                {'error-response': {'error-code': 'TOO_MANY_REQUESTS'}},
+                status=429, headers=self._headers())
+        if random.random() < self.failure_rate:
+            self.stats['failed'] += 1
+            return web.json_response({}, status=500)
+
+        query = request.query.get('query', '')
+        view = request.query.get('view', 'STANDARD').upper()
+        count = min(int(request.query.get('count', 25)),
+                    MAX_COUNT.get(view, 25))
+        digest = self._digest(query)
+        cursor = request.query.get('cursor', '*')
+        offset = 0
+        if cursor != '*':
+            try:
+                cursor_digest, offset = base64.urlsafe_b64decode(
+                    cursor.encode('ascii')).decode('ascii').split(':')
+                offset = int(offset)
+            except ValueError:
+                cursor_digest = None
+            if cursor_digest != digest:
+                return web.json_response(
+                    {'service-error': {'status': {
+                        'statusCode': 'INVALID_INPUT',
+                        'statusText': 'Invalid cursor'}}}, status=400)
+
+        self.remaining -= 1
+        results = self.results[digest]
+        entries = results[offset:offset + count] or \
+            [{'@_fa': 'true', 'error': 'Result set was empty'}]
+        return web.json_response({'search-results': {
+            'opensearch:totalResults': str(len(results)),
+            'opensearch:startIndex': str(offset),
+            'opensearch:itemsPerPage': str(count),
+            'opensearch:Query': {'@searchTerms': query},
+            'cursor': {'@current': cursor,
+                       '@next': self._cursor(digest, offset + count)},
+            'entry': entries,
+        }}, headers=self._headers())
+
+    async def status(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {**self.stats, 'remaining': self.remaining})
+
+
+def make_app(stub: ScopusStub) -> web.Application:
+    app = web.Application()
+    app.router.add_get('/content/search/scopus', stub.search)
+    app.router.add_get('/status', stub.status)
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument(
+        'recordings', type=Path,
+        help='the directory of the recorded paper files')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument(
+        '--quota', type=int, default=20000,
+        help='number of requests before the quota is exceeded')
+    parser.add_argument(
+        '--reset', type=float, default=7 * 24 * 3600,
+        help='seconds until the quota resets')
+    parser.add_argument(
+        '--rate', type=float, default=0,
+        help='requests per second before throttling (0: no limit)')
+    parser.add_argument(
+        '--latency', type=float, default=0,
+        help='seconds added to each response')
+    parser.add_argument(
+        '--failure-rate', type=float, default=0,
+        help='share of requests answered with HTTP 500')
+    parser.add_argument('--api-key', help='the required API key')
+    args = parser.parse_args()
+
+    entries = load_entries(args.recordings)
+    print(f'replaying {len(entries)} papers on port {args.port}')
+    web.run_app(
+        make_app(ScopusStub(
+            entries, quota=args.quota, reset_seconds=args.reset,
+            rate=args.rate, latency=args.latency,
+            failure_rate=args.failure_rate, api_key=args.api_key)),
+        port=args.port, print=None)
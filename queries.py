@@ -52,57 +52,15 @@ t0 = time.time()
 #     .filter(Author.id_scp == 6602882167) \
 #     .all()
 
-p = papers \
-    .join((Paper_Author, Paper.authors)) \
-    .join((Author, Paper_Author.author)) \
-    .join((Department, Author.departments)) \
-    .join((Institution, Department.institution)) \
-    .filter(Institution.id_scp == 60010312).all()
-    # .filter(Institution.name.contains('Iran Polymer')).all()
+# The institution's analytics are GROUP BY queries over its distinct papers,
+# so neither the papers nor their sources are loaded into the session.
+institution = institutions.filter(Institution.id_scp == 60010312).one()
+# institution = institutions \
+#     .filter(Institution.name.contains('Iran Polymer')).one()
 
-countries = {'unknown': 0}
-paper_types = {'unknown': 0}
-percentiles = {}
-ippi = 0
-count = 0
-for cnt, paper in enumerate(p):
-    year = int(str(paper.date).split('-')[0])
-    if year != 2018:
-        continue
-    try:
-        metrics = paper.source.metrics
-        percentile = next(
-            filter(
-                lambda x: x.year == year and x.type == 'Percentile', metrics),
-            None)
-        percentiles[int(percentile.value)] += 1
-    except AttributeError:
-        continue
-    except KeyError:
-        percentiles[int(percentile.value)] = 1
-
-    try:
-        name = paper.source.country.name
-        countries[name] += 1
-    except AttributeError:
-        countries['unknown'] += 1
-    except KeyError:
-        countries[name] = 1
-
-    try:
-        paper_type = paper.source.type
-        paper_types[paper_type] += 1
-    except AttributeError:
-        print(paper.source)
-        paper_types['unknown'] += 1
-    except KeyError:
-        paper_types[paper_type] = 1
-
-    try:
-        if paper.source.id_scp == 96087:
-            ippi += 0
-    except:
-        pass
+percentiles = institution.get_metrics(year=2018)
+countries = institution.get_source_countries(year=2018)
+paper_types = institution.get_source_types(year=2018)
 
 # print(ippi)
 # # print()
@@ -112,4 +70,5 @@ for cnt, paper in enumerate(p):
 #     for country, count in percentiles.items():
 #         output.write(f'{country}\t{count}\n')
 
-print(countries)
\ No newline at end of file
+print(countries)
+print(f'{time.time() - t0:.3f} seconds')
\ No newline at end of file
@@ -16,19 +16,26 @@ setuptools.setup(
     # long_description=README,
     url='https://github.com/pmsoltani/elsametric',
     packages=setuptools.find_packages(),
-    python_requires=">=3.6",
+    entry_points={
+        'console_scripts': ['elsametric=elsametric.cli:main'],
+    },
+    python_requires=">=3.7",
     install_requires=[
-        'sqlalchemy>=1.3',
+        'sqlalchemy>=1.3.11',
         'sqlalchemy-utils>=0.34',
         'mysql-connector-python>=8'
     ],
+    extras_require={
+        'analytics': ['numpy>=1.16', 'scipy>=1.2'],
+        'export': ['pyarrow>=0.15'],
+    },
     classifiers=[
         # Trove classifiers
         # (https://pypi.python.org/pypi?%3Aaction=list_classifiers)
         'Development Status :: 4 - Beta',
         # 'License :: OSI Approved :: MIT License',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
         'Topic :: Software Development :: Libraries',
         'Topic :: Software Development :: Libraries :: Python Modules',
         'Intended Audience :: Developers',